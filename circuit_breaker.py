@@ -0,0 +1,121 @@
+# circuit_breaker.py - OpenAI 呼叫的斷路器：連續失敗或過慢時暫停呼叫，定期以單一請求試探恢復
+import threading
+import time
+from typing import Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """斷路器開啟中，請求未送出"""
+
+
+class CircuitBreaker:
+    """連續失敗（含過慢的呼叫）達到門檻時開啟，經過冷卻時間後放行一個試探請求"""
+
+    def __init__(self, failure_threshold: int = 5, slow_call_ms: float = 15000, reset_timeout_seconds: float = 30):
+        """
+        初始化斷路器
+
+        Args:
+            failure_threshold: 連續失敗幾次後開啟
+            slow_call_ms: 超過此延遲的成功呼叫也視為失敗（毫秒）
+            reset_timeout_seconds: 開啟後經過多久放行試探請求（秒）
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.slow_call_ms = slow_call_ms
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.opened = 0
+        self.rejected = 0
+        self.probes = 0
+        self.slow_calls = 0
+        self.inconclusive = 0
+
+    @property
+    def state(self) -> str:
+        """目前狀態（closed / open / half_open）"""
+        with self._lock:
+            return self._state
+
+    def allow_request(self) -> bool:
+        """
+        判斷是否可以送出請求
+
+        Returns:
+            bool: 關閉時一律允許；開啟超過冷卻時間後轉為半開並允許一個試探請求；其餘情況拒絕
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_seconds:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self.probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, latency_ms: float) -> None:
+        """記錄成功的呼叫；過慢的呼叫視為失敗"""
+        if latency_ms > self.slow_call_ms:
+            with self._lock:
+                self.slow_calls += 1
+            self.record_failure()
+            return
+        with self._lock:
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+            self._state = CLOSED
+
+    def record_failure(self) -> None:
+        """記錄失敗的呼叫；試探失敗或連續失敗達到門檻時開啟"""
+        with self._lock:
+            self._consecutive_failures += 1
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._consecutive_failures >= self.failure_threshold
+            ):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self.opened += 1
+
+    def record_inconclusive(self) -> None:
+        """記錄無法判斷服務狀態的呼叫（例如逾時秒數因回覆期限而縮短）；不計入失敗，只釋放試探名額"""
+        with self._lock:
+            self.inconclusive += 1
+            self._probe_in_flight = False
+
+    def seconds_until_probe(self) -> Optional[float]:
+        """開啟時距離下次試探的秒數，其他狀態回傳 None"""
+        with self._lock:
+            if self._state != OPEN:
+                return None
+            return max(0.0, self.reset_timeout_seconds - (time.monotonic() - self._opened_at))
+
+    def get_stats(self) -> dict:
+        """
+        取得統計資訊
+
+        Returns:
+            dict: 包含狀態、連續失敗次數、開啟次數、拒絕的請求數、試探次數、過慢與無法判斷的呼叫數
+        """
+        retry_in = self.seconds_until_probe()
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "probes": self.probes,
+                "slow_calls": self.slow_calls,
+                "inconclusive": self.inconclusive,
+                "retry_in_seconds": round(retry_in, 1) if retry_in is not None else None,
+            }
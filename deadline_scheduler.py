@@ -0,0 +1,116 @@
+# deadline_scheduler.py - 依期限排序的執行緒池：最早到期的工作最先執行（Earliest Deadline First）
+import heapq
+import itertools
+import math
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Optional
+
+
+class EarliestDeadlineExecutor(Executor):
+    """與 ThreadPoolExecutor 相同介面的執行緒池，佇列依期限排序；沒有期限的工作排在最後並維持送出順序"""
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "deadline-worker"):
+        """
+        初始化執行緒池
+
+        Args:
+            max_workers: 最大執行緒數
+            thread_name_prefix: 執行緒名稱前綴
+        """
+        self.max_workers = max(1, max_workers)
+        self.thread_name_prefix = thread_name_prefix
+        self._cond = threading.Condition()
+        self._heap = []
+        self._sequence = itertools.count()
+        self._threads = []
+        self._idle = 0
+        self._shutdown = False
+        self.submitted = 0
+        self.started_late = 0
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        """送出沒有期限的工作"""
+        return self.submit_with_deadline(None, fn, *args, **kwargs)
+
+    def submit_with_deadline(self, deadline: Optional[float], fn, /, *args, **kwargs) -> Future:
+        """
+        送出工作
+
+        Args:
+            deadline: 期限（epoch 秒），None 表示沒有期限
+            fn: 要執行的函式
+
+        Returns:
+            Future: 工作的結果
+        """
+        future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            priority = deadline if deadline is not None else math.inf
+            heapq.heappush(self._heap, (priority, next(self._sequence), future, fn, args, kwargs))
+            self.submitted += 1
+            # 閒置數包含已被喚醒但尚未取走工作的執行緒；佇列中的工作比閒置執行緒多時才需要新增執行緒
+            if len(self._heap) > self._idle and len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._worker,
+                    name=f"{self.thread_name_prefix}_{len(self._threads)}",
+                    daemon=True,
+                )
+                self._threads.append(thread)
+                thread.start()
+            else:
+                self._cond.notify()
+        return future
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                self._idle += 1
+                while not self._heap and not self._shutdown:
+                    self._cond.wait()
+                self._idle -= 1
+                if not self._heap:
+                    return
+                deadline, _, future, fn, args, kwargs = heapq.heappop(self._heap)
+                if deadline != math.inf and time.time() > deadline:
+                    self.started_late += 1
+
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """停止接受新工作；cancel_futures 為 True 時取消尚未開始的工作"""
+        with self._cond:
+            self._shutdown = True
+            if cancel_futures:
+                for _, _, future, _, _, _ in self._heap:
+                    future.cancel()
+                self._heap.clear()
+            self._cond.notify_all()
+        if wait:
+            for thread in list(self._threads):
+                thread.join()
+
+    def get_stats(self) -> dict:
+        """
+        取得統計資訊
+
+        Returns:
+            dict: 包含佇列長度、執行緒數、送出的工作數，以及開始時已超過期限的工作數
+        """
+        with self._cond:
+            return {
+                "queued": len(self._heap),
+                "workers": len(self._threads),
+                "submitted": self.submitted,
+                "started_late": self.started_late,
+            }
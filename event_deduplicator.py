@@ -0,0 +1,184 @@
+# event_deduplicator.py - 以 webhookEventId 去除 LINE 重送的事件：兩個輪替的 Bloom filter 加上有界的精確集合確認
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import Optional
+
+from token_backends import TokenBackend, TokenDigestStore, make_digest
+
+# 共用後端中事件摘要使用的金鑰，與 reply token 的摘要分開
+_EVENT_DIGEST_KEY = b"line-webhook-event"
+
+
+class BloomFilter:
+    """固定大小的 Bloom filter，以 double hashing 由一個 128 位元摘要產生 k 個位置"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """
+        初始化 Bloom filter
+
+        Args:
+            capacity: 預期放入的項目數
+            error_rate: 放入 capacity 個項目時的誤判率
+        """
+        capacity = max(1, capacity)
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: bytes):
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.num_hashes):
+            yield (first + i * second) % self.num_bits
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(digest))
+
+    def add(self, digest: bytes) -> None:
+        """放入摘要"""
+        for p in self._positions(digest):
+            self._bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def clear(self) -> None:
+        """清除所有位元，重複使用同一塊記憶體"""
+        self._bits[:] = bytes(len(self._bits))
+        self.count = 0
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+
+class EventDeduplicator:
+    """依 webhookEventId 判斷事件是否已處理過
+
+    目前與前一個時間窗各一個 Bloom filter，每經過一個時間窗輪替一次，因此記住的範圍是一到兩個時間窗。
+    Bloom filter 命中時再以有界的精確集合確認，避免誤判而捨棄新的事件；
+    精確集合已淘汰的項目視為新事件（寧可重複翻譯，也不丟掉訊息）。
+    兩者大小都在建立時固定，與流量無關。
+
+    指定共用後端（SQLite / Redis）時，本機 Bloom filter 只作為快速路徑，
+    每個事件都以後端的 claim_many 原子性地確認，因此重送到其他實例的事件也會被判定為重複。
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 3600,
+        capacity: int = 100_000,
+        error_rate: float = 0.001,
+        backend: Optional[TokenBackend] = None,
+    ):
+        """
+        初始化去重器
+
+        Args:
+            window_seconds: 每個 Bloom filter 的時間窗（秒）
+            capacity: 每個時間窗預期的事件數；精確集合可保存兩個時間窗的事件
+            error_rate: Bloom filter 在 capacity 個事件時的誤判率
+            backend: 多個實例共用的後端；省略時只在本機去重
+        """
+        self.window_seconds = window_seconds
+        self.backend = backend if backend is not None and backend.shared else None
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous = BloomFilter(capacity, error_rate)
+        self._exact = TokenDigestStore(2 * capacity)
+        self._window_started = time.monotonic()
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.duplicates = 0
+        self.unconfirmed = 0
+        self.rotations = 0
+        self.shared_duplicates = 0
+        self.backend_errors = 0
+
+    def _rotate(self, now: float) -> None:
+        """時間窗結束時輪替 Bloom filter（呼叫端需持有 self._lock）"""
+        elapsed_windows = int((now - self._window_started) // self.window_seconds)
+        if elapsed_windows <= 0:
+            return
+        self._previous, self._current = self._current, self._previous
+        self._current.clear()
+        if elapsed_windows > 1:
+            # 超過兩個時間窗沒有事件，前一個時間窗也已過期
+            self._previous.clear()
+        self._window_started += elapsed_windows * self.window_seconds
+        self._exact.expire(int((self._window_started - self.window_seconds) * 1000))
+        self.rotations += 1
+
+    def seen(self, event_id: str) -> bool:
+        """
+        檢查事件是否已處理過，未處理過時記錄下來
+
+        Args:
+            event_id: webhookEventId
+
+        Returns:
+            bool: True 表示重複的事件
+        """
+        if not event_id:
+            return False
+        digest = hashlib.blake2b(event_id.encode("utf-8"), digest_size=16).digest()
+        exact_key = int.from_bytes(digest[:8], "big")
+        now = time.monotonic()
+        with self._lock:
+            self._rotate(now)
+            self.checked += 1
+            if digest in self._current or digest in self._previous:
+                if exact_key in self._exact:
+                    self.duplicates += 1
+                    return True
+                self.unconfirmed += 1
+            self._current.add(digest)
+            self._exact.add(exact_key, int(now * 1000))
+            if self.backend is None:
+                return False
+
+        # 本機沒見過的事件可能已由其他實例處理；在鎖外呼叫後端，避免網路延遲阻塞其他請求
+        return self._claimed_elsewhere(event_id)
+
+    def _claimed_elsewhere(self, event_id: str) -> bool:
+        """以共用後端原子性地登記事件，已被其他實例登記時回傳 True；後端失敗時視為新事件"""
+        shared_digest = make_digest(event_id, _EVENT_DIGEST_KEY)
+        try:
+            # TTL 為兩個時間窗，與本機 Bloom filter 記住的最長範圍相同
+            claimed = self.backend.claim_many([shared_digest], int(2 * self.window_seconds * 1000))[0]
+        except Exception as error:
+            logging.warning(f"共用後端確認事件失敗，視為新事件: {error}")
+            with self._lock:
+                self.backend_errors += 1
+            return False
+        if claimed:
+            return False
+        with self._lock:
+            self.duplicates += 1
+            self.shared_duplicates += 1
+        return True
+
+    def get_stats(self) -> dict:
+        """
+        取得統計資訊
+
+        Returns:
+            dict: 包含檢查的事件數、重複的事件數、Bloom filter 命中但精確集合未確認的次數、輪替次數與固定的記憶體用量
+        """
+        with self._lock:
+            self._rotate(time.monotonic())
+            return {
+                "checked": self.checked,
+                "duplicates": self.duplicates,
+                "unconfirmed": self.unconfirmed,
+                "rotations": self.rotations,
+                "shared_backend": self.backend.name if self.backend else None,
+                "shared_duplicates": self.shared_duplicates,
+                "backend_errors": self.backend_errors,
+                "window_seconds": self.window_seconds,
+                "current_window_events": self._current.count,
+                "exact_entries": len(self._exact),
+                "bloom_bytes": self._current.memory_bytes + self._previous.memory_bytes,
+                "exact_capacity": self._exact.capacity,
+            }
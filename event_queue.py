@@ -0,0 +1,146 @@
+# event_queue.py - LINE 事件的行程內背景工作佇列（先回應 200，再背景翻譯）
+import logging
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+
+class EventWorkQueue:
+    """有界的行程內工作佇列，由固定數量的背景執行緒處理 LINE 事件
+
+    Callback 端點只負責驗證簽章並將事件放入佇列，即可立即回應 LINE。
+    注意：佇列存在於行程記憶體中，Functions 主機回收 worker 時尚未處理的事件會遺失。
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List, str], None],
+        max_size: int = 100,
+        workers: int = 4,
+    ):
+        """
+        初始化工作佇列
+
+        Args:
+            handler: 實際處理事件的函式，簽名為 handler(events, request_id)
+            max_size: 佇列容量，佇列滿時新的工作會被捨棄
+            workers: 背景執行緒數量
+        """
+        self.handler = handler
+        self.max_size = max(1, max_size)
+        self.workers = max(1, workers)
+        self.logger = logging.getLogger(__name__)
+
+        self._queue: "queue.Queue[Tuple[List, str, float]]" = queue.Queue(maxsize=self.max_size)
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.max_depth = 0
+        self._dequeued = 0
+        self._wait_total_ms = 0.0
+        self._wait_max_ms = 0.0
+
+    def _ensure_started(self) -> None:
+        if self._threads:
+            return
+        with self._start_lock:
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(
+                        target=self._worker_loop, name=f"line-event-worker-{i}", daemon=True
+                    )
+                    thread.start()
+                    self._threads.append(thread)
+
+    def submit(self, events: List, request_id: str) -> bool:
+        """
+        將事件放入佇列
+
+        Args:
+            events: 已解析的 LINE 事件
+            request_id: 請求 ID（用於日誌）
+
+        Returns:
+            bool: True 如果成功放入佇列，False 如果佇列已滿而被捨棄
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((events, request_id, time.monotonic()))
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            self.logger.error(f"[{request_id}] 事件佇列已滿（{self.max_size}），捨棄 {len(events)} 個事件")
+            return False
+
+        with self._stats_lock:
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def _worker_loop(self) -> None:
+        while True:
+            events, request_id, enqueued_at = self._queue.get()
+            wait_ms = (time.monotonic() - enqueued_at) * 1000
+            with self._stats_lock:
+                self._dequeued += 1
+                self._wait_total_ms += wait_ms
+                self._wait_max_ms = max(self._wait_max_ms, wait_ms)
+
+            try:
+                self.handler(events, request_id)
+                with self._stats_lock:
+                    self.processed += 1
+            except Exception as e:
+                with self._stats_lock:
+                    self.failed += 1
+                self.logger.error(f"[{request_id}] 背景事件處理失敗: {e}")
+            finally:
+                self._queue.task_done()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待佇列中的工作處理完畢
+
+        Args:
+            timeout: 最長等待秒數，None 表示一直等待
+
+        Returns:
+            bool: True 如果佇列已清空
+        """
+        if timeout is None:
+            self._queue.join()
+            return True
+
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def get_stats(self) -> dict:
+        """
+        取得統計資訊
+
+        Returns:
+            dict: 包含佇列深度、等待時間與捨棄次數的字典
+        """
+        with self._stats_lock:
+            return {
+                "depth": self._queue.qsize(),
+                "max_depth": self.max_depth,
+                "capacity": self.max_size,
+                "workers": self.workers,
+                "enqueued": self.enqueued,
+                "processed": self.processed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "avg_wait_ms": round(self._wait_total_ms / self._dequeued, 2) if self._dequeued else 0.0,
+                "max_wait_ms": round(self._wait_max_ms, 2),
+            }
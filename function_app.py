@@ -8,20 +8,20 @@ import traceback
 from datetime import datetime
 import uuid
 import base64
+import contextvars
 import hashlib
 import hmac
 import os
 import re
 import sys
 import time
-from typing import Dict, List, Optional
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
 
 from bs4 import BeautifulSoup
 from linebot.v3.exceptions import InvalidSignatureError
 from linebot.v3.messaging import (
-    ApiClient,
-    Configuration,
-    MessagingApi,
     PushMessageRequest,
     ReplyMessageRequest,
     FlexMessage,
@@ -54,17 +54,51 @@ except ImportError:
     class SimpleReplyTokenManager:
         def is_token_used(self, token): return False
         def mark_token_used(self, token, request_id=None): return True
+        def try_claim(self, token, request_id=None): return True
         def is_test_token(self, token): return token in ['test_reply_token', 'mock_reply_token']
         def get_stats(self): return {}
     reply_token_manager = SimpleReplyTokenManager()
 
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from deadline_scheduler import EarliestDeadlineExecutor
+from event_deduplicator import EventDeduplicator
+from event_queue import EventWorkQueue
+from glossary import Glossary
+from language_detector import LanguageDetection, detect_language, is_chinese_language
+from line_client import get_line_client
+from message_classifier import MessageClassifierStats, classify_untranslatable
+from model_router import ModelRouter, ModelTier, estimate_complexity, parse_tiers
+from prompt_templates import (
+    BATCH_PROMPTS,
+    STYLE_INSTRUCTIONS,
+    build_user_prompt,
+    get_prompt_template,
+    make_direction,
+    split_direction,
+)
+from request_hedging import RequestHedger
+from singleflight import SingleFlight
+from text_chunker import pack_text_messages, split_into_chunks
+from text_masking import MaskedText, mask_text, pin_spans, unmask_text
+from token_estimator import TokenEstimator
+from translation_cache import TranslationCache
+from translation_memory import TranslationMemory
+
 try:
-    from openai import OpenAI
+    from openai import APITimeoutError, OpenAI
 except ImportError as exc:
     raise ImportError(
         "The 'openai' package is required. Add it to requirements.txt and install via pip."
     ) from exc
 
+# _send_reply 的結果
+REPLY_SENT = "sent"
+REPLY_TOKEN_REJECTED = "token_rejected"
+REPLY_FAILED = "failed"
+
+# 目前處理中訊息的回覆 token 期限（epoch 秒），供模型路由判斷剩餘時間
+_reply_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("reply_deadline", default=None)
+
 # 創建 Azure Functions 應用程式
 app = func.FunctionApp()
 
@@ -87,6 +121,78 @@ class EnvironmentConfig:
             self.verify_token = self._get_required_env("FLOW_VERIFY_TOKEN")
             self.openai_api_key = self._get_required_env("OPENAI_API_KEY")
             self.openai_model = os.getenv("OPENAI_MODEL", "gpt-4o")
+            # 單次 OpenAI 請求的逾時秒數（亦不超過回覆 token 的剩餘時間）
+            self.openai_timeout_seconds = self._get_int_env("OPENAI_TIMEOUT_SECONDS", 30)
+            # 斷路器：連續失敗（或超過 CIRCUIT_SLOW_CALL_MS 的呼叫）達到門檻時暫停呼叫，冷卻後試探恢復
+            self.circuit_failure_threshold = self._get_int_env("CIRCUIT_FAILURE_THRESHOLD", 5)
+            self.circuit_slow_call_ms = self._get_int_env("CIRCUIT_SLOW_CALL_MS", 15000)
+            self.circuit_reset_seconds = self._get_int_env("CIRCUIT_RESET_SECONDS", 30)
+            # 備援後端：未設定模型時停用；網址與金鑰未設定時沿用主要的 OpenAI 設定
+            self.openai_fallback_model = os.getenv("OPENAI_FALLBACK_MODEL", "").strip()
+            self.openai_fallback_base_url = os.getenv("OPENAI_FALLBACK_BASE_URL", "").strip()
+            self.openai_fallback_api_key = os.getenv("OPENAI_FALLBACK_API_KEY", "").strip()
+            
+            # 翻譯快取配置
+            self.translation_cache_size = self._get_int_env("TRANSLATION_CACHE_SIZE", 1000)
+            self.translation_cache_ttl = self._get_int_env("TRANSLATION_CACHE_TTL_SECONDS", 86400)
+            # 翻譯記憶（持久化）配置，未設定路徑時停用
+            self.translation_memory_path = os.getenv("TRANSLATION_MEMORY_PATH", "").strip()
+            self.translation_memory_max_entries = self._get_int_env("TRANSLATION_MEMORY_MAX_ENTRIES", 50000)
+            # 分段翻譯：超過字元數的訊息依段落與行切開並行翻譯
+            self.translation_chunk_size = self._get_int_env("TRANSLATION_CHUNK_SIZE", 1000)
+            self.translation_chunk_parallelism = self._get_int_env("TRANSLATION_CHUNK_PARALLELISM", 4)
+            # token 預算：單次請求的輸出上限，以及可接受的最大輸入 token 數
+            self.translation_max_completion_tokens = self._get_int_env("TRANSLATION_MAX_COMPLETION_TOKENS", 4096)
+            self.translation_max_input_tokens = self._get_int_env("TRANSLATION_MAX_INPUT_TOKENS", 8000)
+            # 逐行快取：行數達到門檻的訊息只翻譯未快取過的行，0 表示停用
+            self.line_cache_min_lines = self._get_int_env("LINE_CACHE_MIN_LINES", 3)
+            # 翻譯前以佔位符取代網址、@提及與 LINE 表情符號標記，縮短 prompt 並避免網址被改寫
+            self.translation_masking = os.getenv("TRANSLATION_MASKING", "true").lower() == "true"
+            # 詞彙表：未設定路徑時停用；hint 以 prompt 提示指定譯名，placeholder 直接以佔位符固定譯名
+            self.glossary_path = os.getenv("GLOSSARY_PATH", "").strip()
+            self.glossary_mode = os.getenv("GLOSSARY_MODE", "hint").strip().lower()
+            if self.glossary_mode not in ("hint", "placeholder"):
+                logging.warning(f"GLOSSARY_MODE 無效: {self.glossary_mode}，使用預設值 hint")
+                self.glossary_mode = "hint"
+            # 模型路由：依 token 數、複雜度與剩餘回覆時間選擇模型層級（JSON 陣列，由快到慢）
+            self.translation_model_tiers = parse_tiers(os.getenv("TRANSLATION_MODEL_TIERS", ""), self.openai_model)
+            self.router_low_budget_seconds = self._get_int_env("TRANSLATION_ROUTER_LOW_BUDGET_SECONDS", 10)
+            # 對沖請求：第一個請求超過延遲百分位數仍未完成時送出備援請求（可指定備援模型）
+            self.openai_hedging = os.getenv("OPENAI_HEDGING", "false").lower() == "true"
+            self.hedge_percentile = self._get_int_env("HEDGE_PERCENTILE", 95)
+            self.hedge_default_delay_ms = self._get_int_env("HEDGE_DEFAULT_DELAY_MS", 3000)
+            self.hedge_model = os.getenv("HEDGE_MODEL", "").strip()
+            # 回覆 token 自事件發生起可用的秒數；逾期或 token 被拒時改用 push 發送
+            self.reply_token_budget_seconds = self._get_int_env("REPLY_TOKEN_BUDGET_SECONDS", 50)
+            self.reply_push_fallback = os.getenv("REPLY_PUSH_FALLBACK", "true").lower() == "true"
+            # 翻譯風格（strict / casual），對應預先產生的 prompt
+            self.translation_style = os.getenv("TRANSLATION_STYLE", "strict").strip().lower()
+            if self.translation_style not in STYLE_INSTRUCTIONS:
+                logging.warning(f"TRANSLATION_STYLE 無效: {self.translation_style}，使用預設值 strict")
+                self.translation_style = "strict"
+            
+            # LINE API 共用連線池大小
+            self.line_connection_pool_size = self._get_int_env("LINE_CONNECTION_POOL_SIZE", 10)
+            
+            # 單次 webhook 內的事件並行翻譯數量
+            self.event_concurrency = self._get_int_env("EVENT_CONCURRENCY", 5)
+            # 批次翻譯：同一次 webhook 的多則訊息合併為單一 OpenAI 請求
+            self.translation_batch_mode = os.getenv("TRANSLATION_BATCH_MODE", "false").lower() == "true"
+            # 只有網址、表情符號、數字、@提及或標點的訊息不送翻譯：skip 不回覆，echo 原文回覆
+            self.untranslatable_action = os.getenv("UNTRANSLATABLE_ACTION", "skip").strip().lower()
+            if self.untranslatable_action not in ("skip", "echo"):
+                logging.warning(f"UNTRANSLATABLE_ACTION 無效: {self.untranslatable_action}，使用預設值 skip")
+                self.untranslatable_action = "skip"
+            
+            # 背景處理配置：啟用後 callback 只驗證簽章並將事件放入佇列，立即回應 LINE
+            self.async_processing = os.getenv("LINE_ASYNC_PROCESSING", "false").lower() == "true"
+            self.event_queue_size = self._get_int_env("EVENT_QUEUE_SIZE", 100)
+            self.event_queue_workers = self._get_int_env("EVENT_QUEUE_WORKERS", 4)
+            
+            # 依 webhookEventId 捨棄 LINE 重送的事件（重送時 reply token 會改變，無法以 token 去重）
+            self.event_dedup = os.getenv("EVENT_DEDUP", "true").lower() == "true"
+            self.event_dedup_window_seconds = self._get_int_env("EVENT_DEDUP_WINDOW_SECONDS", 3600)
+            self.event_dedup_capacity = self._get_int_env("EVENT_DEDUP_CAPACITY", 100000)
             
             # 測試模式配置
             self.test_mode = os.getenv("LINE_TEST_MODE", "false").lower() == "true"
@@ -108,6 +214,17 @@ class EnvironmentConfig:
             raise ValueError(f"必要的環境變數 {key} 未設定或為空值")
         return value
     
+    def _get_int_env(self, key: str, default: int) -> int:
+        """取得整數型態的選用環境變數，格式錯誤時使用預設值"""
+        value = os.getenv(key)
+        if value is None or not value.strip():
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            logging.warning(f"環境變數 {key} 不是有效的整數: {value}，改用預設值 {default}")
+            return default
+    
     def _clean_target_id(self) -> str:
         """清理 TARGET_ID，移除引號和註解"""
         target_id_raw = os.getenv("TARGET_ID", "").strip()
@@ -124,8 +241,11 @@ class TeamsWebhookHandler:
     
     def __init__(self, config: EnvironmentConfig):
         self.config = config
-        self.line_config = Configuration(access_token=config.line_access_token)
-        self.line_api = MessagingApi(ApiClient(self.line_config))
+        self.line_client = get_line_client(
+            config.line_access_token, pool_size=config.line_connection_pool_size
+        )
+        self.line_config = self.line_client.configuration
+        self.line_api = self.line_client.messaging_api
     
     def extract_meeting_info(self, payload: dict) -> dict:
         """從 Teams JSON 取會議主題、時間與 Join URL"""
@@ -211,139 +331,824 @@ class TranslationBotHandler:
     
     def __init__(self, config: EnvironmentConfig):
         self.config = config
-        self.line_config = Configuration(access_token=config.line_access_token)
+        self.line_client = get_line_client(
+            config.line_access_token, pool_size=config.line_connection_pool_size
+        )
+        self.line_config = self.line_client.configuration
         self.parser = WebhookParser(config.line_channel_secret)
-        self.openai_client = OpenAI(api_key=config.openai_api_key)
+        # 不讓 SDK 自行重試（預設 2 次，逾時也會重試），否則單次呼叫可能耗時約 3 倍逾時秒數；
+        # 失敗交給斷路器與備援後端處理
+        self.openai_client = OpenAI(
+            api_key=config.openai_api_key, timeout=config.openai_timeout_seconds, max_retries=0
+        )
+        # 備援後端：有設定網址或金鑰時使用獨立的 client，否則以同一個 client 呼叫備援模型
+        self.fallback_openai_client = (
+            OpenAI(
+                api_key=config.openai_fallback_api_key or config.openai_api_key,
+                base_url=config.openai_fallback_base_url or None,
+                timeout=config.openai_timeout_seconds,
+                max_retries=0,
+            )
+            if config.openai_fallback_model and (config.openai_fallback_base_url or config.openai_fallback_api_key)
+            else None
+        )
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=config.circuit_failure_threshold,
+            slow_call_ms=config.circuit_slow_call_ms,
+            reset_timeout_seconds=config.circuit_reset_seconds,
+        )
+        self.fallback_stats = {"requests": 0, "failures": 0}
+        self.translation_cache = TranslationCache(
+            max_entries=config.translation_cache_size,
+            ttl_seconds=config.translation_cache_ttl,
+        )
+        self.translation_memory = (
+            TranslationMemory(
+                config.translation_memory_path,
+                max_entries=config.translation_memory_max_entries,
+            )
+            if config.translation_memory_path else None
+        )
+        # 依回覆 token 期限排序：最早到期的事件最先翻譯
+        self.event_executor = EarliestDeadlineExecutor(
+            max_workers=max(1, config.event_concurrency),
+            thread_name_prefix="translation-event",
+        )
+        self.delivery_stats = {"reply": 0, "push_expired": 0, "push_reply_failed": 0, "push_failed": 0, "dropped": 0}
+        self.batch_stats = {"requests": 0, "messages": 0, "failures": 0, "fallbacks": 0}
+        # 分段翻譯使用獨立的執行緒池，避免與事件處理的執行緒池互相等待
+        self.chunk_executor = ThreadPoolExecutor(
+            max_workers=max(1, config.translation_chunk_parallelism),
+            thread_name_prefix="translation-chunk",
+        )
+        self.token_estimator = TokenEstimator(
+            config.openai_model,
+            max_completion_tokens=config.translation_max_completion_tokens,
+        )
+        self.singleflight = SingleFlight()
+        self.line_cache_stats = {"messages": 0, "lines": 0, "cached_lines": 0, "mismatches": 0}
+        self.fast_path_stats = MessageClassifierStats()
+        self.glossary = Glossary(config.glossary_path) if config.glossary_path else None
+        self.hedger = (
+            RequestHedger(
+                percentile=config.hedge_percentile,
+                default_delay_ms=config.hedge_default_delay_ms,
+            )
+            if config.openai_hedging else None
+        )
+        self.model_router = ModelRouter(
+            config.translation_model_tiers, low_budget_seconds=config.router_low_budget_seconds
+        )
+        self.masking_stats = {"messages": 0, "placeholders": 0, "chars_saved": 0, "dropped": 0, "duplicated": 0}
+        self.event_deduplicator = (
+            EventDeduplicator(
+                window_seconds=config.event_dedup_window_seconds,
+                capacity=config.event_dedup_capacity,
+                backend=getattr(reply_token_manager, "backend", None),
+            )
+            if config.event_dedup else None
+        )
     
-    def is_chinese(self, text: str) -> bool:
-        """判斷文字是否包含中文字元"""
-        for char in text:
-            code = ord(char)
-            if 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF:
-                return True
-        return False
+    def detect_language(self, text: str) -> LanguageDetection:
+        """依文字系統比例判斷訊息語言與信心值"""
+        return detect_language(text)
     
-    def _build_prompts(self, message_text: str) -> tuple[str, str]:
-        """根據語言方向產生 system / user 兩段 prompt"""
-        is_zh = self.is_chinese(message_text)
-
-        lang_inst = (
-            "Translate the text from Traditional Chinese to fluent English."
-            if is_zh else
-            "Translate the text from English to fluent Traditional Chinese."
+    def _translation_direction(self, message_text: str) -> str:
+        """判斷翻譯方向：以中文為主的訊息翻成英文，其餘翻成繁體中文"""
+        language = detect_language(message_text).language
+        target = "en" if is_chinese_language(language) else "zh-Hant"
+        return make_direction(language, target)
+    
+    def _build_prompts(
+        self,
+        message_text: str,
+        direction: Optional[str] = None,
+        glossary: Optional[Dict[str, str]] = None,
+    ) -> tuple[str, str]:
+        """根據語言方向取出預先產生的 system prompt，並產生 user prompt（可附上詞彙表提示）"""
+        source, target = split_direction(direction or self._translation_direction(message_text))
+        template = get_prompt_template(source, target, self.config.translation_style)
+        return template.system_prompt, build_user_prompt(message_text, glossary)
+
+    def _build_batch_prompts(
+        self,
+        message_texts: List[str],
+        glossaries: Optional[List[Optional[Dict[str, str]]]] = None,
+        directions: Optional[List[str]] = None,
+    ) -> tuple[str, str]:
+        """產生批次翻譯的 system / user prompt（JSON 陣列輸入、JSON 物件輸出）"""
+        items = []
+        for i, text in enumerate(message_texts):
+            direction = directions[i] if directions else self._translation_direction(text)
+            item = {
+                "id": i,
+                "to": split_direction(direction)[1],
+                "text": text.strip(),
+            }
+            if glossaries and glossaries[i]:
+                item["glossary"] = glossaries[i]
+            items.append(item)
+        user_prompt = json.dumps(items, ensure_ascii=False)
+        return BATCH_PROMPTS[self.config.translation_style], user_prompt
+
+    def _parse_batch_response(self, content: str, expected: int) -> Dict[int, str]:
+        """驗證批次翻譯輸出，回傳 id → 翻譯；格式不正確的項目不會出現在結果中"""
+        data = json.loads(content)
+        entries = data.get("translations") if isinstance(data, dict) else data
+        if not isinstance(entries, list):
+            raise ValueError("批次翻譯輸出缺少 translations 陣列")
+
+        results = {}
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            index, text = entry.get("id"), entry.get("text")
+            if (
+                isinstance(index, int) and 0 <= index < expected
+                and index not in results
+                and isinstance(text, str) and text.strip()
+            ):
+                results[index] = text.strip()
+        return results
+
+    def translate_batch(self, message_texts: List[str], request_id: str) -> List[str]:
+        """以單一 OpenAI 請求翻譯多則訊息
+        
+        快取命中的訊息不會送出，相同訊息只翻譯一次；批次輸出格式錯誤或缺漏的項目改為逐則翻譯。
+        """
+        results: List[Optional[str]] = [None] * len(message_texts)
+        cache_keys = [self._translation_cache_key(text) for text in message_texts]
+        pending: Dict[str, List[int]] = {}
+        for i, cache_key in enumerate(cache_keys):
+            cached = self._lookup_translation(cache_key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.setdefault(cache_key, []).append(i)
+
+        if not pending:
+            logging.info(f"[{request_id}] 批次翻譯全部命中快取")
+            return results
+
+        unique_indices = [indices[0] for indices in pending.values()]
+        batch_texts = [message_texts[i] for i in unique_indices]
+        translated: Dict[int, str] = {}
+        batch_model = None
+        directions = [self._translation_direction(text) for text in batch_texts]
+        prepared = [self._prepare_source(text, direction) for text, direction in zip(batch_texts, directions)]
+        masks = [mask for mask, _ in prepared]
+
+        # JSON 結構的額外輸出 token
+        batch_max_tokens = sum(
+            self.token_estimator.max_tokens_for(mask.text, direction) + 20
+            for mask, direction in zip(masks, directions)
         )
+        if len(batch_texts) > 1 and batch_max_tokens <= self.token_estimator.max_completion_tokens:
+            system_prompt, user_prompt = self._build_batch_prompts(
+                [mask.text for mask in masks], [glossary for _, glossary in prepared], directions
+            )
+            estimated_prompt = self.token_estimator.estimate_prompt_tokens(system_prompt, user_prompt)
+            tier = self.model_router.route(
+                sum(self.token_estimator.count_tokens(mask.text) for mask in masks),
+                max(self._complexity(mask.text, glossary) for mask, glossary in prepared),
+                self._remaining_seconds(),
+            )
+            try:
+                response = self._create_completion(
+                    tier,
+                    request_id,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user",   "content": user_prompt},
+                    ],
+                    temperature=0.0,
+                    top_p=1.0,
+                    max_tokens=batch_max_tokens,
+                    response_format={"type": "json_object"},
+                )
+                batch_model = tier.model
+                self.token_estimator.record_usage(estimated_prompt, batch_max_tokens, response)
+                translated = {
+                    position: self._unmask(translation, masks[position], request_id)
+                    for position, translation in self._parse_batch_response(
+                        response.choices[0].message.content, len(batch_texts)
+                    ).items()
+                }
+                self.batch_stats["requests"] += 1
+                self.batch_stats["messages"] += len(translated)
+                logging.info(f"[{request_id}] 批次翻譯完成: {len(translated)}/{len(batch_texts)} 則")
+            except Exception as exc:
+                self.batch_stats["failures"] += 1
+                logging.warning(f"[{request_id}] 批次翻譯失敗，改為逐則翻譯: {exc}")
 
-        system_prompt = (
-            "You are a STRICT translator.\n"
-            f"{lang_inst}\n"
-            "Rules:\n"
-            "1. Only translate the text between <source> and </source>.\n"
-            "2. Preserve line breaks; one output line per input line.\n"
-            "3. Keep every URL (any string containing 'http' or 'https') exactly as‑is.\n"
-            "4. Do NOT add, delete, reorder, summarise or explain anything.\n"
-            "5. Return ONLY the translation, with no extra commentary."
+        # 批次的所有訊息由同一個模型翻譯，依該模型寫入快取（可能與逐則翻譯時選擇的模型不同）
+        for position, translation in translated.items():
+            self._remember_translation(self._translation_cache_key(batch_texts[position], batch_model), translation)
+
+        fallback_positions = [pos for pos in range(len(batch_texts)) if pos not in translated]
+        if fallback_positions:
+            if len(batch_texts) > 1:
+                self.batch_stats["fallbacks"] += len(fallback_positions)
+            deadline = _reply_deadline.get()
+            fallback_results = self.event_executor.map(
+                lambda pos: self._run_with_deadline(deadline, self.translate_message, batch_texts[pos], request_id),
+                fallback_positions,
+            )
+            translated.update(zip(fallback_positions, fallback_results))
+
+        for position, indices in enumerate(pending.values()):
+            for i in indices:
+                results[i] = translated[position]
+        return results
+
+    def _cache_namespace(self, model: str) -> str:
+        """快取鍵的命名空間：產生譯文的模型名稱，加上詞彙表版本（詞彙表更新後舊的翻譯不再使用）"""
+        if self.glossary is None:
+            return model
+        return f"{model}|glossary:{self.glossary.version}"
+
+    def _translation_cache_key(self, message_text: str, model: Optional[str] = None) -> str:
+        """產生訊息的翻譯快取鍵；省略 model 時使用路由為這則訊息選擇的模型"""
+        return self.translation_cache.make_key(
+            self._cache_namespace(model or self._route(message_text).model),
+            self._translation_direction(message_text),
+            message_text,
         )
 
-        user_prompt = f"<source>\n{message_text.strip()}\n</source>"
-        return system_prompt, user_prompt
+    def _route(self, message_text: str) -> ModelTier:
+        """依遮罩後的 token 數、複雜度與剩餘回覆時間，選擇整則訊息使用的模型層級"""
+        tiers = self.model_router.tiers
+        if len(tiers) == 1:
+            return tiers[0]
+        masked = mask_text(message_text).text if self.config.translation_masking else message_text
+        glossary_terms = 0
+        if self.glossary is not None and self.config.glossary_mode != "placeholder":
+            glossary_terms = len(self.glossary.find_terms(masked))
+        return self.model_router.route(
+            self.token_estimator.count_tokens(masked),
+            estimate_complexity(masked, detect_language(masked).confidence, glossary_terms),
+            self._remaining_seconds(),
+        )
+
+    def _lookup_translation(self, cache_key: str) -> Optional[str]:
+        """依序查詢記憶體快取與持久化翻譯記憶"""
+        cached = self.translation_cache.get(cache_key)
+        if cached is None and self.translation_memory is not None:
+            cached = self.translation_memory.get(cache_key)
+            if cached is not None:
+                self.translation_cache.set(cache_key, cached)
+        return cached
+
+    def _remember_translation(self, cache_key: str, translation: str) -> None:
+        """寫入記憶體快取，並非同步寫回持久化翻譯記憶"""
+        self.translation_cache.set(cache_key, translation)
+        if self.translation_memory is not None:
+            self.translation_memory.put(cache_key, translation)
 
     def translate_message(self, message_text: str, request_id: str) -> str:
         """翻譯訊息（加強約束版）"""
-        system_prompt, user_prompt = self._build_prompts(message_text)
+        # 先決定模型，快取鍵與 singleflight 鍵都以實際產生譯文的模型區分
+        tier = self._route(message_text)
+        cache_key = self._translation_cache_key(message_text, tier.model)
+        cached = self._lookup_translation(cache_key)
+        if cached is not None:
+            logging.info(f"[{request_id}] 翻譯快取命中")
+            return cached
 
-        try:
-            response = self.openai_client.chat.completions.create(
-                model=self.config.openai_model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user",   "content": user_prompt},
-                ],
-                temperature=0.0,
-                top_p=1.0,
-                # 預估輸出長度：原文字元數 ×1.5 足夠，又能防暴衝
-                max_tokens=int(len(message_text) * 1.5),
-                presence_penalty=0,
-                frequency_penalty=0,
+        # 相同內容的翻譯正在進行時，等待並共用同一次 OpenAI 呼叫的結果
+        return self.singleflight.do(
+            cache_key, lambda: self._request_translation(message_text, cache_key, request_id, tier)
+        )
+
+    def _request_translation(
+        self, message_text: str, cache_key: str, request_id: str, tier: Optional[ModelTier] = None
+    ) -> str:
+        """呼叫 OpenAI 翻譯訊息並寫入快取"""
+        input_tokens = self.token_estimator.count_tokens(message_text)
+        if input_tokens > self.config.translation_max_input_tokens:
+            logging.warning(
+                f"[{request_id}] 訊息過長（約 {input_tokens} tokens，上限 "
+                f"{self.config.translation_max_input_tokens}），不送出翻譯"
             )
-            return response.choices[0].message.content.strip()
+            return "訊息過長，無法翻譯。"
+
+        try:
+            translation = self._translate_text(message_text, request_id, tier=tier)
+            self._remember_translation(cache_key, translation)
+            return translation
+        except CircuitOpenError:
+            logging.warning(f"[{request_id}] OpenAI 斷路器開啟中，不送出翻譯")
+            return "翻譯服務暫時無法使用，請稍後再試。"
         except Exception as exc:
             logging.error(f"[{request_id}] OpenAI 翻譯錯誤: {exc}")
             return "發生錯誤，無法翻譯此訊息。"
 
+    def _translate_text(
+        self, message_text: str, request_id: str, direction: Optional[str] = None, tier: Optional[ModelTier] = None
+    ) -> str:
+        """依訊息長度選擇分段並行、逐行快取或整則翻譯，失敗時拋出例外
+
+        指定 tier 時所有片段都使用同一個模型，與整則訊息的快取鍵一致。
+        """
+        direction = direction or self._translation_direction(message_text)
+        if len(message_text.strip()) > self.config.translation_chunk_size:
+            return self._translate_chunks(
+                message_text, request_id, direction, self.config.translation_chunk_size, tier
+            )
+        if not self.token_estimator.fits(message_text, direction):
+            # 字元數未超過分段門檻，但預估譯文會超過單次輸出上限（例如密集的 CJK 文字），依比例縮小片段
+            estimated = self.token_estimator.estimate_completion_tokens(message_text, direction)
+            chunk_size = max(1, int(len(message_text) * self.token_estimator.max_completion_tokens / estimated * 0.8))
+            return self._translate_chunks(message_text, request_id, direction, chunk_size, tier)
+        if self._use_line_cache(message_text):
+            return self._translate_lines(message_text, request_id, direction, tier)
+        return self._complete_translation(message_text, request_id, direction, tier)
+
+    def _translate_chunks(
+        self, message_text: str, request_id: str, direction: str, chunk_size: int,
+        tier: Optional[ModelTier] = None,
+    ) -> str:
+        """將超長訊息依段落與行切開，並行翻譯各片段後依原順序組回"""
+        chunks = split_into_chunks(message_text, chunk_size)
+        logging.info(f"[{request_id}] 長訊息分成 {len(chunks)} 段並行翻譯")
+
+        def translate_chunk(chunk: str) -> str:
+            if self._use_line_cache(chunk):
+                return self._translate_lines(chunk, request_id, direction, tier)
+            return self._complete_translation(chunk, request_id, direction, tier)
+
+        deadline = _reply_deadline.get()
+        translations = list(self.chunk_executor.map(
+            lambda chunk: self._run_with_deadline(deadline, translate_chunk, chunk),
+            [chunk for chunk, _ in chunks],
+        ))
+
+        parts = []
+        for translation, (_, separator) in zip(translations, chunks):
+            # 超長單行被切開時以空白相接；翻成中文時不需要空白
+            if separator == " " and split_direction(direction)[1].startswith("zh"):
+                separator = ""
+            parts.append(translation + separator)
+        return "".join(parts)
+
+    def _complete_translation(
+        self, message_text: str, request_id: str, direction: Optional[str] = None, tier: Optional[ModelTier] = None
+    ) -> str:
+        """呼叫 OpenAI 翻譯文字，失敗時拋出例外；未指定 tier 時依這段文字選擇模型"""
+        direction = direction or self._translation_direction(message_text)
+        masked, glossary = self._prepare_source(message_text, direction)
+        system_prompt, user_prompt = self._build_prompts(masked.text, direction, glossary)
+        # 依 tokenizer 估算譯文長度，取緊湊但不會截斷的輸出上限
+        max_tokens = self.token_estimator.max_tokens_for(masked.text, direction)
+        estimated_prompt = self.token_estimator.estimate_prompt_tokens(system_prompt, user_prompt)
+        if tier is None:
+            tier = self.model_router.route(
+                self.token_estimator.count_tokens(masked.text),
+                self._complexity(masked.text, glossary),
+                self._remaining_seconds(),
+            )
+
+        response = self._create_completion(
+            tier,
+            request_id,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user",   "content": user_prompt},
+            ],
+            temperature=0.0,
+            top_p=1.0,
+            max_tokens=max_tokens,
+            presence_penalty=0,
+            frequency_penalty=0,
+        )
+        self.token_estimator.record_usage(estimated_prompt, max_tokens, response)
+        return self._unmask(response.choices[0].message.content.strip(), masked, request_id)
+
+    def _complexity(self, masked_text: str, glossary: Optional[Dict[str, str]]) -> float:
+        """估算遮罩後文字的翻譯難度，供模型路由使用"""
+        return estimate_complexity(
+            masked_text,
+            detect_language(masked_text).confidence,
+            len(glossary) if glossary else 0,
+        )
+
+    def _request_timeout(self) -> float:
+        """單次 OpenAI 請求的逾時秒數：不超過設定值，也不超過回覆 token 的剩餘時間"""
+        timeout = float(self.config.openai_timeout_seconds)
+        remaining = self._remaining_seconds()
+        if remaining is not None and remaining > 0:
+            timeout = max(1.0, min(timeout, remaining))
+        return timeout
+
+    def _create_completion(self, tier: ModelTier, request_id: str, **kwargs):
+        """以指定層級的模型呼叫 OpenAI（啟用對沖時可能送出備援請求），並記錄延遲與成本
+        
+        斷路器開啟時不呼叫主要模型，改用備援後端；未設定備援後端時拋出 CircuitOpenError。
+        """
+        kwargs.setdefault("timeout", self._request_timeout())
+        # 逾時秒數因回覆期限而縮短時，逾時反映的是事件太晚，而不是 OpenAI 故障
+        deadline_capped = kwargs["timeout"] < float(self.config.openai_timeout_seconds)
+        if not self.circuit_breaker.allow_request():
+            return self._fallback_completion(request_id, CircuitOpenError("OpenAI 斷路器開啟中"), **kwargs)
+
+        started = time.monotonic()
+        try:
+            if self.hedger is None:
+                response = self.openai_client.chat.completions.create(model=tier.model, **kwargs)
+            else:
+                hedge_model = self.config.hedge_model or tier.model
+                response = self.hedger.call(
+                    lambda: self.openai_client.chat.completions.create(model=tier.model, **kwargs),
+                    lambda: self.openai_client.chat.completions.create(model=hedge_model, **kwargs),
+                )
+        except Exception as exc:
+            self.model_router.record(tier, (time.monotonic() - started) * 1000, error=True)
+            if deadline_capped and isinstance(exc, APITimeoutError):
+                self.circuit_breaker.record_inconclusive()
+            else:
+                self.circuit_breaker.record_failure()
+            return self._fallback_completion(request_id, exc, **kwargs)
+        latency_ms = (time.monotonic() - started) * 1000
+        self.circuit_breaker.record_success(latency_ms)
+        cost = self.model_router.record(tier, latency_ms, response)
+        logging.info(f"[{request_id}] 模型 {tier.name}（{tier.model}）耗時 {latency_ms:.0f}ms，估計成本 ${cost:.6f}")
+        return response
+
+    def _fallback_completion(self, request_id: str, error: Exception, **kwargs):
+        """以備援後端呼叫翻譯；未設定備援模型時拋出原本的錯誤"""
+        if not self.config.openai_fallback_model:
+            raise error
+        logging.warning(f"[{request_id}] 主要模型無法使用（{error}），改用備援模型 {self.config.openai_fallback_model}")
+        client = self.fallback_openai_client or self.openai_client
+        self.fallback_stats["requests"] += 1
+        try:
+            return client.chat.completions.create(model=self.config.openai_fallback_model, **kwargs)
+        except Exception:
+            self.fallback_stats["failures"] += 1
+            raise
+
+    def _mask(self, message_text: str) -> MaskedText:
+        """以佔位符取代網址、@提及與 LINE 表情符號標記（停用時原樣回傳）"""
+        if not self.config.translation_masking:
+            return MaskedText(message_text, ())
+        masked = mask_text(message_text)
+        if masked.originals:
+            self.masking_stats["messages"] += 1
+            self.masking_stats["placeholders"] += len(masked.originals)
+            self.masking_stats["chars_saved"] += len(message_text) - len(masked.text)
+        return masked
+
+    def _prepare_source(self, message_text: str, direction: str) -> Tuple[MaskedText, Optional[Dict[str, str]]]:
+        """
+        遮罩訊息並套用詞彙表
+
+        Returns:
+            Tuple[MaskedText, Optional[Dict[str, str]]]: 遮罩後的文字，以及要放進 prompt 的詞彙表提示
+            （placeholder 模式下詞彙直接換成佔位符，不需要提示）
+        """
+        masked = self._mask(message_text)
+        if self.glossary is None:
+            return masked, None
+        matches = self.glossary.find_terms(masked.text)
+        if not matches:
+            return masked, None
+
+        target = split_direction(direction)[1]
+        if self.config.glossary_mode == "placeholder":
+            spans = [(m.start, m.end, self.glossary.translation_for(m.term, target)) for m in matches]
+            return pin_spans(masked, spans), None
+        return masked, {m.term: self.glossary.translation_for(m.term, target) for m in matches}
+
+    def _unmask(self, translation: str, masked: MaskedText, request_id: str) -> str:
+        """還原譯文中的佔位符，並記錄模型遺漏或重複的佔位符"""
+        restored = unmask_text(translation, masked.originals, masked.text)
+        if restored.dropped or restored.duplicated:
+            self.masking_stats["dropped"] += restored.dropped
+            self.masking_stats["duplicated"] += restored.duplicated
+            logging.warning(
+                f"[{request_id}] 譯文佔位符異常：遺漏 {restored.dropped} 個、重複 {restored.duplicated} 個，已修正"
+            )
+        return restored.text
+
+    def _use_line_cache(self, message_text: str) -> bool:
+        """判斷訊息是否夠長，適合逐行快取"""
+        min_lines = self.config.line_cache_min_lines
+        return min_lines > 0 and len(message_text.strip().splitlines()) >= min_lines
+
+    def _line_cache_key(self, line: str, direction: str, model: str) -> str:
+        """產生單行翻譯的快取鍵（與整則訊息的快取鍵分開）"""
+        return self.translation_cache.make_key(self._cache_namespace(model), f"{direction}/line", line)
+
+    def _translate_lines(
+        self, message_text: str, request_id: str, direction: str, tier: Optional[ModelTier] = None
+    ) -> str:
+        """逐行翻譯長訊息：已翻譯過的行直接使用快取，只把新的行送給模型"""
+        lines = message_text.strip().splitlines()
+        # 逐行快取的譯文與送出的模型綁定，整段使用同一個層級
+        tier = tier or self._route(message_text)
+
+        line_keys: Dict[str, str] = {}
+        translated: Dict[str, str] = {}
+        for line in lines:
+            stripped = line.strip()
+            if not stripped or stripped in line_keys:
+                continue
+            line_keys[stripped] = self._line_cache_key(stripped, direction, tier.model)
+            cached = self._lookup_translation(line_keys[stripped])
+            if cached is not None:
+                translated[stripped] = cached
+
+        missing = [line for line in line_keys if line not in translated]
+        self.line_cache_stats["messages"] += 1
+        self.line_cache_stats["lines"] += len(line_keys)
+        self.line_cache_stats["cached_lines"] += len(line_keys) - len(missing)
+        logging.info(f"[{request_id}] 逐行快取: {len(line_keys) - len(missing)}/{len(line_keys)} 行命中")
+
+        if missing:
+            output = self._complete_translation("\n".join(missing), request_id, direction, tier)
+            output_lines = [line.strip() for line in output.split("\n")]
+            if len(output_lines) != len(missing):
+                # 模型沒有遵守逐行對應，改為翻譯整則訊息
+                self.line_cache_stats["mismatches"] += 1
+                logging.warning(
+                    f"[{request_id}] 逐行翻譯行數不符（{len(output_lines)}/{len(missing)}），改為整則翻譯"
+                )
+                return self._complete_translation(message_text, request_id, direction, tier)
+
+            for source_line, translated_line in zip(missing, output_lines):
+                translated[source_line] = translated_line
+                self._remember_translation(line_keys[source_line], translated_line)
+
+        return "\n".join(translated[line.strip()] if line.strip() else "" for line in lines)
+    
+    
+    def _is_text_message_event(self, event) -> bool:
+        """檢查是否為訊息事件和文字訊息 (支援真實事件和模擬事件)"""
+        return (
+            isinstance(event, MessageEvent) and isinstance(event.message, TextMessageContent)
+        ) or (
+            # 模擬事件的檢查
+            hasattr(event, 'type') and event.type == 'message' and 
+            hasattr(event, 'message') and hasattr(event.message, 'type') and 
+            event.message.type == 'text' and hasattr(event.message, 'text')
+        )
+    
+    def _source_key(self, event) -> str:
+        """取得事件來源（群組 / 聊天室 / 使用者），同一來源的回覆需維持順序"""
+        source = getattr(event, 'source', None)
+        for attr in ('group_id', 'room_id', 'user_id'):
+            value = getattr(source, attr, None)
+            if value:
+                return value
+        return "unknown"
+    
+    def drop_duplicate_events(self, events: List, request_id: str) -> List:
+        """
+        捨棄 webhookEventId 已處理過的事件（LINE 重送）
+        
+        Args:
+            events: 已通過簽章驗證的事件
+            request_id: 請求 ID
+            
+        Returns:
+            List: 未處理過的事件；沒有 webhookEventId 的事件一律保留
+        """
+        if self.event_deduplicator is None:
+            return events
+        unique = []
+        for event in events:
+            event_id = getattr(event, "webhook_event_id", None)
+            if event_id and self.event_deduplicator.seen(event_id):
+                redelivery = getattr(getattr(event, "delivery_context", None), "is_redelivery", False)
+                logging.warning(
+                    f"[{request_id}] 捨棄重複的事件 {event_id}" + ("（LINE 重送）" if redelivery else "")
+                )
+                continue
+            unique.append(event)
+        return unique
+    
+    def _claim_reply_token(self, event, request_id: str) -> Optional[str]:
+        """取得和驗證 reply token，成功標記為已使用時回傳 token"""
+        reply_token = getattr(event, 'reply_token', None)
+        if not reply_token:
+            logging.warning(f"[{request_id}] 事件沒有 reply_token，跳過回覆")
+            return None
+        
+        # 檢查是否為測試用的假 token
+        if reply_token_manager.is_test_token(reply_token):
+            logging.warning(f"[{request_id}] 檢測到測試用假 reply token，跳過 LINE API 呼叫: {reply_token}")
+            return None
+        
+        # 檢查並標記為已使用是同一個原子操作，同時處理同一個 token 的執行緒只有一個會取得
+        if not reply_token_manager.try_claim(reply_token, request_id):
+            logging.warning(f"[{request_id}] Reply token 已使用過，跳過重複回覆: {reply_token[:10]}...")
+            return None
+        
+        return reply_token
+    
+    def _send_reply(self, reply_token: str, translation: str, request_id: str) -> str:
+        """發送翻譯回覆（加入錯誤處理）
+        
+        Returns:
+            str: REPLY_SENT、REPLY_TOKEN_REJECTED（token 過期或無效，可改用 push）或 REPLY_FAILED
+        """
+        try:
+            # 使用共用連線池，避免每次回覆都重新建立 TLS 連線
+            self.line_client.messaging_api.reply_message_with_http_info(
+                ReplyMessageRequest(
+                    reply_token=reply_token,
+                    # 長翻譯拆成多則訊息，符合 LINE 單則字數與單次回覆則數的上限
+                    messages=[TextMessage(text=text) for text in pack_text_messages(translation)],
+                )
+            )
+            logging.info(f"[{request_id}] 翻譯回覆發送成功")
+            return REPLY_SENT
+        except Exception as line_error:
+            error_message = str(line_error)
+            logging.error(f"[{request_id}] LINE API 回覆失敗: {error_message}")
+            
+            # 檢查是否為 reply token 相關錯誤
+            if any(keyword in error_message for keyword in ["Invalid reply token", "reply token", "replyToken"]):
+                logging.warning(f"[{request_id}] Reply token 錯誤，可能已過期或已使用: {reply_token[:10]}...")
+                # 不以同一個 reply token 重試，由呼叫端決定是否改用 push
+                return REPLY_TOKEN_REJECTED
+            
+            # 對於其他錯誤，不嘗試重新發送，因為 reply token 已被標記為使用
+            logging.error(f"[{request_id}] 由於 reply token 已使用，無法發送備用錯誤訊息")
+            return REPLY_FAILED
+    
+    def _push_target(self, event) -> Optional[str]:
+        """取得 push 訊息的對象（群組、聊天室或使用者 ID）"""
+        source = getattr(event, "source", None)
+        for attr in ("group_id", "room_id", "user_id"):
+            value = getattr(source, attr, None)
+            if value:
+                return value
+        return None
+    
+    def _push_translation(self, event, translation: str, request_id: str) -> bool:
+        """以 push 訊息將翻譯送到事件來源，成功時回傳 True"""
+        target = self._push_target(event)
+        if not self.config.reply_push_fallback or not target:
+            logging.warning(f"[{request_id}] 無法改用 push 發送翻譯（未啟用或沒有來源 ID）")
+            self.delivery_stats["dropped"] += 1
+            return False
+        try:
+            self.line_client.messaging_api.push_message_with_http_info(
+                PushMessageRequest(
+                    to=target,
+                    messages=[TextMessage(text=text) for text in pack_text_messages(translation)],
+                )
+            )
+            logging.info(f"[{request_id}] 已改用 push 發送翻譯")
+            return True
+        except Exception as push_error:
+            logging.error(f"[{request_id}] LINE API push 失敗: {push_error}")
+            self.delivery_stats["push_failed"] += 1
+            return False
+    
+    def _deliver(self, event, reply_token: str, translation: str, request_id: str) -> None:
+        """送出翻譯：回覆期限內使用 reply token，已逾期或 token 被拒時改用 push"""
+        deadline = self._reply_deadline_for(event)
+        if deadline is not None and time.time() >= deadline:
+            logging.warning(f"[{request_id}] 已超過回覆期限 {time.time() - deadline:.1f} 秒，改用 push")
+            if self._push_translation(event, translation, request_id):
+                self.delivery_stats["push_expired"] += 1
+            return
+        
+        status = self._send_reply(reply_token, translation, request_id)
+        if status == REPLY_SENT:
+            self.delivery_stats["reply"] += 1
+        elif status == REPLY_TOKEN_REJECTED:
+            if self._push_translation(event, translation, request_id):
+                self.delivery_stats["push_reply_failed"] += 1
+    
+    def _reply_translation(self, future: Future, event, reply_token: str, request_id: str) -> None:
+        """取得翻譯結果並回覆"""
+        try:
+            self._deliver(event, reply_token, future.result(), request_id)
+        except Exception as event_error:
+            logging.error(f"[{request_id}] 處理事件時發生未預期錯誤: {event_error}")
+            logging.error(f"[{request_id}] 錯誤堆疊: {traceback.format_exc()}")
+            # 由於 reply token 已被標記為使用，不再嘗試發送錯誤訊息
+    
+    def _reply_deadline_for(self, event) -> Optional[float]:
+        """依事件時間推算回覆 token 的期限（epoch 秒），事件沒有時間戳記時回傳 None"""
+        timestamp = getattr(event, "timestamp", None)
+        if not isinstance(timestamp, (int, float)):
+            return None
+        return timestamp / 1000 + self.config.reply_token_budget_seconds
+
+    def _remaining_seconds(self) -> Optional[float]:
+        """目前處理中訊息的回覆 token 剩餘秒數，未知時回傳 None"""
+        deadline = _reply_deadline.get()
+        return None if deadline is None else deadline - time.time()
+
+    def _run_with_deadline(self, deadline: Optional[float], fn, *args):
+        """在指定的回覆期限下執行 fn（供模型路由判斷剩餘時間，執行緒池中的工作也適用）"""
+        token = _reply_deadline.set(deadline)
+        try:
+            return fn(*args)
+        finally:
+            _reply_deadline.reset(token)
+
+    def _resolve_translation(self, message_text: str, echo: bool, request_id: str, deadline: Optional[float] = None) -> str:
+        """取得要回覆的文字：不需翻譯的訊息直接回覆原文，其餘送去翻譯"""
+        if echo:
+            return message_text
+        return self._run_with_deadline(deadline, self.translate_message, message_text, request_id)
     
     def handle_events(self, events: List, request_id: str) -> None:
-        """處理 LINE Bot 事件"""
+        """處理 LINE Bot 事件
+        
+        不同事件的翻譯並行執行；同一來源的回覆仍依事件順序送出。
+        """
+        jobs = []
         for i, event in enumerate(events):
             logging.info(f"[{request_id}] 處理事件 {i+1}/{len(events)}: {type(event).__name__}")
             
-            # 檢查是否為訊息事件和文字訊息 (支援真實事件和模擬事件)
-            is_message_event = (
-                isinstance(event, MessageEvent) and isinstance(event.message, TextMessageContent)
-            ) or (
-                # 模擬事件的檢查
-                hasattr(event, 'type') and event.type == 'message' and 
-                hasattr(event, 'message') and hasattr(event.message, 'type') and 
-                event.message.type == 'text' and hasattr(event.message, 'text')
-            )
+            if not self._is_text_message_event(event):
+                logging.info(f"[{request_id}] 忽略非文字訊息事件: {type(event).__name__}")
+                continue
             
-            if is_message_event:
-                try:
-                    logging.info(f"[{request_id}] 收到文字訊息: {event.message.text[:50]}...")
-                    
-                    # 取得和驗證 reply token
-                    reply_token = getattr(event, 'reply_token', None)
-                    if not reply_token:
-                        logging.warning(f"[{request_id}] 事件沒有 reply_token，跳過回覆")
-                        continue
-                    
-                    # 檢查是否為測試用的假 token
-                    if reply_token_manager.is_test_token(reply_token):
-                        logging.warning(f"[{request_id}] 檢測到測試用假 reply token，跳過 LINE API 呼叫: {reply_token}")
-                        continue
-                    
-                    # 檢查 reply token 是否已經使用過
-                    if reply_token_manager.is_token_used(reply_token):
-                        logging.warning(f"[{request_id}] Reply token 已使用過，跳過重複回覆: {reply_token[:10]}...")
-                        continue
-                    
-                    # 標記 token 為已使用
-                    if not reply_token_manager.mark_token_used(reply_token, request_id):
-                        logging.warning(f"[{request_id}] 無法標記 reply token 為已使用，跳過處理")
+            try:
+                logging.info(f"[{request_id}] 收到文字訊息: {event.message.text[:50]}...")
+                reason = classify_untranslatable(event.message.text)
+                self.fast_path_stats.record(reason)
+                echo = False
+                if reason:
+                    if self.config.untranslatable_action != "echo":
+                        logging.info(f"[{request_id}] 訊息不需翻譯（{reason}），略過")
                         continue
-                    
-                    # 翻譯訊息（已有內部錯誤處理）
-                    translation = self.translate_message(event.message.text, request_id)
-                    
-                    # 發送回覆（加入錯誤處理）
+                    logging.info(f"[{request_id}] 訊息不需翻譯（{reason}），回覆原文")
+                    echo = True
+                reply_token = self._claim_reply_token(event, request_id)
+                if reply_token:
+                    jobs.append((event, reply_token, echo))
+            except Exception as event_error:
+                logging.error(f"[{request_id}] 處理事件時發生未預期錯誤: {event_error}")
+                logging.error(f"[{request_id}] 錯誤堆疊: {traceback.format_exc()}")
+        
+        if not jobs:
+            return
+        
+        if self.config.translation_batch_mode and len(jobs) > 1:
+            # 批次模式：所有訊息合併為單一 OpenAI 請求，再依事件順序回覆
+            texts = [event.message.text for event, _, echo in jobs if not echo]
+            deadlines = [d for d in (self._reply_deadline_for(event) for event, _, _ in jobs) if d is not None]
+            try:
+                translated = iter(
+                    self._run_with_deadline(min(deadlines, default=None), self.translate_batch, texts, request_id)
+                    if texts else []
+                )
+                translations = [event.message.text if echo else next(translated) for event, _, echo in jobs]
+            except Exception as batch_error:
+                # reply token 都已取得，批次失敗時改為逐一翻譯，不能讓整個 webhook 沒有回覆
+                logging.error(f"[{request_id}] 批次翻譯失敗，改為逐一翻譯: {batch_error}")
+                logging.error(f"[{request_id}] 錯誤堆疊: {traceback.format_exc()}")
+                translations = None
+            if translations is not None:
+                for (event, reply_token, _), translation in zip(jobs, translations):
                     try:
-                        with ApiClient(self.line_config) as api_client:
-                            messaging_api = MessagingApi(api_client)
-                            messaging_api.reply_message_with_http_info(
-                                ReplyMessageRequest(
-                                    reply_token=reply_token,
-                                    messages=[TextMessage(text=translation)],
-                                )
-                            )
-                            logging.info(f"[{request_id}] 翻譯回覆發送成功")
-                    except Exception as line_error:
-                        error_message = str(line_error)
-                        logging.error(f"[{request_id}] LINE API 回覆失敗: {error_message}")
-                        
-                        # 檢查是否為 reply token 相關錯誤
-                        if any(keyword in error_message for keyword in ["Invalid reply token", "reply token", "replyToken"]):
-                            logging.warning(f"[{request_id}] Reply token 錯誤，可能已過期或已使用: {reply_token[:10]}...")
-                            # 不嘗試重新發送，因為 reply token 問題無法通過重試解決
-                            continue
-                        
-                        # 對於其他錯誤，不嘗試重新發送，因為 reply token 已被標記為使用
-                        logging.error(f"[{request_id}] 由於 reply token 已使用，無法發送備用錯誤訊息")
-                            
-                except Exception as event_error:
-                    logging.error(f"[{request_id}] 處理事件時發生未預期錯誤: {event_error}")
-                    logging.error(f"[{request_id}] 錯誤堆疊: {traceback.format_exc()}")
-                    # 由於 reply token 已被標記為使用，不再嘗試發送錯誤訊息
-            else:
-                logging.info(f"[{request_id}] 忽略非文字訊息事件: {type(event).__name__}")
+                        self._deliver(event, reply_token, translation, request_id)
+                    except Exception as event_error:
+                        logging.error(f"[{request_id}] 處理事件時發生未預期錯誤: {event_error}")
+                        logging.error(f"[{request_id}] 錯誤堆疊: {traceback.format_exc()}")
+                return
+        
+        if len(jobs) == 1:
+            # 單一事件直接在目前執行緒處理，避免執行緒切換的額外成本
+            event, reply_token, echo = jobs[0]
+            try:
+                # 翻譯訊息（已有內部錯誤處理）
+                translation = self._resolve_translation(
+                    event.message.text, echo, request_id, self._reply_deadline_for(event)
+                )
+                self._deliver(event, reply_token, translation, request_id)
+            except Exception as event_error:
+                logging.error(f"[{request_id}] 處理事件時發生未預期錯誤: {event_error}")
+                logging.error(f"[{request_id}] 錯誤堆疊: {traceback.format_exc()}")
+            return
+        
+        # 所有翻譯同時送出；每個來源維持一個依事件順序排列的待回覆佇列，
+        # 只有當佇列最前面的翻譯完成時才送出回覆，確保同一群組內的回覆順序不變
+        pending: Dict[str, deque] = {}
+        future_sources = {}
+        for event, reply_token, echo in jobs:
+            source_key = self._source_key(event)
+            deadline = self._reply_deadline_for(event)
+            future = self.event_executor.submit_with_deadline(
+                deadline, self._resolve_translation, event.message.text, echo, request_id, deadline
+            )
+            future_sources[future] = source_key
+            pending.setdefault(source_key, deque()).append((future, event, reply_token))
+        
+        logging.info(f"[{request_id}] 並行翻譯 {len(jobs)} 個事件（{len(pending)} 個來源）")
+        for completed in as_completed(future_sources):
+            source_queue = pending[future_sources[completed]]
+            while source_queue and source_queue[0][0].done():
+                future, event, reply_token = source_queue.popleft()
+                self._reply_translation(future, event, reply_token, request_id)
     
     def verify_signature(self, body: str, signature: str) -> bool:
         """驗證 LINE 簽章"""
@@ -360,24 +1165,34 @@ class TranslationBotHandler:
 config = None
 teams_handler = None
 translation_handler = None
+event_queue = None
 
 try:
     logging.info("開始初始化全域配置...")
     config = EnvironmentConfig()
     teams_handler = TeamsWebhookHandler(config)
     translation_handler = TranslationBotHandler(config)
+    if config.async_processing:
+        event_queue = EventWorkQueue(
+            translation_handler.handle_events,
+            max_size=config.event_queue_size,
+            workers=config.event_queue_workers,
+        )
+        logging.info("已啟用背景事件處理佇列")
     logging.info("全域配置初始化成功")
 except ValueError as e:
     logging.error(f"環境變數配置錯誤: {e}")
     config = None
     teams_handler = None
     translation_handler = None
+    event_queue = None
 except Exception as e:
     logging.error(f"初始化過程中發生未預期錯誤: {e}")
     logging.error(f"錯誤堆疊: {traceback.format_exc()}")
     config = None
     teams_handler = None
     translation_handler = None
+    event_queue = None
 
 
 @app.route(route="health", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
@@ -417,6 +1232,40 @@ def health_check(req: func.HttpRequest) -> func.HttpResponse:
                 "warning": "⚠️ 測試模式已啟用 - 僅供開發測試使用" if (config and (config.test_mode or config.test_signature_skip)) else None
             },
             "reply_token_manager": reply_token_manager.get_stats(),
+            "translation_cache": translation_handler.translation_cache.get_stats() if translation_handler else None,
+            "translation_memory": (
+                translation_handler.translation_memory.get_stats()
+                if translation_handler and translation_handler.translation_memory else None
+            ),
+            "event_queue": event_queue.get_stats() if event_queue else None,
+            "line_client": translation_handler.line_client.get_stats() if translation_handler else None,
+            "translation_batch": translation_handler.batch_stats if translation_handler else None,
+            "translation_singleflight": translation_handler.singleflight.get_stats() if translation_handler else None,
+            "translation_line_cache": translation_handler.line_cache_stats if translation_handler else None,
+            "token_estimator": translation_handler.token_estimator.get_stats() if translation_handler else None,
+            "translation_fast_path": translation_handler.fast_path_stats.get_stats() if translation_handler else None,
+            "translation_masking": translation_handler.masking_stats if translation_handler else None,
+            "model_router": translation_handler.model_router.get_stats() if translation_handler else None,
+            "event_dedup": (
+                translation_handler.event_deduplicator.get_stats()
+                if translation_handler and translation_handler.event_deduplicator else None
+            ),
+            "reply_delivery": (
+                {**translation_handler.delivery_stats, "scheduler": translation_handler.event_executor.get_stats()}
+                if translation_handler else None
+            ),
+            "openai_circuit_breaker": (
+                {**translation_handler.circuit_breaker.get_stats(), "fallback": translation_handler.fallback_stats}
+                if translation_handler else None
+            ),
+            "openai_hedging": (
+                translation_handler.hedger.get_stats()
+                if translation_handler and translation_handler.hedger else None
+            ),
+            "glossary": (
+                translation_handler.glossary.get_stats()
+                if translation_handler and translation_handler.glossary else None
+            ),
             "request_id": request_id,
             "version": "unified-1.1.0"
         }
@@ -701,7 +1550,8 @@ def line_callback(req: func.HttpRequest) -> func.HttpResponse:
                                     self.mode = event_data.get('mode', 'active')
                                     self.timestamp = event_data.get('timestamp', int(time.time() * 1000))
                                     self.source = SimpleSource(event_data.get('source', {}))
-                                    self.webhook_event_id = event_data.get('webhookEventId', 'mock_webhook_event_id')
+                                    # 沒有 webhookEventId 時保持 None，去重會直接放行，避免所有測試事件共用同一個 ID 而被捨棄
+                                    self.webhook_event_id = event_data.get('webhookEventId')
                                     self.delivery_context = SimpleDeliveryContext(event_data.get('deliveryContext', {}))
                                     self.reply_token = event_data.get('replyToken', 'test_reply_token')
                                     self.message = SimpleTextMessage(event_data.get('message', {}))
@@ -746,10 +1596,26 @@ def line_callback(req: func.HttpRequest) -> func.HttpResponse:
             
             logging.info(f"[{request_id}] 解析到 {len(events)} 個事件")
             
+            # 捨棄已處理過的事件，避免重送的訊息再次翻譯
+            events = translation_handler.drop_duplicate_events(events, request_id)
+            if not events:
+                return func.HttpResponse(
+                    "OK", 
+                    status_code=200,
+                    headers={"Content-Type": "text/plain; charset=utf-8"}
+                )
+            
             # 處理事件（內部已有完整錯誤處理）
             try:
-                translation_handler.handle_events(events, request_id)
-                logging.info(f"[{request_id}] LINE callback 處理完成")
+                if event_queue is not None:
+                    # 背景模式：放入佇列後立即回應，翻譯與回覆由背景執行緒完成
+                    if event_queue.submit(events, request_id):
+                        logging.info(f"[{request_id}] 事件已放入背景佇列")
+                    else:
+                        logging.error(f"[{request_id}] 背景佇列已滿，事件已捨棄")
+                else:
+                    translation_handler.handle_events(events, request_id)
+                    logging.info(f"[{request_id}] LINE callback 處理完成")
             except Exception as handle_error:
                 logging.error(f"[{request_id}] 事件處理失敗: {handle_error}")
                 logging.error(f"[{request_id}] 錯誤堆疊: {traceback.format_exc()}")
@@ -0,0 +1,211 @@
+# glossary.py - 詞彙表：以 Aho-Corasick 自動機一次掃描找出訊息中的所有專有名詞
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional
+
+
+class GlossaryMatch(NamedTuple):
+    """訊息中找到的詞彙（start / end 為字元索引，end 不含）"""
+    start: int
+    end: int
+    term: str
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isascii() and char.isalnum()
+
+
+class AhoCorasick:
+    """多字串比對自動機：建立一次後，每次搜尋只需掃描文字一遍"""
+
+    def __init__(self, terms: List[str]):
+        """
+        建立自動機
+
+        Args:
+            terms: 要比對的詞彙（區分大小寫）
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+
+        for term in terms:
+            if term:
+                self._add(term)
+        self._build_fail_links()
+
+    def _add(self, term: str) -> None:
+        node = 0
+        for char in term:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append(term)
+
+    def _build_fail_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find_all(self, text: str) -> List[GlossaryMatch]:
+        """
+        找出文字中所有出現的詞彙（可能重疊）
+
+        Args:
+            text: 要搜尋的文字
+
+        Returns:
+            List[GlossaryMatch]: 依結束位置排序的所有比對結果
+        """
+        matches = []
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for term in output[node]:
+                matches.append(GlossaryMatch(index + 1 - len(term), index + 1, term))
+        return matches
+
+
+class Glossary:
+    """從 JSON 檔載入的詞彙表；檔案修改時間改變時才重建自動機
+
+    檔案格式為 {"詞彙": 譯名}：譯名為字串時所有語言共用；為物件時依目標語言
+    （例如 {"en": "...", "zh-Hant": "..."}）取用；null 或空字串表示保留原文。
+    """
+
+    def __init__(self, path: str, check_interval: float = 5.0):
+        """
+        初始化詞彙表
+
+        Args:
+            path: 詞彙表 JSON 檔路徑
+            check_interval: 檢查檔案修改時間的最短間隔（秒）
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries: Dict[str, object] = {}
+        self._automaton = AhoCorasick([])
+        self._mtime_ns: Optional[int] = None
+        self._next_check = 0.0
+        self.reloads = 0
+        self.lookups = 0
+        self.matches = 0
+
+    @property
+    def version(self) -> int:
+        """目前載入的詞彙表版本（檔案修改時間），未載入時為 0"""
+        self._reload_if_changed()
+        return self._mtime_ns or 0
+
+    def _reload_if_changed(self) -> None:
+        """檔案修改時間改變時重新載入並重建自動機"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            try:
+                mtime_ns = os.stat(self.path).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            if mtime_ns == self._mtime_ns:
+                return
+
+            entries: Dict[str, object] = {}
+            if mtime_ns is not None:
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        data = json.load(f)
+                    entries = {str(term): value for term, value in data.items() if str(term).strip()}
+                except (OSError, ValueError, AttributeError) as e:
+                    logging.warning(f"無法載入詞彙表 {self.path}，沿用目前的詞彙: {e}")
+                    return
+
+            self._entries = entries
+            self._automaton = AhoCorasick(list(entries))
+            self._mtime_ns = mtime_ns
+            self.reloads += 1
+            logging.info(f"詞彙表已載入: {len(entries)} 個詞彙")
+
+    def find_terms(self, text: str) -> List[GlossaryMatch]:
+        """
+        找出訊息中的詞彙；重疊時保留最左邊、最長的詞，拉丁字母詞彙需位於單字邊界
+
+        Args:
+            text: 訊息文字
+
+        Returns:
+            List[GlossaryMatch]: 不重疊、依位置排序的詞彙
+        """
+        self._reload_if_changed()
+        automaton = self._automaton
+        candidates = sorted(automaton.find_all(text), key=lambda m: (m.start, -m.end))
+
+        selected: List[GlossaryMatch] = []
+        position = 0
+        for match in candidates:
+            if match.start < position:
+                continue
+            if _is_word_char(match.term[0]) and match.start > 0 and _is_word_char(text[match.start - 1]):
+                continue
+            if _is_word_char(match.term[-1]) and match.end < len(text) and _is_word_char(text[match.end]):
+                continue
+            selected.append(match)
+            position = match.end
+
+        self.lookups += 1
+        self.matches += len(selected)
+        return selected
+
+    def translation_for(self, term: str, target: str) -> str:
+        """
+        取得詞彙在目標語言的譯名
+
+        Args:
+            term: 詞彙
+            target: 目標語言代碼
+
+        Returns:
+            str: 譯名；未指定時回傳原詞彙
+        """
+        value = self._entries.get(term)
+        if isinstance(value, dict):
+            value = value.get(target) or value.get(target.split("-")[0])
+        return value if isinstance(value, str) and value else term
+
+    def get_stats(self) -> dict:
+        """
+        取得統計資訊
+
+        Returns:
+            dict: 包含詞彙數、重新載入次數、查詢次數與找到的詞彙數
+        """
+        return {
+            "path": self.path,
+            "terms": len(self._entries),
+            "reloads": self.reloads,
+            "lookups": self.lookups,
+            "matches": self.matches,
+        }
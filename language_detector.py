@@ -0,0 +1,107 @@
+# language_detector.py - 以文字系統比例判斷訊息語言（zh-Hant / zh-Hans / en / ja / ko / th）
+import re
+from typing import Dict, NamedTuple
+
+# 以 UTF-8 編碼後的位元組判斷文字系統：bytes.translate / bytes.count 都在 C 層一次掃描完成。
+# 單一位元組可判斷的類別（拉丁字母、漢字、韓文音節的首位元組）先轉成類別字元再計數。
+_LATIN, _HAN, _HANGUL = b"l", b"h", b"g"
+
+
+def _build_script_table() -> bytes:
+    table = bytearray(b" " * 256)
+    for byte in (*range(0x41, 0x5B), *range(0x61, 0x7B), *range(0xC3, 0xCA)):
+        table[byte] = _LATIN[0]  # A-Z、a-z，以及 U+00C0-U+024F 帶重音的拉丁字母
+    for byte in range(0xE4, 0xEA):
+        table[byte] = _HAN[0]  # U+4000-U+9FFF（CJK 統一漢字與擴充 A 的主要部分）
+    for byte in range(0xEA, 0xEE):
+        table[byte] = _HANGUL[0]  # U+A000-U+DFFF（韓文音節 U+AC00-U+D7AF）
+    return bytes(table)
+
+
+_SCRIPT_TABLE = _build_script_table()
+# 需要前兩個位元組才能判斷的區塊
+_KANA_PREFIXES = (b"\xe3\x81", b"\xe3\x82", b"\xe3\x83")  # U+3040-U+30FF 平假名、片假名
+_THAI_PREFIXES = (b"\xe0\xb8", b"\xe0\xb9")  # U+0E00-U+0E7F
+
+# 常見的簡體 / 繁體專用字（逐字對應），用來區分 zh-Hans 與 zh-Hant
+_SIMPLIFIED_ONLY = "们这个来时说国会对发经过还进么样没问见关开现长门东车书马鸟语话认让请谢读写买卖听应该实头体点热电脑网络议题单级线组织业务员产边运动报价钱钟欢轻为与学习从给间帮吗"
+_TRADITIONAL_ONLY = "們這個來時說國會對發經過還進麼樣沒問見關開現長門東車書馬鳥語話認讓請謝讀寫買賣聽應該實頭體點熱電腦網絡議題單級線組織業務員產邊運動報價錢鐘歡輕為與學習從給間幫嗎"
+_SIMPLIFIED = re.compile(f"[{_SIMPLIFIED_ONLY}]")
+_TRADITIONAL = re.compile(f"[{_TRADITIONAL_ONLY}]")
+
+# 判斷繁簡時只取前段文字，長訊息不必整段掃描
+_VARIANT_SAMPLE_CHARS = 2000
+
+# 拉丁字母與泰文以約略一個詞的字母數為一個單位，與一個漢字、假名或韓文音節的權重相當，
+# 讓一個中文名字不會蓋過一整段英文，反之亦然
+_LATIN_CHARS_PER_UNIT = 5
+_THAI_CHARS_PER_UNIT = 3
+# 假名佔中日文字元的比例達到此值即視為日文（日文常夾雜漢字）
+_KANA_RATIO_FOR_JAPANESE = 0.1
+
+DEFAULT_LANGUAGE = "en"
+CHINESE_LANGUAGES = ("zh-Hant", "zh-Hans")
+
+
+class LanguageDetection(NamedTuple):
+    """語言判斷結果"""
+    language: str
+    confidence: float
+
+
+def script_scores(text: str) -> Dict[str, float]:
+    """
+    計算各語言的文字單位數
+
+    Args:
+        text: 要判斷的文字
+
+    Returns:
+        Dict[str, float]: 語言代碼（zh / ja / ko / th / en）對應的單位數
+    """
+    encoded = text.encode("utf-8", "ignore")
+    scripts = encoded.translate(_SCRIPT_TABLE)
+    han = scripts.count(_HAN)
+    kana = sum(encoded.count(prefix) for prefix in _KANA_PREFIXES)
+    scores = {
+        "zh": float(han),
+        "ja": 0.0,
+        "ko": float(scripts.count(_HANGUL)),
+        "th": sum(encoded.count(prefix) for prefix in _THAI_PREFIXES) / _THAI_CHARS_PER_UNIT,
+        "en": scripts.count(_LATIN) / _LATIN_CHARS_PER_UNIT,
+    }
+    if kana and kana >= _KANA_RATIO_FOR_JAPANESE * (han + kana):
+        scores["ja"] = float(han + kana)
+        scores["zh"] = 0.0
+    return scores
+
+
+def detect_language(text: str) -> LanguageDetection:
+    """
+    依文字系統比例判斷訊息的主要語言
+
+    Args:
+        text: 要判斷的文字
+
+    Returns:
+        LanguageDetection: 語言（zh-Hant / zh-Hans / en / ja / ko / th）與信心值（主要語言佔全部文字單位的比例）；
+        沒有可判斷的文字時回傳 en，信心值為 0
+    """
+    scores = script_scores(text or "")
+    total = sum(scores.values())
+    if not total:
+        return LanguageDetection(DEFAULT_LANGUAGE, 0.0)
+
+    language = max(scores, key=scores.get)
+    confidence = round(scores[language] / total, 3)
+    if language == "zh":
+        sample = text[:_VARIANT_SAMPLE_CHARS]
+        simplified = len(_SIMPLIFIED.findall(sample))
+        traditional = len(_TRADITIONAL.findall(sample))
+        language = "zh-Hans" if simplified > traditional else "zh-Hant"
+    return LanguageDetection(language, confidence)
+
+
+def is_chinese_language(language: str) -> bool:
+    """判斷語言代碼是否為中文（繁體或簡體）"""
+    return language in CHINESE_LANGUAGES
@@ -0,0 +1,78 @@
+# line_client.py - 行程內共用、保持連線的 LINE Messaging API 客戶端
+import logging
+import threading
+from typing import Optional
+
+from linebot.v3.messaging import ApiClient, Configuration, MessagingApi
+
+
+class LineClientPool:
+    """包裝單一 LINE ApiClient，讓所有處理器共用同一組 urllib3 連線池
+
+    urllib3 的 PoolManager 為執行緒安全，多個執行緒可同時透過同一個客戶端呼叫 API；
+    保持連線（keep-alive）可讓回覆延遲不再包含 TLS 握手時間。
+    """
+
+    def __init__(self, access_token: str, pool_size: int = 10):
+        """
+        初始化共用客戶端
+
+        Args:
+            access_token: LINE Channel access token
+            pool_size: 對 api.line.me 最多保留的連線數
+        """
+        self.pool_size = max(1, pool_size)
+        self.configuration = Configuration(access_token=access_token)
+        self.configuration.connection_pool_maxsize = self.pool_size
+        self.api_client = ApiClient(self.configuration)
+        self.messaging_api = MessagingApi(self.api_client)
+        self.logger = logging.getLogger(__name__)
+
+    def get_stats(self) -> dict:
+        """
+        取得連線池使用狀況
+
+        Returns:
+            dict: 包含每個主機連線池的建立連線數、請求數與閒置連線數
+        """
+        pools = {}
+        pool_manager = getattr(self.api_client.rest_client, "pool_manager", None)
+        if pool_manager is not None:
+            for key in list(pool_manager.pools.keys()):
+                pool = pool_manager.pools.get(key)
+                if pool is None:
+                    continue
+                idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+                pools[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                    "created_connections": pool.num_connections,
+                    "requests": pool.num_requests,
+                    "idle_connections": idle,
+                    "max_size": pool.pool.maxsize if pool.pool else 0,
+                }
+
+        return {
+            "pool_size": self.pool_size,
+            "pools": pools,
+        }
+
+
+_shared_client: Optional[LineClientPool] = None
+_shared_client_lock = threading.Lock()
+
+
+def get_line_client(access_token: str, pool_size: int = 10) -> LineClientPool:
+    """
+    取得行程內共用的 LINE 客戶端，第一次呼叫時建立
+
+    Args:
+        access_token: LINE Channel access token
+        pool_size: 連線池大小（僅在建立時生效）
+
+    Returns:
+        LineClientPool: 共用客戶端
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None or _shared_client.configuration.access_token != access_token:
+            _shared_client = LineClientPool(access_token, pool_size=pool_size)
+        return _shared_client
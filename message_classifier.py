@@ -0,0 +1,82 @@
+# message_classifier.py - 快速判斷不需要翻譯的訊息（網址、表情符號、數字、@提及、標點）
+import re
+import threading
+from typing import Optional
+
+# 網址只包含 RFC 3986 允許的 ASCII 字元；中文前後不會有空白，不能以空白判斷網址結束
+URL_PATTERN = re.compile(r"(?:https?://|www\.)[A-Za-z0-9\-._~:/?#\[\]@!$&'()*+,;=%]+", re.IGNORECASE)
+# @提及遇到空白、下一個 @、中日韓或全形標點即結束（名稱本身可以是中文）
+MENTION_PATTERN = re.compile(r"@[^\s@\u2018-\u201f\u2026\u3000-\u303f\uff01-\uff0f\uff1a-\uff20\uff3b-\uff40\uff5b-\uff65]+")
+_DIGIT = re.compile(r"\d")
+# 任何字母（含中日韓文字）；\w 去掉數字與底線
+_LETTER = re.compile(r"[^\W\d_]")
+_EMOJI = re.compile(
+    "[\U0001F000-\U0001FAFF☀-➿⬀-⯿️‍\U000E0020-\U000E007F]"
+)
+
+
+def classify_untranslatable(text: str) -> Optional[str]:
+    """
+    判斷訊息是否不需要送去翻譯
+
+    去除網址與 @提及後，若剩下的內容不含任何字母（含中日韓文字），
+    代表訊息只由數字、表情符號或標點組成，翻譯不會產生新資訊。
+
+    Args:
+        text: 訊息文字
+
+    Returns:
+        Optional[str]: 不需翻譯時回傳原因（empty / url / mention / number / emoji / punctuation），
+        需要翻譯時回傳 None
+    """
+    stripped = (text or "").strip()
+    if not stripped:
+        return "empty"
+
+    without_urls = URL_PATTERN.sub(" ", stripped)
+    remainder = MENTION_PATTERN.sub(" ", without_urls)
+    if _LETTER.search(remainder):
+        return None
+
+    if without_urls != stripped:
+        return "url"
+    if remainder != without_urls:
+        return "mention"
+    if _DIGIT.search(remainder):
+        return "number"
+    if _EMOJI.search(remainder):
+        return "emoji"
+    return "punctuation"
+
+
+class MessageClassifierStats:
+    """統計快速判斷略過翻譯的比例"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.skipped = 0
+        self.by_reason = {}
+
+    def record(self, reason: Optional[str]) -> None:
+        """記錄一次判斷結果"""
+        with self._lock:
+            self.checked += 1
+            if reason:
+                self.skipped += 1
+                self.by_reason[reason] = self.by_reason.get(reason, 0) + 1
+
+    def get_stats(self) -> dict:
+        """
+        取得統計資訊
+
+        Returns:
+            dict: 包含判斷次數、略過次數、略過比例與各原因的次數
+        """
+        with self._lock:
+            return {
+                "checked": self.checked,
+                "skipped": self.skipped,
+                "skip_rate": round(self.skipped / self.checked, 4) if self.checked else 0.0,
+                "by_reason": dict(self.by_reason),
+            }
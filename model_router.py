@@ -0,0 +1,187 @@
+# model_router.py - 依訊息 token 數、複雜度與剩餘回覆時間選擇翻譯模型，並統計各層級的延遲與成本
+import json
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+_SENTENCE_END = re.compile(r"[.!?。！？]+(?=\s|$)")
+# 語言判斷信心值低於此值視為混合語言
+_MIXED_LANGUAGE_CONFIDENCE = 0.8
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    """模型層級；上限為 None 表示不限制"""
+    name: str
+    model: str
+    max_input_tokens: Optional[int] = None
+    max_complexity: Optional[float] = None
+    # 每百萬 token 的價格（美元），用於估算成本
+    input_cost_per_million: float = 0.0
+    output_cost_per_million: float = 0.0
+
+    def accepts(self, input_tokens: int, complexity: float, ignore_complexity: bool = False) -> bool:
+        """判斷訊息是否在此層級的上限內"""
+        if self.max_input_tokens is not None and input_tokens > self.max_input_tokens:
+            return False
+        if ignore_complexity or self.max_complexity is None:
+            return True
+        return complexity <= self.max_complexity
+
+
+def default_tiers(default_model: str) -> List[ModelTier]:
+    """預設層級：只有一層，所有訊息都使用設定的模型；多層路由需明確設定 TRANSLATION_MODEL_TIERS"""
+    return [
+        ModelTier("default", default_model,
+                  input_cost_per_million=2.5, output_cost_per_million=10.0),
+    ]
+
+
+def parse_tiers(raw: str, default_model: str) -> List[ModelTier]:
+    """
+    解析 JSON 格式的層級設定
+
+    Args:
+        raw: JSON 陣列，每個元素包含 name、model 與選用的 max_input_tokens、max_complexity、
+            input_cost_per_million、output_cost_per_million；依序由快到慢排列
+        default_model: 設定為空或格式錯誤時使用的預設模型
+
+    Returns:
+        List[ModelTier]: 層級列表；最後一層一律不設上限，確保每則訊息都有模型可用
+    """
+    if not raw.strip():
+        return default_tiers(default_model)
+    try:
+        tiers = [ModelTier(**item) for item in json.loads(raw)]
+    except (TypeError, ValueError) as e:
+        logging.warning(f"TRANSLATION_MODEL_TIERS 格式錯誤，使用預設層級: {e}")
+        return default_tiers(default_model)
+    if not tiers:
+        return default_tiers(default_model)
+    last = tiers[-1]
+    tiers[-1] = ModelTier(last.name, last.model, None, None,
+                          last.input_cost_per_million, last.output_cost_per_million)
+    return tiers
+
+
+def estimate_complexity(text: str, language_confidence: float = 1.0, glossary_terms: int = 0) -> float:
+    """
+    估算訊息的翻譯難度
+
+    一句單行、單一語言的訊息為 0；每多一行或一句加 1，混合語言加 1，
+    每個詞彙表詞彙加 0.5。
+
+    Args:
+        text: 要翻譯的文字
+        language_confidence: 語言判斷的信心值
+        glossary_terms: 訊息中的詞彙表詞彙數
+
+    Returns:
+        float: 複雜度分數
+    """
+    lines = [line for line in text.strip().splitlines() if line.strip()]
+    sentences = len(_SENTENCE_END.findall(text))
+    score = max(0, len(lines) - 1) + max(0, sentences - 1)
+    if language_confidence < _MIXED_LANGUAGE_CONFIDENCE:
+        score += 1
+    return score + 0.5 * glossary_terms
+
+
+class ModelRouter:
+    """依 token 數、複雜度與剩餘時間選擇模型層級"""
+
+    def __init__(self, tiers: List[ModelTier], low_budget_seconds: float = 10.0):
+        """
+        初始化路由器
+
+        Args:
+            tiers: 由快到慢排列的模型層級
+            low_budget_seconds: 剩餘回覆時間低於此值時忽略複雜度，選擇能處理的最快層級
+        """
+        self.tiers = tiers
+        self.low_budget_seconds = low_budget_seconds
+        self._lock = threading.Lock()
+        self._stats = {
+            tier.name: {
+                "model": tier.model, "requests": 0, "errors": 0, "low_budget": 0,
+                "latency_ms_total": 0.0, "latency_ms_max": 0.0,
+                "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+            }
+            for tier in tiers
+        }
+
+    def route(self, input_tokens: int, complexity: float, remaining_seconds: Optional[float] = None) -> ModelTier:
+        """
+        選擇模型層級
+
+        Args:
+            input_tokens: 要翻譯的文字的 token 數（不含 system prompt）
+            complexity: estimate_complexity 的結果
+            remaining_seconds: 回覆 token 剩餘的有效時間，未知時為 None
+
+        Returns:
+            ModelTier: 第一個能處理此訊息的層級
+        """
+        low_budget = remaining_seconds is not None and remaining_seconds < self.low_budget_seconds
+        for tier in self.tiers:
+            if tier.accepts(input_tokens, complexity, ignore_complexity=low_budget):
+                if low_budget and tier is not self.tiers[-1] and not tier.accepts(input_tokens, complexity):
+                    with self._lock:
+                        self._stats[tier.name]["low_budget"] += 1
+                return tier
+        return self.tiers[-1]
+
+    def record(self, tier: ModelTier, latency_ms: float, response=None, error: bool = False) -> float:
+        """
+        記錄一次請求的延遲、token 數與成本
+
+        Returns:
+            float: 依 usage 估算的成本（美元）
+        """
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        prompt_tokens = prompt_tokens if isinstance(prompt_tokens, int) else 0
+        completion_tokens = completion_tokens if isinstance(completion_tokens, int) else 0
+        cost = (
+            prompt_tokens * tier.input_cost_per_million
+            + completion_tokens * tier.output_cost_per_million
+        ) / 1_000_000
+
+        with self._lock:
+            stats = self._stats[tier.name]
+            stats["requests"] += 1
+            if error:
+                stats["errors"] += 1
+            stats["latency_ms_total"] += latency_ms
+            stats["latency_ms_max"] = max(stats["latency_ms_max"], latency_ms)
+            stats["input_tokens"] += prompt_tokens
+            stats["output_tokens"] += completion_tokens
+            stats["cost_usd"] += cost
+        return cost
+
+    def get_stats(self) -> dict:
+        """
+        取得統計資訊
+
+        Returns:
+            dict: 各層級的請求數、平均 / 最大延遲、token 數與累計成本
+        """
+        with self._lock:
+            result = {}
+            for name, stats in self._stats.items():
+                requests = stats["requests"]
+                result[name] = {
+                    "model": stats["model"],
+                    "requests": requests,
+                    "errors": stats["errors"],
+                    "low_budget": stats["low_budget"],
+                    "avg_latency_ms": round(stats["latency_ms_total"] / requests, 1) if requests else 0.0,
+                    "max_latency_ms": round(stats["latency_ms_max"], 1),
+                    "input_tokens": stats["input_tokens"],
+                    "output_tokens": stats["output_tokens"],
+                    "cost_usd": round(stats["cost_usd"], 6),
+                }
+            return result
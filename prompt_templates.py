@@ -0,0 +1,138 @@
+# prompt_templates.py - 啟動時預先產生各語言組合與風格的翻譯 prompt，並以唯讀表查詢
+from dataclasses import dataclass
+from itertools import product
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+LANGUAGE_NAMES = MappingProxyType({
+    "zh-Hant": "Traditional Chinese",
+    "zh-Hans": "Simplified Chinese",
+    "en": "English",
+    "ja": "Japanese",
+    "ko": "Korean",
+    "th": "Thai",
+})
+
+STYLE_INSTRUCTIONS = MappingProxyType({
+    "strict": "Translate STRICTLY: keep the wording literal and the register unchanged.",
+    "casual": "Use the natural, conversational tone of a group chat.",
+})
+DEFAULT_STYLE = "strict"
+
+# 所有 prompt 共用、逐字節固定的前綴，語言組合與風格等會變動的部分一律放在最後。
+# OpenAI 只快取至少 1024 token 的 prompt，目前的 system prompt 約 200 token，不會命中快取；
+# 固定前綴是為了日後 prompt（例如加入範例）超過門檻時可以直接共用
+_SHARED_PREFIX = (
+    "You are a translator.\n"
+    "Rules:\n"
+    "1. Preserve line breaks; one output line per input line.\n"
+    "2. Keep every URL (any string containing 'http' or 'https') exactly as‑is.\n"
+    "3. Keep every placeholder of the form [#n] exactly as-is and in place.\n"
+    "4. Do NOT add, delete, reorder, summarise or explain anything.\n"
+    "5. When a glossary is provided, render each listed term exactly as the glossary gives it.\n"
+)
+
+_SINGLE_RULES = (
+    "6. Only translate the text between <source> and </source>.\n"
+    "7. Return ONLY the translation, with no extra commentary.\n"
+)
+
+_BATCH_RULES = (
+    "6. The input is a JSON array of items with the fields id, to, text and an optional glossary; "
+    "translate text into the language given by to.\n"
+    "7. Translate every item independently; never merge, split or skip items.\n"
+    "8. Return ONLY a JSON object of the form "
+    "{\"translations\": [{\"id\": <id>, \"text\": <translation>}]} "
+    "with exactly one entry per input id.\n"
+)
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """單一 (來源語言, 目標語言, 風格) 的 system prompt"""
+    source: str
+    target: str
+    style: str
+    system_prompt: str
+
+
+def _single_prompt(source: str, target: str, style: str) -> str:
+    return (
+        _SHARED_PREFIX
+        + _SINGLE_RULES
+        + f"Style: {STYLE_INSTRUCTIONS[style]}\n"
+        + f"Translate the text from {LANGUAGE_NAMES[source]} to fluent {LANGUAGE_NAMES[target]}."
+    )
+
+
+def _batch_prompt(style: str) -> str:
+    codes = ", ".join(f"{code} = {name}" for code, name in LANGUAGE_NAMES.items())
+    return (
+        _SHARED_PREFIX
+        + _BATCH_RULES
+        + f"Style: {STYLE_INSTRUCTIONS[style]}\n"
+        + f"Language codes: {codes}."
+    )
+
+
+def _build_templates() -> Mapping[Tuple[str, str, str], PromptTemplate]:
+    templates = {}
+    for source, target, style in product(LANGUAGE_NAMES, LANGUAGE_NAMES, STYLE_INSTRUCTIONS):
+        if source != target:
+            templates[(source, target, style)] = PromptTemplate(
+                source, target, style, _single_prompt(source, target, style)
+            )
+    return MappingProxyType(templates)
+
+
+PROMPT_TEMPLATES = _build_templates()
+BATCH_PROMPTS = MappingProxyType({style: _batch_prompt(style) for style in STYLE_INSTRUCTIONS})
+
+
+def get_prompt_template(source: str, target: str, style: str = DEFAULT_STYLE) -> PromptTemplate:
+    """
+    取得預先產生的 prompt
+
+    Args:
+        source: 來源語言代碼
+        target: 目標語言代碼
+        style: 翻譯風格，未知的風格改用預設風格
+
+    Returns:
+        PromptTemplate: 對應的 prompt；來源與目標相同或語言未知時，改用英文 → 繁體中文
+    """
+    if style not in STYLE_INSTRUCTIONS:
+        style = DEFAULT_STYLE
+    template = PROMPT_TEMPLATES.get((source, target, style))
+    if template is None:
+        template = PROMPT_TEMPLATES[("en", "zh-Hant", style)]
+    return template
+
+
+def build_user_prompt(message_text: str, glossary: Optional[Mapping[str, str]] = None) -> str:
+    """
+    以 <source> 標記包住要翻譯的文字
+
+    Args:
+        message_text: 要翻譯的文字
+        glossary: 這則訊息用到的詞彙與指定譯名，會放在 <glossary> 標記內
+
+    Returns:
+        str: user prompt
+    """
+    source = f"<source>\n{message_text.strip()}\n</source>"
+    if not glossary:
+        return source
+    terms = "\n".join(f"{term} = {translation}" for term, translation in glossary.items())
+    return f"<glossary>\n{terms}\n</glossary>\n{source}"
+
+
+def make_direction(source: str, target: str) -> str:
+    """組成翻譯方向字串，例如 en->zh-Hant"""
+    return f"{source}->{target}"
+
+
+def split_direction(direction: str) -> Tuple[str, str]:
+    """將翻譯方向字串拆成 (來源語言, 目標語言)"""
+    source, _, target = direction.partition("->")
+    return source, target
@@ -1,22 +1,49 @@
 # reply_token_manager.py - 管理 LINE Bot Reply Token 的工具
-import time
 import logging
-from typing import Set, Dict
-from datetime import datetime, timedelta
+import os
+import secrets
+import threading
+from datetime import timedelta
+from typing import Optional
+
+from token_backends import MemoryTokenBackend, TokenBackend, create_token_backend, make_digest
+
+# 共用後端未設定金鑰時使用的固定金鑰；所有實例必須算出相同的摘要
+_SHARED_DIGEST_KEY = b"line-reply-token"
 
 class ReplyTokenManager:
     """管理 LINE Bot Reply Token，防止重複使用和追蹤過期"""
     
-    def __init__(self, token_lifetime_minutes: int = 60):
+    def __init__(
+        self,
+        token_lifetime_minutes: int = 60,
+        max_tokens: int = 100_000,
+        backend: Optional[TokenBackend] = None,
+        digest_key: Optional[bytes] = None,
+    ):
         """
         初始化 Reply Token 管理器
         
         Args:
             token_lifetime_minutes: Reply token 的生命週期（分鐘）
+            max_tokens: 最多記錄幾個已使用的 token，超過時淘汰最舊的（記憶體後端）
+            backend: 儲存後端，省略時使用單一程序的記憶體後端
+            digest_key: 計算摘要的金鑰；省略時記憶體後端每個程序隨機產生，共用後端使用固定金鑰
         """
-        self.used_tokens: Dict[str, datetime] = {}
+        # 只保存 token 的固定長度摘要，記憶體用量有上限
+        self.backend = backend or MemoryTokenBackend(max_tokens)
+        self._digest_key = digest_key or (_SHARED_DIGEST_KEY if self.backend.shared else secrets.token_bytes(16))
         self.token_lifetime = timedelta(minutes=token_lifetime_minutes)
+        self._lifetime_ms = int(self.token_lifetime.total_seconds() * 1000)
         self.logger = logging.getLogger(__name__)
+        self._errors_lock = threading.Lock()
+        self.backend_errors = 0
+
+    def _record_backend_error(self, action: str, error: Exception) -> None:
+        """記錄後端錯誤；後端無法使用時寧可重複回覆，也不丟掉訊息"""
+        with self._errors_lock:
+            self.backend_errors += 1
+        self.logger.error(f"Reply token 後端（{self.backend.name}）{action}失敗，視為未使用: {error}")
     
     def is_token_used(self, token: str) -> bool:
         """
@@ -31,36 +58,54 @@ class ReplyTokenManager:
         if not token:
             return True  # 空 token 視為已使用
         
-        # 清理過期的 token
-        self._cleanup_expired_tokens()
-        
-        return token in self.used_tokens
+        try:
+            return self.backend.contains_many([make_digest(token, self._digest_key)], self._lifetime_ms)[0]
+        except Exception as error:
+            self._record_backend_error("查詢", error)
+            return False
     
-    def mark_token_used(self, token: str, request_id: str = None) -> bool:
+    def try_claim(self, token: str, request_id: str = None) -> bool:
         """
-        標記 token 為已使用
+        原子性地檢查並標記 token：多個執行緒或實例同時處理同一個 token 時只有一個會成功
         
         Args:
             token: Reply token
             request_id: 請求 ID（用於日誌）
             
         Returns:
-            bool: True 如果成功標記，False 如果 token 已使用或無效
+            bool: True 如果這次呼叫取得 token（後端無法使用時也視為取得），False 如果 token 已使用或無效
         """
         if not token:
             return False
         
-        if self.is_token_used(token):
+        try:
+            claimed = self.backend.claim_many([make_digest(token, self._digest_key)], self._lifetime_ms)[0]
+        except Exception as error:
+            self._record_backend_error("寫入", error)
+            return True
+        if not claimed:
             if request_id:
                 self.logger.warning(f"[{request_id}] Reply token 已使用過: {token[:10]}...")
             return False
         
-        self.used_tokens[token] = datetime.utcnow()
         if request_id:
             self.logger.info(f"[{request_id}] 標記 reply token 為已使用: {token[:10]}...")
         
         return True
     
+    def mark_token_used(self, token: str, request_id: str = None) -> bool:
+        """
+        標記 token 為已使用（與 try_claim 相同）
+        
+        Args:
+            token: Reply token
+            request_id: 請求 ID（用於日誌）
+            
+        Returns:
+            bool: True 如果成功標記，False 如果 token 已使用或無效
+        """
+        return self.try_claim(token, request_id)
+    
     def is_test_token(self, token: str) -> bool:
         """
         檢查是否為測試用的假 token
@@ -83,20 +128,6 @@ class ReplyTokenManager:
         
         return token in test_tokens or token.startswith('test_') or token.startswith('mock_')
     
-    def _cleanup_expired_tokens(self):
-        """清理過期的 token"""
-        current_time = datetime.utcnow()
-        expired_tokens = [
-            token for token, used_time in self.used_tokens.items()
-            if current_time - used_time > self.token_lifetime
-        ]
-        
-        for token in expired_tokens:
-            del self.used_tokens[token]
-        
-        if expired_tokens:
-            self.logger.debug(f"清理了 {len(expired_tokens)} 個過期的 reply token")
-    
     def get_stats(self) -> dict:
         """
         取得統計資訊
@@ -104,16 +135,29 @@ class ReplyTokenManager:
         Returns:
             dict: 包含統計資訊的字典
         """
-        self._cleanup_expired_tokens()
-        
         return {
-            "active_tokens_count": len(self.used_tokens),
-            "token_lifetime_minutes": self.token_lifetime.total_seconds() / 60,
-            "oldest_token_age_minutes": (
-                (datetime.utcnow() - min(self.used_tokens.values())).total_seconds() / 60
-                if self.used_tokens else 0
-            )
+            "token_lifetime_minutes": self._lifetime_ms / 60000,
+            "backend_errors": self.backend_errors,
+            **self.backend.get_stats(),
         }
 
+def _get_int_env(key: str, default: int) -> int:
+    """取得整數型態的選用環境變數，格式錯誤時使用預設值（在匯入時執行，不可拋出例外）"""
+    value = os.getenv(key)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logging.warning(f"環境變數 {key} 不是有效的整數: {value}，改用預設值 {default}")
+        return default
+
 # 全域 reply token 管理器實例
-reply_token_manager = ReplyTokenManager()
+# REPLY_TOKEN_BACKEND 設為 sqlite:///共用路徑 或 redis://... 時，多個實例共用已使用的 reply token
+_max_tokens = _get_int_env("REPLY_TOKEN_MAX_ENTRIES", 100000)
+_digest_key = os.getenv("REPLY_TOKEN_DIGEST_KEY", "")
+reply_token_manager = ReplyTokenManager(
+    max_tokens=_max_tokens,
+    backend=create_token_backend(os.getenv("REPLY_TOKEN_BACKEND", "memory"), _max_tokens),
+    digest_key=_digest_key.encode("utf-8") if _digest_key else None,
+)
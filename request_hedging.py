@@ -0,0 +1,127 @@
+# request_hedging.py - 第一個請求超過延遲百分位數仍未完成時，再送出一個備援請求並採用先完成者
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class RequestHedger:
+    """以過去請求的延遲百分位數作為期限的對沖請求"""
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        default_delay_ms: float = 3000,
+        min_delay_ms: float = 300,
+        window: int = 200,
+        min_samples: int = 20,
+        max_workers: int = 16,
+    ):
+        """
+        初始化對沖器
+
+        Args:
+            percentile: 以第幾百分位數的延遲作為送出備援請求的期限
+            default_delay_ms: 樣本數不足時使用的期限（毫秒）
+            min_delay_ms: 期限下限（毫秒），避免延遲很低時幾乎每個請求都送兩次
+            window: 保留最近幾筆延遲樣本
+            min_samples: 至少需要幾筆樣本才使用百分位數
+            max_workers: 執行請求的執行緒數
+        """
+        self.percentile = percentile
+        self.default_delay_ms = default_delay_ms
+        self.min_delay_ms = min_delay_ms
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedged-request")
+        self.calls = 0
+        self.fired = 0
+        self.won = 0
+        self.failures = 0
+
+    def hedge_delay_ms(self) -> float:
+        """目前送出備援請求的期限（毫秒）"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return self.default_delay_ms
+        index = min(len(samples) - 1, math.ceil(self.percentile / 100 * len(samples)) - 1)
+        return max(self.min_delay_ms, samples[index])
+
+    def _record_latency(self, future, started: float) -> None:
+        """記錄第一個請求的延遲（不論是否被備援請求搶先），只計成功的請求"""
+        if not future.cancelled() and future.exception() is None:
+            with self._lock:
+                self._latencies.append((time.monotonic() - started) * 1000)
+
+    def call(self, primary: Callable[[], T], backup: Optional[Callable[[], T]] = None) -> T:
+        """
+        執行請求；超過期限仍未完成時送出備援請求，採用最先成功的結果
+
+        已送出的 HTTP 請求無法中斷，落後的請求會在背景完成後被丟棄；尚未開始的請求則會被取消。
+
+        Args:
+            primary: 第一個請求
+            backup: 備援請求，省略時再執行一次 primary
+
+        Returns:
+            T: 最先成功完成的請求結果；兩者皆失敗時拋出第一個請求的例外
+        """
+        with self._lock:
+            self.calls += 1
+        started = time.monotonic()
+        first = self._executor.submit(primary)
+        first.add_done_callback(lambda f: self._record_latency(f, started))
+        try:
+            return first.result(timeout=self.hedge_delay_ms() / 1000)
+        except FutureTimeout:
+            if first.done():
+                raise
+
+        with self._lock:
+            self.fired += 1
+        second = self._executor.submit(backup or primary)
+        pending = {first, second}
+        errors = {}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # 同時完成時優先採用第一個請求
+            for future in sorted(done, key=lambda f: f is second):
+                if future.exception() is None:
+                    if future is second:
+                        with self._lock:
+                            self.won += 1
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                errors[future] = future.exception()
+
+        with self._lock:
+            self.failures += 1
+        raise errors.get(first) or errors[second]
+
+    def get_stats(self) -> dict:
+        """
+        取得統計資訊
+
+        Returns:
+            dict: 包含請求數、送出備援請求的次數與比例、備援請求勝出的次數與比例，以及目前的期限
+        """
+        delay_ms = self.hedge_delay_ms()
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "fired": self.fired,
+                "won": self.won,
+                "failures": self.failures,
+                "fire_rate": round(self.fired / self.calls, 4) if self.calls else 0.0,
+                "win_rate": round(self.won / self.fired, 4) if self.fired else 0.0,
+                "delay_ms": round(delay_ms, 1),
+                "samples": len(self._latencies),
+            }
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# benchmark_language_detection.py - 比較逐字判斷中文與 language_detector 在 10 KB 輸入上的速度
+# 註：中文訊息的第一個字就是中文，原本的迴圈會立即返回，但它也因此無法計算比例
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from language_detector import detect_language
+
+INPUT_BYTES = 10 * 1024
+REPEAT = 5
+NUMBER = 200
+
+
+def legacy_is_chinese(text: str) -> bool:
+    """原本的 is_chinese：逐字檢查是否有中文字元"""
+    for char in text:
+        code = ord(char)
+        if 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF:
+            return True
+    return False
+
+
+def make_input(unit: str) -> str:
+    """重複 unit 直到 UTF-8 長度約為 10 KB"""
+    count = max(1, INPUT_BYTES // len(unit.encode("utf-8")))
+    return unit * count
+
+
+def best_microseconds(fn, text: str) -> float:
+    """回傳多次量測中最快的單次執行時間（微秒）"""
+    timings = timeit.repeat(lambda: fn(text), repeat=REPEAT, number=NUMBER)
+    return min(timings) / NUMBER * 1e6
+
+
+def main():
+    cases = {
+        # 英文訊息結尾才出現中文名字：原本的迴圈必須掃完整段才會找到
+        "english + trailing name": make_input("Please review the quarterly report. ") + "王小明",
+        "english only": make_input("Please review the quarterly report. "),
+        "traditional chinese": make_input("請在明天之前檢查季度報告。"),
+    }
+
+    print(f"{'case':<26}{'legacy (us)':>14}{'detector (us)':>16}{'speedup':>10}")
+    for name, text in cases.items():
+        legacy = best_microseconds(legacy_is_chinese, text)
+        detector = best_microseconds(detect_language, text)
+        print(f"{name:<26}{legacy:>14.1f}{detector:>16.1f}{legacy / detector:>9.1f}x")
+        print(f"{'':<26}-> {detect_language(text)}")
+
+
+if __name__ == "__main__":
+    main()
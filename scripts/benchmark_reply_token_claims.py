@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# benchmark_reply_token_claims.py - 多執行緒壓力測試 try_claim：每個 token 由所有執行緒同時搶，檢查沒有重複取得並量測吞吐量
+# 比較單一鎖（shards=1）與分片鎖（shards=16）在 1、8、32 個執行緒下的表現
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from reply_token_manager import ReplyTokenManager
+from token_backends import MemoryTokenBackend
+
+TOKENS = 20_000
+THREAD_COUNTS = (1, 8, 32)
+SHARD_COUNTS = (1, 16)
+
+
+def run(threads: int, shards: int):
+    """回傳（每秒 try_claim 次數, 重複取得的 token 數, 沒有被取得的 token 數）"""
+    # 容量以分片為單位計算，留一倍空間避免分片不均時淘汰尚未過期的 token
+    manager = ReplyTokenManager(backend=MemoryTokenBackend(capacity=2 * TOKENS, shards=shards))
+    tokens = [f"reply-token-{i:08d}" for i in range(TOKENS)]
+    wins = [0] * TOKENS
+    wins_lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker(offset: int):
+        claimed = []
+        barrier.wait()
+        # 每個執行緒從不同位置開始繞一圈，讓多個執行緒同時搶同一個 token
+        for step in range(TOKENS):
+            index = (offset + step) % TOKENS
+            if manager.try_claim(tokens[index]):
+                claimed.append(index)
+        with wins_lock:
+            for index in claimed:
+                wins[index] += 1
+
+    workers = [threading.Thread(target=worker, args=(i * TOKENS // threads,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    duplicates = sum(1 for count in wins if count > 1)
+    missing = sum(1 for count in wins if count == 0)
+    return threads * TOKENS / elapsed, duplicates, missing
+
+
+def main():
+    print(f"{'shards':>7}{'threads':>9}{'claims/s':>14}{'duplicates':>12}{'missing':>9}")
+    failed = False
+    for shards in SHARD_COUNTS:
+        for threads in THREAD_COUNTS:
+            throughput, duplicates, missing = run(threads, shards)
+            failed |= bool(duplicates or missing)
+            print(f"{shards:>7}{threads:>9}{throughput:>14,.0f}{duplicates:>12}{missing:>9}")
+    if failed:
+        print("FAILED: 有 token 被重複取得或沒有被取得")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
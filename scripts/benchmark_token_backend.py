@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# benchmark_token_backend.py - 量測 mark_token_used 在各後端的延遲百分位數（單執行緒與 8 個執行緒同時標記）
+# 設定 REDIS_URL 時一併量測 Redis 後端
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from reply_token_manager import ReplyTokenManager
+from token_backends import create_token_backend
+
+CALLS = 2000
+THREADS = 8
+
+
+def timed_mark(manager: ReplyTokenManager) -> float:
+    """標記一個新 token，回傳耗時（毫秒）"""
+    token = uuid.uuid4().hex
+    started = time.perf_counter()
+    manager.mark_token_used(token)
+    return (time.perf_counter() - started) * 1000
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    return statistics.median(ordered), ordered[int(len(ordered) * 0.99) - 1]
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    urls = {
+        "memory": "memory",
+        "sqlite": f"sqlite:///{os.path.join(directory, 'tokens.db')}",
+    }
+    if os.getenv("REDIS_URL"):
+        urls["redis"] = os.getenv("REDIS_URL")
+
+    print(f"{'backend':<10}{'threads':>8}{'p50 (ms)':>11}{'p99 (ms)':>11}{'tokens/round trip':>19}")
+    for name, url in urls.items():
+        for threads in (1, THREADS):
+            manager = ReplyTokenManager(backend=create_token_backend(url))
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                samples = list(executor.map(lambda _: timed_mark(manager), range(CALLS)))
+            p50, p99 = percentiles(samples)
+            batching = manager.get_stats().get("batching", {})
+            per_trip = batching.get("requests_per_round_trip", "-")
+            print(f"{name:<10}{threads:>8}{p50:>11.3f}{p99:>11.3f}{per_trip:>19}")
+
+
+if __name__ == "__main__":
+    main()
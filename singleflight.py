@@ -0,0 +1,66 @@
+# singleflight.py - 合併相同鍵的並行呼叫，讓多個呼叫端共用同一次執行結果
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """同一個鍵在執行中時，後到的呼叫端等待並共用第一個呼叫的結果"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        """
+        執行 fn，若相同鍵已在執行中則等待其結果
+
+        Args:
+            key: 合併用的鍵
+            fn: 實際執行的函式
+
+        Returns:
+            fn 的回傳值（可能來自其他執行緒的執行結果）
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = Future()
+                self._in_flight[key] = future
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def get_stats(self) -> dict:
+        """
+        取得統計資訊
+
+        Returns:
+            dict: 包含實際執行次數與被合併的呼叫次數
+        """
+        with self._lock:
+            return {
+                "in_flight": len(self._in_flight),
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+            }
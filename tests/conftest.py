@@ -5,7 +5,10 @@ pytest 配置和測試 fixtures
 
 import os
 import json
+import time
+import uuid
 import pytest
+from types import SimpleNamespace
 from unittest.mock import Mock, patch, MagicMock
 from typing import Dict, Any
 
@@ -47,6 +50,40 @@ def mock_openai_client():
     mock_client.chat.completions.create.return_value = mock_response
     return mock_client
 
+@pytest.fixture
+def make_openai_response():
+    """建立模擬 OpenAI 回應的工廠函式"""
+    def _make(content):
+        response = Mock()
+        response.choices = [Mock()]
+        response.choices[0].message = Mock()
+        response.choices[0].message.content = content
+        return response
+    return _make
+
+@pytest.fixture
+def translation_handler(mock_openai_client):
+    """使用模擬 OpenAI 客戶端的翻譯處理器"""
+    with patch.dict(os.environ, TEST_ENV_VARS):
+        from function_app import EnvironmentConfig, TranslationBotHandler
+
+        handler = TranslationBotHandler(EnvironmentConfig())
+    handler.openai_client = mock_openai_client
+    return handler
+
+@pytest.fixture
+def make_text_event():
+    """建立模擬 LINE 文字訊息事件的工廠函式"""
+    def _make(text, group_id="group-1"):
+        return SimpleNamespace(
+            type="message",
+            timestamp=int(time.time() * 1000),
+            source=SimpleNamespace(type="group", group_id=group_id, room_id=None, user_id="user-1"),
+            reply_token=f"reply-{uuid.uuid4().hex}",
+            message=SimpleNamespace(type="text", text=text),
+        )
+    return _make
+
 @pytest.fixture
 def sample_teams_webhook():
     """範例 Teams webhook 資料"""
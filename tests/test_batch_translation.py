@@ -0,0 +1,108 @@
+"""
+批次翻譯測試
+測試 translate_batch 的 JSON 輸入輸出對應、格式錯誤時的逐則重試，以及 handle_events 的批次模式
+"""
+
+import json
+from unittest.mock import patch
+
+
+class TestTranslateBatch:
+    """translate_batch 單元測試"""
+
+    def test_single_request_maps_results_by_id(self, translation_handler, mock_openai_client, make_openai_response):
+        """測試多則訊息以單一請求翻譯，並依 id 對應回原本順序"""
+        mock_openai_client.chat.completions.create.return_value = make_openai_response(json.dumps({
+            "translations": [{"id": 1, "text": "早安"}, {"id": 0, "text": "Thanks"}]
+        }))
+
+        results = translation_handler.translate_batch(["謝謝", "Good morning"], "req-1")
+
+        assert results == ["Thanks", "早安"]
+        assert mock_openai_client.chat.completions.create.call_count == 1
+        assert translation_handler.batch_stats["requests"] == 1
+
+    def test_batch_prompt_carries_direction_per_item(self, translation_handler):
+        """測試批次 prompt 為每則訊息標示翻譯方向"""
+        _, user_prompt = translation_handler._build_batch_prompts(["謝謝", "Good morning"])
+        items = json.loads(user_prompt)
+
+        assert [item["to"] for item in items] == ["en", "zh-Hant"]
+        assert [item["id"] for item in items] == [0, 1]
+
+    def test_malformed_output_falls_back_per_message(self, translation_handler, mock_openai_client, make_openai_response):
+        """測試批次輸出不是 JSON 時改為逐則翻譯"""
+        mock_openai_client.chat.completions.create.side_effect = [
+            make_openai_response("not json"),
+            make_openai_response("first"),
+            make_openai_response("second"),
+        ]
+
+        results = translation_handler.translate_batch(["one", "two"], "req-1")
+
+        assert sorted(results) == ["first", "second"]
+        assert translation_handler.batch_stats["failures"] == 1
+        assert mock_openai_client.chat.completions.create.call_count == 3
+
+    def test_missing_item_retried_individually(self, translation_handler, mock_openai_client, make_openai_response):
+        """測試批次輸出缺少某個 id 時只重試該則"""
+        mock_openai_client.chat.completions.create.side_effect = [
+            make_openai_response(json.dumps({"translations": [{"id": 0, "text": "一"}]})),
+            make_openai_response("二"),
+        ]
+
+        results = translation_handler.translate_batch(["one", "two"], "req-1")
+
+        assert results == ["一", "二"]
+        assert translation_handler.batch_stats["fallbacks"] == 1
+
+    def test_duplicates_and_cache_hits_not_sent(self, translation_handler, mock_openai_client, make_openai_response):
+        """測試重複訊息只翻譯一次，已快取的訊息不送出"""
+        translation_handler._remember_translation(
+            translation_handler._translation_cache_key("cached"), "已快取"
+        )
+        mock_openai_client.chat.completions.create.return_value = make_openai_response(json.dumps({
+            "translations": [{"id": 0, "text": "你好"}, {"id": 1, "text": "再見"}]
+        }))
+
+        results = translation_handler.translate_batch(["hello", "cached", "bye", "hello"], "req-1")
+
+        assert results == ["你好", "已快取", "再見", "你好"]
+        items = json.loads(mock_openai_client.chat.completions.create.call_args.kwargs["messages"][1]["content"])
+        assert [item["text"] for item in items] == ["hello", "bye"]
+
+
+class TestBatchModeEvents:
+    """handle_events 批次模式測試"""
+
+    def test_batch_mode_replies_each_token(self, translation_handler, make_text_event):
+        """測試批次模式將結果依序回覆給每個 reply token"""
+        translation_handler.config.translation_batch_mode = True
+        events = [make_text_event("one"), make_text_event("two")]
+
+        with patch.object(translation_handler, "translate_batch", return_value=["一", "二"]) as mock_batch, \
+                patch.object(translation_handler, "_send_reply") as mock_send:
+            translation_handler.handle_events(events, "req-1")
+
+        mock_batch.assert_called_once_with(["one", "two"], "req-1")
+        assert [(c.args[0], c.args[1]) for c in mock_send.call_args_list] == [
+            (events[0].reply_token, "一"),
+            (events[1].reply_token, "二"),
+        ]
+
+    def test_batch_failure_falls_back_per_event(self, translation_handler, make_text_event):
+        """測試批次翻譯拋出例外時改為逐一翻譯，每個事件仍有回覆"""
+        translation_handler.config.translation_batch_mode = True
+        events = [make_text_event("one"), make_text_event("two")]
+        translations = {"one": "一", "two": "二"}
+
+        with patch.object(translation_handler, "translate_batch", side_effect=RuntimeError("boom")), \
+                patch.object(translation_handler, "translate_message",
+                             side_effect=lambda text, request_id: translations[text]), \
+                patch.object(translation_handler, "_send_reply") as mock_send:
+            translation_handler.handle_events(events, "req-1")
+
+        assert sorted((c.args[0], c.args[1]) for c in mock_send.call_args_list) == sorted([
+            (events[0].reply_token, "一"),
+            (events[1].reply_token, "二"),
+        ])
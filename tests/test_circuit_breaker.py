@@ -0,0 +1,146 @@
+"""
+斷路器測試
+測試連續失敗或過慢時開啟、冷卻後半開試探，以及翻譯時的快速失敗與備援模型
+"""
+
+import time
+from unittest.mock import Mock, patch
+
+from openai import APITimeoutError
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class TestCircuitBreaker:
+    """CircuitBreaker 單元測試"""
+
+    def test_opens_after_consecutive_failures(self):
+        """測試連續失敗達到門檻後開啟並拒絕請求"""
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout_seconds=60)
+        for _ in range(3):
+            assert breaker.allow_request()
+            breaker.record_failure()
+
+        assert breaker.state == OPEN
+        assert not breaker.allow_request()
+        assert breaker.get_stats()["rejected"] == 1
+
+    def test_success_resets_failure_count(self):
+        """測試成功的呼叫會重設連續失敗次數"""
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success(10)
+        breaker.record_failure()
+
+        assert breaker.state == CLOSED
+
+    def test_slow_calls_count_as_failures(self):
+        """測試過慢的成功呼叫視為失敗"""
+        breaker = CircuitBreaker(failure_threshold=2, slow_call_ms=100)
+        breaker.record_success(500)
+        breaker.record_success(500)
+
+        assert breaker.state == OPEN
+        assert breaker.get_stats()["slow_calls"] == 2
+
+    def test_half_open_allows_single_probe(self):
+        """測試冷卻後只放行一個試探請求，成功後關閉"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+
+        assert breaker.allow_request()
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow_request()
+
+        breaker.record_success(10)
+        assert breaker.state == CLOSED
+
+    def test_failed_probe_reopens(self):
+        """測試試探失敗時重新開啟"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        breaker.allow_request()
+        breaker.record_failure()
+
+        assert breaker.state == OPEN
+        assert breaker.get_stats()["opened"] == 2
+
+
+    def test_inconclusive_call_releases_probe(self):
+        """測試無法判斷的試探不開啟斷路器，但會釋放試探名額"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        assert breaker.allow_request()
+
+        breaker.record_inconclusive()
+
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow_request()
+        assert breaker.get_stats()["inconclusive"] == 1
+
+
+class TestTranslationCircuitBreaker:
+    """translate_message 斷路器測試"""
+
+    def test_open_circuit_fails_fast(self, translation_handler, mock_openai_client):
+        """測試斷路器開啟時不呼叫 OpenAI，直接回覆服務暫停訊息"""
+        translation_handler.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=60)
+        translation_handler.circuit_breaker.record_failure()
+
+        result = translation_handler.translate_message("Hello there", "req-1")
+
+        assert result == "翻譯服務暫時無法使用，請稍後再試。"
+        mock_openai_client.chat.completions.create.assert_not_called()
+
+    def test_failures_switch_to_fallback_model(self, translation_handler, mock_openai_client, make_openai_response):
+        """測試主要模型失敗時改用備援模型，斷路器開啟後直接使用備援模型"""
+        translation_handler.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=60)
+        translation_handler.config.openai_fallback_model = "fallback-model"
+
+        def create(**kwargs):
+            if kwargs["model"] != "fallback-model":
+                raise RuntimeError("service unavailable")
+            return make_openai_response("備援翻譯")
+
+        mock_openai_client.chat.completions.create.side_effect = create
+
+        assert translation_handler.translate_message("Hello there", "req-1") == "備援翻譯"
+        assert translation_handler.translate_message("Good morning", "req-2") == "備援翻譯"
+
+        models = [call.kwargs["model"] for call in mock_openai_client.chat.completions.create.call_args_list]
+        assert models.count("fallback-model") == 2
+        assert len(models) == 3
+        assert translation_handler.circuit_breaker.state == OPEN
+
+    def test_timeout_capped_by_reply_budget(self, translation_handler, mock_openai_client):
+        """測試請求逾時不超過回覆 token 的剩餘時間"""
+        deadline = time.time() + 5
+        translation_handler._run_with_deadline(deadline, translation_handler.translate_message, "Hello there", "req-1")
+
+        timeout = mock_openai_client.chat.completions.create.call_args.kwargs["timeout"]
+        assert 1 <= timeout <= 5
+
+    def test_deadline_capped_timeout_not_counted_as_failure(self, translation_handler, mock_openai_client):
+        """測試逾時秒數因回覆期限縮短而逾時時不計入失敗，使用設定的逾時秒數時才計入"""
+        translation_handler.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=60)
+        mock_openai_client.chat.completions.create.side_effect = APITimeoutError(request=Mock())
+
+        translation_handler._run_with_deadline(time.time() + 3, translation_handler.translate_message, "Hello", "req-1")
+        assert translation_handler.circuit_breaker.state == CLOSED
+
+        translation_handler.translate_message("Good morning", "req-2")
+        assert translation_handler.circuit_breaker.state == OPEN
+
+    def test_clients_do_not_retry(self, translation_handler):
+        """測試主要與備援 OpenAI client 都停用 SDK 的自動重試"""
+        config = translation_handler.config
+        config.openai_fallback_model = "fallback-model"
+        config.openai_fallback_base_url = "https://fallback.example.com/v1"
+        with patch("function_app.OpenAI", Mock()) as mock_openai:
+            from function_app import TranslationBotHandler
+            TranslationBotHandler(config)
+
+        assert [call.kwargs["max_retries"] for call in mock_openai.call_args_list] == [0, 0]
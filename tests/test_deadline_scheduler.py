@@ -0,0 +1,130 @@
+"""
+期限排程測試
+測試依回覆 token 期限排序的執行緒池，以及逾期或 token 被拒時改用 push 發送翻譯
+"""
+
+import threading
+import time
+from unittest.mock import Mock, patch
+
+from deadline_scheduler import EarliestDeadlineExecutor
+from function_app import REPLY_SENT, REPLY_TOKEN_REJECTED
+
+
+class TestEarliestDeadlineExecutor:
+    """EarliestDeadlineExecutor 單元測試"""
+
+    def test_runs_earliest_deadline_first(self):
+        """測試佇列中的工作依期限執行，沒有期限的排在最後"""
+        executor = EarliestDeadlineExecutor(max_workers=1)
+        gate = threading.Event()
+        order = []
+        executor.submit(gate.wait)
+
+        now = time.time()
+        futures = [
+            executor.submit(order.append, "none"),
+            executor.submit_with_deadline(now + 30, order.append, "late"),
+            executor.submit_with_deadline(now + 10, order.append, "early"),
+            executor.submit_with_deadline(now + 20, order.append, "middle"),
+        ]
+        gate.set()
+        for future in futures:
+            future.result(timeout=1)
+        executor.shutdown()
+
+        assert order == ["early", "middle", "late", "none"]
+
+    def test_counts_jobs_started_after_deadline(self):
+        """測試開始執行時已逾期的工作會被記錄"""
+        executor = EarliestDeadlineExecutor(max_workers=2)
+        executor.submit_with_deadline(time.time() - 1, lambda: None).result(timeout=1)
+        executor.submit_with_deadline(time.time() + 60, lambda: None).result(timeout=1)
+
+        stats = executor.get_stats()
+        assert (stats["submitted"], stats["started_late"]) == (2, 1)
+
+    def test_burst_after_warm_up_runs_in_parallel(self):
+        """測試執行緒池已有閒置執行緒時，一次送出多個工作仍會新增執行緒並行執行"""
+        executor = EarliestDeadlineExecutor(max_workers=8)
+        for future in [executor.submit(time.sleep, 0.05) for _ in range(2)]:
+            future.result(timeout=1)
+        time.sleep(0.05)
+
+        started = time.monotonic()
+        for future in [executor.submit(time.sleep, 0.3) for _ in range(5)]:
+            future.result(timeout=2)
+        elapsed = time.monotonic() - started
+
+        assert elapsed < 0.55
+        assert executor.get_stats()["workers"] == 5
+        executor.shutdown()
+
+    def test_propagates_exceptions_and_supports_map(self):
+        """測試例外透過 Future 傳回，並支援 Executor.map"""
+        executor = EarliestDeadlineExecutor(max_workers=2)
+
+        def failing():
+            raise ValueError("boom")
+
+        assert isinstance(executor.submit(failing).exception(timeout=1), ValueError)
+        assert list(executor.map(lambda x: x * 2, [1, 2, 3])) == [2, 4, 6]
+
+
+class TestReplyDelivery:
+    """回覆發送與 push 備援測試"""
+
+    def test_expired_event_is_pushed(self, translation_handler, make_text_event):
+        """測試超過回覆期限的事件直接以 push 發送到原群組"""
+        event = make_text_event("Hello there")
+        event.timestamp -= 120 * 1000
+        translation_handler.line_client = Mock()
+        messaging_api = translation_handler.line_client.messaging_api
+
+        with patch.object(translation_handler, "translate_message", return_value="你好"), \
+                patch.object(translation_handler, "_send_reply") as mock_send:
+            translation_handler.handle_events([event], "req-1")
+
+        mock_send.assert_not_called()
+        request = messaging_api.push_message_with_http_info.call_args.args[0]
+        assert request.to == "group-1"
+        assert request.messages[0].text == "你好"
+        assert translation_handler.delivery_stats["push_expired"] == 1
+
+    def test_rejected_token_falls_back_to_push(self, translation_handler, make_text_event):
+        """測試 reply token 被拒時改用 push"""
+        event = make_text_event("Hello there")
+        translation_handler.line_client = Mock()
+        messaging_api = translation_handler.line_client.messaging_api
+
+        with patch.object(translation_handler, "translate_message", return_value="你好"), \
+                patch.object(translation_handler, "_send_reply", return_value=REPLY_TOKEN_REJECTED):
+            translation_handler.handle_events([event], "req-1")
+
+        messaging_api.push_message_with_http_info.assert_called_once()
+        assert translation_handler.delivery_stats["push_reply_failed"] == 1
+
+    def test_push_fallback_can_be_disabled(self, translation_handler, make_text_event):
+        """測試關閉 REPLY_PUSH_FALLBACK 時不發送 push"""
+        translation_handler.config.reply_push_fallback = False
+        event = make_text_event("Hello there")
+        event.timestamp -= 120 * 1000
+        translation_handler.line_client = Mock()
+        messaging_api = translation_handler.line_client.messaging_api
+
+        with patch.object(translation_handler, "translate_message", return_value="你好"):
+            translation_handler.handle_events([event], "req-1")
+
+        messaging_api.push_message_with_http_info.assert_not_called()
+        assert translation_handler.delivery_stats["dropped"] == 1
+
+    def test_reply_within_deadline(self, translation_handler, make_text_event):
+        """測試期限內以 reply token 回覆"""
+        event = make_text_event("Hello there")
+
+        with patch.object(translation_handler, "translate_message", return_value="你好"), \
+                patch.object(translation_handler, "_send_reply", return_value=REPLY_SENT) as mock_send:
+            translation_handler.handle_events([event], "req-1")
+
+        assert mock_send.call_args.args[:2] == (event.reply_token, "你好")
+        assert translation_handler.delivery_stats["reply"] == 1
@@ -0,0 +1,170 @@
+"""
+事件去重測試
+測試 webhookEventId 的 Bloom filter 去重、時間窗輪替、固定的記憶體用量，以及 line_callback 前的重複事件捨棄
+"""
+
+import hashlib
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import azure.functions as func
+
+from event_deduplicator import BloomFilter, EventDeduplicator
+from token_backends import MemoryTokenBackend, SqliteTokenBackend
+
+
+class TestBloomFilter:
+    """BloomFilter 單元測試"""
+
+    def test_no_false_negatives(self):
+        """測試放入的摘要一定會被找到"""
+        bloom = BloomFilter(capacity=1000)
+        digests = [hashlib.blake2b(str(i).encode(), digest_size=16).digest() for i in range(1000)]
+        for digest in digests:
+            bloom.add(digest)
+
+        assert all(digest in bloom for digest in digests)
+
+    def test_false_positive_rate_near_target(self):
+        """測試在預期容量下誤判率接近設定值"""
+        bloom = BloomFilter(capacity=5000, error_rate=0.01)
+        for i in range(5000):
+            bloom.add(hashlib.blake2b(f"in-{i}".encode(), digest_size=16).digest())
+
+        hits = sum(hashlib.blake2b(f"out-{i}".encode(), digest_size=16).digest() in bloom for i in range(5000))
+        assert hits / 5000 < 0.03
+
+
+class TestEventDeduplicator:
+    """EventDeduplicator 單元測試"""
+
+    def test_second_delivery_is_duplicate(self):
+        """測試同一個 webhookEventId 第二次出現時判定為重複"""
+        dedup = EventDeduplicator()
+
+        assert not dedup.seen("01HEVENT1")
+        assert dedup.seen("01HEVENT1")
+        assert not dedup.seen("01HEVENT2")
+        assert not dedup.seen("")
+        assert dedup.get_stats()["duplicates"] == 1
+
+    def test_remembers_previous_window(self, monkeypatch):
+        """測試輪替一次後仍記得前一個時間窗的事件，輪替兩次後忘記"""
+        now = [1000.0]
+        monkeypatch.setattr("event_deduplicator.time.monotonic", lambda: now[0])
+        dedup = EventDeduplicator(window_seconds=60)
+        dedup.seen("event-a")
+
+        now[0] += 61
+        assert dedup.seen("event-a")
+
+        now[0] += 120
+        assert not dedup.seen("event-a")
+        assert dedup.get_stats()["rotations"] == 2
+
+    def test_memory_is_fixed(self):
+        """測試記憶體用量不隨事件數增加"""
+        dedup = EventDeduplicator(capacity=100)
+        before = dedup.get_stats()
+        for i in range(1000):
+            dedup.seen(f"event-{i}")
+        after = dedup.get_stats()
+
+        assert after["bloom_bytes"] == before["bloom_bytes"]
+        assert after["exact_entries"] <= after["exact_capacity"] == 200
+
+
+class TestSharedEventDeduplication:
+    """以共用後端跨實例去重的測試"""
+
+    def test_redelivery_to_other_instance_is_duplicate(self, tmp_path):
+        """測試兩個實例共用 SQLite 時，重送到另一個實例的事件判定為重複"""
+        path = str(tmp_path / "shared.db")
+        first = EventDeduplicator(backend=SqliteTokenBackend(path))
+        second = EventDeduplicator(backend=SqliteTokenBackend(path))
+
+        assert not first.seen("01HEVENT1")
+        assert second.seen("01HEVENT1")
+        assert not second.seen("01HEVENT2")
+        assert second.get_stats()["shared_duplicates"] == 1
+
+    def test_backend_failure_treats_event_as_new(self, tmp_path):
+        """測試共用後端失敗時視為新事件，不捨棄訊息"""
+        backend = SqliteTokenBackend(str(tmp_path / "shared.db"))
+        dedup = EventDeduplicator(backend=backend)
+
+        with patch.object(backend, "claim_many", side_effect=ConnectionError("down")):
+            assert not dedup.seen("01HEVENT1")
+        assert dedup.get_stats()["backend_errors"] == 1
+
+    def test_local_backend_is_ignored(self):
+        """測試非共用後端不會被當成跨實例確認"""
+        dedup = EventDeduplicator(backend=MemoryTokenBackend())
+
+        assert dedup.backend is None
+
+
+class TestDuplicateEventFiltering:
+    """TranslationBotHandler.drop_duplicate_events 測試"""
+
+    def test_redelivered_event_is_not_translated(self, translation_handler, make_text_event):
+        """測試重送的事件（reply token 不同、webhookEventId 相同）不會再次翻譯"""
+        first = make_text_event("Hello there")
+        first.webhook_event_id = "01HEVENT1"
+        redelivery = make_text_event("Hello there")
+        redelivery.webhook_event_id = "01HEVENT1"
+        redelivery.delivery_context = SimpleNamespace(is_redelivery=True)
+
+        with patch.object(translation_handler, "translate_message", return_value="你好") as mock_translate, \
+                patch.object(translation_handler, "_send_reply"):
+            for event in (first, redelivery):
+                translation_handler.handle_events(
+                    translation_handler.drop_duplicate_events([event], "req-1"), "req-1"
+                )
+
+        assert mock_translate.call_count == 1
+
+    def test_disabled_keeps_all_events(self, translation_handler, make_text_event):
+        """測試關閉去重時保留所有事件"""
+        translation_handler.event_deduplicator = None
+        events = [make_text_event("Hello"), make_text_event("Hello")]
+        for event in events:
+            event.webhook_event_id = "same"
+
+        assert translation_handler.drop_duplicate_events(events, "req-1") == events
+
+    def test_test_mode_events_without_ids_are_all_handled(self, translation_handler):
+        """測試測試模式下沒有 webhookEventId 的事件不會因共用預設 ID 而被捨棄"""
+        import function_app
+
+        def make_request(text):
+            body = {
+                "events": [{
+                    "type": "message",
+                    "timestamp": int(time.time() * 1000),
+                    "source": {"type": "user", "userId": "user-1"},
+                    "replyToken": "reply-token-1",
+                    "message": {"type": "text", "text": text},
+                }]
+            }
+            return func.HttpRequest(
+                method="POST",
+                body=json.dumps(body).encode("utf-8"),
+                url="http://localhost:7071/api/callback",
+                headers={"Content-Type": "application/json"},
+            )
+
+        translation_handler.config.test_mode = True
+        callback = function_app.line_callback._function.get_user_function()
+        with patch.object(function_app, "config", translation_handler.config), \
+                patch.object(function_app, "translation_handler", translation_handler), \
+                patch.object(function_app, "event_queue", None), \
+                patch.object(function_app, "webhook_logger"), \
+                patch.object(translation_handler, "handle_events") as mock_handle:
+            for text in ("first", "second"):
+                assert callback(make_request(text)).status_code == 200
+
+        handled = [call.args[0] for call in mock_handle.call_args_list]
+        assert [events[0].message.text for events in handled] == ["first", "second"]
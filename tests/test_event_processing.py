@@ -0,0 +1,59 @@
+"""
+事件處理測試
+測試 TranslationBotHandler.handle_events 的並行翻譯與同一來源的回覆順序
+"""
+
+import time
+import uuid
+from types import SimpleNamespace
+from unittest.mock import patch
+
+
+class TestConcurrentEventProcessing:
+    """handle_events 並行處理測試"""
+
+    def test_batch_takes_about_as_long_as_slowest_translation(self, translation_handler, make_text_event):
+        """測試 5 個事件的處理時間接近最慢的單一翻譯，而非總和"""
+        def slow_translate(text, request_id):
+            time.sleep(0.2)
+            return f"translated {text}"
+
+        events = [make_text_event(f"message {i}", group_id=f"group-{i % 2}") for i in range(5)]
+        with patch.object(translation_handler, "translate_message", side_effect=slow_translate), \
+                patch.object(translation_handler, "_send_reply") as mock_send:
+            started = time.monotonic()
+            translation_handler.handle_events(events, "req-1")
+            elapsed = time.monotonic() - started
+
+        assert mock_send.call_count == 5
+        assert elapsed < 0.6
+
+    def test_replies_in_same_source_keep_order(self, translation_handler, make_text_event):
+        """測試同一來源的回覆順序與事件順序一致，即使後面的翻譯較早完成"""
+        delays = {"first": 0.3, "second": 0.1, "third": 0.0}
+
+        def translate(text, request_id):
+            time.sleep(delays[text])
+            return text
+
+        events = [make_text_event(text) for text in ("first", "second", "third")]
+        with patch.object(translation_handler, "translate_message", side_effect=translate), \
+                patch.object(translation_handler, "_send_reply") as mock_send:
+            translation_handler.handle_events(events, "req-1")
+
+        sent = [call.args[1] for call in mock_send.call_args_list]
+        assert sent == ["first", "second", "third"]
+
+    def test_non_text_events_are_ignored(self, translation_handler):
+        """測試非文字訊息事件不會觸發翻譯"""
+        sticker_event = SimpleNamespace(
+            type="message",
+            reply_token=f"reply-{uuid.uuid4().hex}",
+            message=SimpleNamespace(type="sticker"),
+        )
+        with patch.object(translation_handler, "translate_message") as mock_translate, \
+                patch.object(translation_handler, "_send_reply") as mock_send:
+            translation_handler.handle_events([sticker_event], "req-1")
+
+        mock_translate.assert_not_called()
+        mock_send.assert_not_called()
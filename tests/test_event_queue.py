@@ -0,0 +1,71 @@
+"""
+背景事件佇列測試
+測試 EventWorkQueue 的背景處理、佇列滿時的捨棄行為與統計資訊
+"""
+
+import threading
+
+from event_queue import EventWorkQueue
+
+
+class TestEventWorkQueue:
+    """EventWorkQueue 單元測試"""
+
+    def test_events_processed_in_background(self):
+        """測試放入佇列的事件由背景執行緒處理"""
+        handled = []
+        work_queue = EventWorkQueue(lambda events, request_id: handled.append((events, request_id)))
+
+        assert work_queue.submit(["event"], "req-1")
+        assert work_queue.join(timeout=5)
+
+        assert handled == [(["event"], "req-1")]
+        stats = work_queue.get_stats()
+        assert stats["enqueued"] == 1
+        assert stats["processed"] == 1
+        assert stats["depth"] == 0
+
+    def test_submit_returns_without_waiting_for_handler(self):
+        """測試 submit 不會等待事件處理完成"""
+        release = threading.Event()
+        work_queue = EventWorkQueue(lambda events, request_id: release.wait(5), workers=1)
+
+        assert work_queue.submit(["event"], "req-1")
+        assert work_queue.get_stats()["processed"] == 0
+
+        release.set()
+        assert work_queue.join(timeout=5)
+
+    def test_full_queue_drops_work(self):
+        """測試佇列滿時捨棄新的工作並計數"""
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocking_handler(events, request_id):
+            started.set()
+            release.wait(5)
+
+        work_queue = EventWorkQueue(blocking_handler, max_size=1, workers=1)
+        assert work_queue.submit(["first"], "req-1")
+        assert started.wait(5)
+        assert work_queue.submit(["second"], "req-2")
+        assert not work_queue.submit(["third"], "req-3")
+
+        release.set()
+        assert work_queue.join(timeout=5)
+        stats = work_queue.get_stats()
+        assert stats["dropped"] == 1
+        assert stats["processed"] == 2
+
+    def test_handler_failure_is_counted(self):
+        """測試處理失敗不會中斷背景執行緒"""
+
+        def failing_handler(events, request_id):
+            raise RuntimeError("boom")
+
+        work_queue = EventWorkQueue(failing_handler, workers=1)
+        work_queue.submit(["a"], "req-1")
+        work_queue.submit(["b"], "req-2")
+        assert work_queue.join(timeout=5)
+
+        assert work_queue.get_stats()["failed"] == 2
@@ -0,0 +1,95 @@
+"""
+詞彙表測試
+測試 Aho-Corasick 比對、檔案更新時才重建，以及翻譯時固定專有名詞的譯名
+"""
+
+import json
+import os
+
+import pytest
+
+from glossary import AhoCorasick, Glossary
+
+
+@pytest.fixture
+def glossary_file(tmp_path):
+    path = tmp_path / "glossary.json"
+    path.write_text(json.dumps({
+        "Contoso Hub": None,
+        "Contoso": {"zh-Hant": "康托索"},
+        "KPI": "關鍵績效指標",
+        "週報": {"en": "weekly report"},
+    }, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+class TestAhoCorasick:
+    """AhoCorasick 單元測試"""
+
+    def test_finds_overlapping_terms_in_one_pass(self):
+        """測試一次掃描找出所有詞彙（含重疊與共用後綴）"""
+        automaton = AhoCorasick(["he", "she", "his", "hers"])
+        found = {(m.start, m.term) for m in automaton.find_all("ushers")}
+
+        assert found == {(1, "she"), (2, "he"), (2, "hers")}
+
+
+class TestGlossary:
+    """Glossary 單元測試"""
+
+    def test_leftmost_longest_and_word_boundaries(self, glossary_file):
+        """測試優先取最長的詞，且拉丁字母詞彙需在單字邊界"""
+        glossary = Glossary(str(glossary_file))
+        terms = [m.term for m in glossary.find_terms("Contoso Hub KPIs and Contoso KPI 週報")]
+
+        assert terms == ["Contoso Hub", "Contoso", "KPI", "週報"]
+
+    def test_translation_for_target(self, glossary_file):
+        """測試依目標語言取得譯名，未指定時保留原文"""
+        glossary = Glossary(str(glossary_file))
+        glossary.find_terms("")
+
+        assert glossary.translation_for("Contoso", "zh-Hant") == "康托索"
+        assert glossary.translation_for("Contoso", "en") == "Contoso"
+        assert glossary.translation_for("Contoso Hub", "zh-Hant") == "Contoso Hub"
+        assert glossary.translation_for("KPI", "zh-Hant") == "關鍵績效指標"
+
+    def test_rebuilt_only_when_mtime_changes(self, glossary_file):
+        """測試只有檔案修改時間改變時才重建自動機"""
+        glossary = Glossary(str(glossary_file), check_interval=0)
+        glossary.find_terms("KPI")
+        glossary.find_terms("KPI")
+        assert glossary.reloads == 1
+
+        glossary_file.write_text(json.dumps({"OKR": "目標與關鍵成果"}), encoding="utf-8")
+        stat = os.stat(glossary_file)
+        os.utime(glossary_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        assert [m.term for m in glossary.find_terms("KPI and OKR")] == ["OKR"]
+        assert glossary.reloads == 2
+
+
+class TestGlossaryTranslation:
+    """翻譯時套用詞彙表的測試"""
+
+    def test_hint_added_to_user_prompt(self, translation_handler, mock_openai_client, glossary_file):
+        """測試 hint 模式在 user prompt 中列出這則訊息用到的詞彙"""
+        translation_handler.glossary = Glossary(str(glossary_file))
+
+        translation_handler.translate_message("Please update the Contoso KPI", "req-1")
+
+        messages = mock_openai_client.chat.completions.create.call_args.kwargs["messages"]
+        assert messages[1]["content"].startswith("<glossary>\nContoso = 康托索\nKPI = 關鍵績效指標\n</glossary>\n<source>")
+        assert "glossary" in messages[0]["content"]
+
+    def test_placeholder_mode_pins_terms(self, translation_handler, mock_openai_client, make_openai_response, glossary_file):
+        """測試 placeholder 模式以佔位符固定譯名"""
+        translation_handler.glossary = Glossary(str(glossary_file))
+        translation_handler.config.glossary_mode = "placeholder"
+        mock_openai_client.chat.completions.create.return_value = make_openai_response("請更新 [#0] 的 [#1]")
+
+        result = translation_handler.translate_message("Please update the Contoso KPI", "req-1")
+
+        user_prompt = mock_openai_client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        assert "Contoso" not in user_prompt
+        assert result == "請更新 康托索 的 關鍵績效指標"
@@ -0,0 +1,59 @@
+"""
+語言判斷測試
+測試 detect_language 依文字系統比例判斷語言與翻譯方向
+"""
+
+import pytest
+
+from language_detector import detect_language, is_chinese_language
+
+
+class TestDetectLanguage:
+    """detect_language 單元測試"""
+
+    @pytest.mark.parametrize("text, language", [
+        ("請在明天之前檢查這個報告", "zh-Hant"),
+        ("请在明天之前检查这个报告", "zh-Hans"),
+        ("Please review the report before tomorrow", "en"),
+        ("明日までに報告書を確認してください", "ja"),
+        ("내일까지 보고서를 검토해 주세요", "ko"),
+        ("กรุณาตรวจสอบรายงานก่อนพรุ่งนี้", "th"),
+    ])
+    def test_supported_languages(self, text, language):
+        """測試支援的語言皆能正確判斷"""
+        result = detect_language(text)
+        assert result.language == language
+        assert result.confidence > 0.9
+
+    def test_english_with_chinese_name_stays_english(self):
+        """測試英文長訊息中夾雜一個中文名字時仍判斷為英文"""
+        text = "Please ask 王小明 to send the meeting notes to everyone on the team by Friday."
+        result = detect_language(text)
+
+        assert result.language == "en"
+        assert 0.5 < result.confidence < 1.0
+
+    def test_chinese_with_english_word_stays_chinese(self):
+        """測試中文訊息夾雜英文單字時仍判斷為中文"""
+        assert detect_language("我們明天的 meeting 改到下午三點").language == "zh-Hant"
+
+    def test_no_letters_defaults_to_english(self):
+        """測試沒有文字時回傳預設語言，信心值為 0"""
+        assert detect_language("12:30 !!") == ("en", 0.0)
+
+    def test_is_chinese_language(self):
+        """測試中文語言代碼判斷"""
+        assert is_chinese_language("zh-Hant")
+        assert is_chinese_language("zh-Hans")
+        assert not is_chinese_language("ja")
+
+
+class TestTranslationDirection:
+    """TranslationBotHandler._translation_direction 測試"""
+
+    def test_direction_follows_dominant_script(self, translation_handler):
+        """測試翻譯方向依主要語言決定，而非第一個中文字"""
+        assert translation_handler._translation_direction("今天下午開會") == "zh-Hant->en"
+        assert translation_handler._translation_direction(
+            "Reminder: 陳經理 will join the call at 3pm to review the budget"
+        ) == "en->zh-Hant"
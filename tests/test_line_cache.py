@@ -0,0 +1,54 @@
+"""
+逐行翻譯快取測試
+測試長訊息只翻譯未快取過的行，並依原順序組回
+"""
+
+
+def sent_source(mock_openai_client):
+    """取得最後一次送給模型的原文"""
+    user_prompt = mock_openai_client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    return user_prompt.replace("<source>\n", "").replace("\n</source>", "")
+
+
+class TestLineLevelCache:
+    """translate_message 逐行快取測試"""
+
+    def test_only_changed_lines_sent(self, translation_handler, mock_openai_client, make_openai_response):
+        """測試更新後的公告只把變動的行送給模型"""
+        mock_openai_client.chat.completions.create.return_value = make_openai_response("議程\n時間：10:00\n地點：A 會議室")
+        translation_handler.translate_message("Agenda\nTime: 10:00\nRoom: A", "req-1")
+
+        mock_openai_client.chat.completions.create.return_value = make_openai_response("時間：11:00")
+        result = translation_handler.translate_message("Agenda\nTime: 11:00\nRoom: A", "req-2")
+
+        assert result == "議程\n時間：11:00\n地點：A 會議室"
+        assert sent_source(mock_openai_client) == "Time: 11:00"
+        stats = translation_handler.line_cache_stats
+        assert stats["cached_lines"] == 2
+        assert stats["lines"] == 6
+
+    def test_blank_lines_preserved(self, translation_handler, mock_openai_client, make_openai_response):
+        """測試空白行保留在原本的位置"""
+        mock_openai_client.chat.completions.create.return_value = make_openai_response("一\n二\n三")
+
+        result = translation_handler.translate_message("one\n\ntwo\nthree", "req-1")
+
+        assert result == "一\n\n二\n三"
+        assert sent_source(mock_openai_client) == "one\ntwo\nthree"
+
+    def test_line_count_mismatch_falls_back_to_whole_message(self, translation_handler, mock_openai_client, make_openai_response):
+        """測試模型輸出行數不符時改為整則翻譯"""
+        mock_openai_client.chat.completions.create.side_effect = [
+            make_openai_response("一二三"),
+            make_openai_response("整則翻譯"),
+        ]
+
+        result = translation_handler.translate_message("one\ntwo\nthree", "req-1")
+
+        assert result == "整則翻譯"
+        assert translation_handler.line_cache_stats["mismatches"] == 1
+
+    def test_short_messages_skip_line_cache(self, translation_handler):
+        """測試未達行數門檻的訊息直接整則翻譯"""
+        translation_handler.translate_message("Hello\nWorld", "req-1")
+        assert translation_handler.line_cache_stats["messages"] == 0
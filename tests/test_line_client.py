@@ -0,0 +1,45 @@
+"""
+LINE 共用客戶端測試
+測試 LineClientPool 的共用行為、連線池設定與統計資訊
+"""
+
+from unittest.mock import patch
+
+from line_client import LineClientPool, get_line_client
+
+
+class TestLineClientPool:
+    """LineClientPool 單元測試"""
+
+    def test_pool_size_applied(self):
+        """測試連線池大小套用到 urllib3 PoolManager"""
+        client = LineClientPool("token", pool_size=3)
+        pool = client.api_client.rest_client.pool_manager.connection_from_url("https://api.line.me/")
+
+        assert pool.pool.maxsize == 3
+        stats = client.get_stats()
+        assert stats["pool_size"] == 3
+        assert stats["pools"]["https://api.line.me:443"]["max_size"] == 3
+
+    def test_shared_client_reused(self):
+        """測試相同 token 取得同一個共用客戶端"""
+        assert get_line_client("token-a") is get_line_client("token-a")
+
+    def test_handlers_share_client(self, translation_handler):
+        """測試 Teams 與翻譯處理器共用同一個客戶端"""
+        from function_app import TeamsWebhookHandler
+
+        teams_handler = TeamsWebhookHandler(translation_handler.config)
+        assert teams_handler.line_client is translation_handler.line_client
+
+    def test_reply_uses_shared_client(self, translation_handler):
+        """測試回覆透過共用客戶端的 messaging_api 送出"""
+        shared_client = get_line_client(translation_handler.config.line_access_token)
+        assert translation_handler.line_client is shared_client
+
+        with patch.object(shared_client.messaging_api, "reply_message_with_http_info") as mock_reply:
+            translation_handler._send_reply("reply-token", "hello", "req-1")
+
+        request = mock_reply.call_args.args[0]
+        assert request.reply_token == "reply-token"
+        assert request.messages[0].text == "hello"
@@ -0,0 +1,93 @@
+"""
+快速判斷測試
+測試不需要翻譯的訊息（網址、表情符號、數字、@提及、標點）不會送給模型
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from message_classifier import MessageClassifierStats, classify_untranslatable
+
+
+class TestClassifyUntranslatable:
+    """classify_untranslatable 單元測試"""
+
+    @pytest.mark.parametrize("text, reason", [
+        ("   ", "empty"),
+        ("https://example.com/a?b=1", "url"),
+        ("www.example.com 👍", "url"),
+        ("@Alice @Bob", "mention"),
+        ("@王小明", "mention"),
+        ("https://example.com/a，@王小明。", "url"),
+        ("12:30 / 2024-01-01", "number"),
+        ("😂😂👍🏻", "emoji"),
+        ("?!…。", "punctuation"),
+    ])
+    def test_untranslatable_messages(self, text, reason):
+        """測試只有網址、提及、數字、表情符號或標點的訊息會被辨識"""
+        assert classify_untranslatable(text) == reason
+
+    @pytest.mark.parametrize("text", [
+        "好",
+        "ok",
+        "@Alice see https://example.com",
+        "3 點開會",
+        "ありがとう",
+        "https://example.com/a，明天下午三點開會請準時出席",
+        "https://example.com/a明天開會",
+        "@王小明，明天記得帶筆電",
+        "@王小明：明天記得帶筆電",
+    ])
+    def test_translatable_messages(self, text):
+        """測試含有文字的訊息仍需翻譯"""
+        assert classify_untranslatable(text) is None
+
+    def test_stats_skip_rate(self):
+        """測試略過比例與原因統計"""
+        stats = MessageClassifierStats()
+        for reason in ("url", None, "emoji", None):
+            stats.record(reason)
+
+        result = stats.get_stats()
+        assert result["checked"] == 4
+        assert result["skipped"] == 2
+        assert result["skip_rate"] == 0.5
+        assert result["by_reason"] == {"url": 1, "emoji": 1}
+
+
+class TestFastPathEvents:
+    """handle_events 快速略過測試"""
+
+    def test_skip_does_not_translate_or_reply(self, translation_handler, make_text_event):
+        """測試預設（skip）時不呼叫翻譯也不回覆"""
+        with patch.object(translation_handler, "translate_message") as mock_translate, \
+                patch.object(translation_handler, "_send_reply") as mock_send:
+            translation_handler.handle_events([make_text_event("https://example.com")], "req-1")
+
+        mock_translate.assert_not_called()
+        mock_send.assert_not_called()
+        assert translation_handler.fast_path_stats.get_stats()["skipped"] == 1
+
+    def test_echo_replies_original_text_in_order(self, translation_handler, make_text_event):
+        """測試 echo 時以原文回覆，且與其他翻譯維持事件順序"""
+        translation_handler.config.untranslatable_action = "echo"
+        events = [make_text_event(text) for text in ("hello", "👍", "bye")]
+        with patch.object(translation_handler, "translate_message", side_effect=lambda text, _: text.upper()) as mock_translate, \
+                patch.object(translation_handler, "_send_reply") as mock_send:
+            translation_handler.handle_events(events, "req-1")
+
+        assert [call.args[1] for call in mock_send.call_args_list] == ["HELLO", "👍", "BYE"]
+        assert mock_translate.call_count == 2
+
+    def test_echo_in_batch_mode(self, translation_handler, make_text_event):
+        """測試批次模式只把需要翻譯的訊息送進批次請求"""
+        translation_handler.config.untranslatable_action = "echo"
+        translation_handler.config.translation_batch_mode = True
+        events = [make_text_event(text) for text in ("123", "hello", "bye")]
+        with patch.object(translation_handler, "translate_batch", return_value=["哈囉", "再見"]) as mock_batch, \
+                patch.object(translation_handler, "_send_reply") as mock_send:
+            translation_handler.handle_events(events, "req-1")
+
+        mock_batch.assert_called_once_with(["hello", "bye"], "req-1")
+        assert [call.args[1] for call in mock_send.call_args_list] == ["123", "哈囉", "再見"]
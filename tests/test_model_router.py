@@ -0,0 +1,113 @@
+"""
+模型路由測試
+測試依 token 數、複雜度與剩餘時間選擇模型，以及各層級的延遲與成本統計
+"""
+
+import time
+from unittest.mock import Mock
+
+from model_router import ModelRouter, ModelTier, estimate_complexity, parse_tiers
+
+TIERS = [
+    ModelTier("fast", "gpt-4o-mini", max_input_tokens=64, max_complexity=1,
+              input_cost_per_million=0.15, output_cost_per_million=0.6),
+    ModelTier("default", "gpt-4o"),
+]
+
+
+class TestModelRouter:
+    """ModelRouter 單元測試"""
+
+    def test_routes_by_tokens_and_complexity(self):
+        """測試短而簡單的訊息走最快層級，長或複雜的訊息走下一層"""
+        router = ModelRouter(TIERS)
+
+        assert router.route(10, 0).name == "fast"
+        assert router.route(200, 0).name == "default"
+        assert router.route(10, 3).name == "default"
+
+    def test_low_budget_ignores_complexity(self):
+        """測試剩餘時間不足時改用能處理此長度的最快層級"""
+        router = ModelRouter(TIERS, low_budget_seconds=10)
+
+        assert router.route(10, 3, remaining_seconds=5).name == "fast"
+        assert router.route(200, 3, remaining_seconds=5).name == "default"
+        assert router.get_stats()["fast"]["low_budget"] == 1
+
+    def test_record_latency_and_cost(self):
+        """測試依 usage 計算成本並累計延遲"""
+        router = ModelRouter(TIERS)
+        response = Mock()
+        response.usage.prompt_tokens = 1_000_000
+        response.usage.completion_tokens = 500_000
+
+        cost = router.record(TIERS[0], 120.0, response)
+
+        stats = router.get_stats()["fast"]
+        assert cost == 0.45
+        assert stats["requests"] == 1
+        assert stats["avg_latency_ms"] == 120.0
+
+    def test_parse_tiers_removes_limits_from_last_tier(self):
+        """測試設定的最後一層一律不設上限，格式錯誤時使用預設層級"""
+        tiers = parse_tiers('[{"name": "a", "model": "m1", "max_input_tokens": 5}, '
+                            '{"name": "b", "model": "m2", "max_input_tokens": 10}]', "gpt-4o")
+        assert tiers[-1].max_input_tokens is None
+        assert [tier.name for tier in parse_tiers("not json", "gpt-4o")] == ["default"]
+
+    def test_default_is_single_configured_model(self):
+        """測試未設定層級時只有一層，所有訊息都使用設定的模型"""
+        tiers = parse_tiers("", "my-deployment")
+        assert [tier.model for tier in tiers] == ["my-deployment"]
+        assert ModelRouter(tiers).route(1, 0).model == "my-deployment"
+
+    def test_estimate_complexity(self):
+        """測試多行、多句與混合語言會提高複雜度"""
+        assert estimate_complexity("Thanks!") == 0
+        assert estimate_complexity("One. Two.\nThree.") == 3
+        assert estimate_complexity("ok", language_confidence=0.6) == 1
+
+
+class TestRoutedTranslation:
+    """translate_message 模型路由測試"""
+
+    def test_short_message_uses_fast_model(self, translation_handler, mock_openai_client):
+        """測試簡短訊息使用快速模型，長訊息使用預設模型"""
+        translation_handler.model_router = ModelRouter(TIERS)
+
+        translation_handler.translate_message("Thanks", "req-1")
+        assert mock_openai_client.chat.completions.create.call_args.kwargs["model"] == "gpt-4o-mini"
+
+        translation_handler.translate_message("First point. Second point.\nThird point.", "req-2")
+        assert mock_openai_client.chat.completions.create.call_args.kwargs["model"] == "gpt-4o"
+
+    def test_expiring_reply_token_uses_fast_model(self, translation_handler, mock_openai_client, make_text_event):
+        """測試回覆 token 即將過期時，複雜訊息也改用快速模型"""
+        translation_handler.model_router = ModelRouter(TIERS, low_budget_seconds=10)
+        event = make_text_event("First point. Second point.\nThird point.")
+        event.timestamp = int((time.time() - translation_handler.config.reply_token_budget_seconds + 5) * 1000)
+        mock_send = Mock()
+        translation_handler._send_reply = mock_send
+
+        translation_handler.handle_events([event], "req-1")
+
+        assert mock_openai_client.chat.completions.create.call_args.kwargs["model"] == "gpt-4o-mini"
+        mock_send.assert_called_once()
+
+    def test_cache_keyed_by_producing_model(self, translation_handler, mock_openai_client):
+        """測試快取依產生譯文的模型區分，快速模型的譯文不會以預設模型的名義回傳"""
+        translation_handler.model_router = ModelRouter(TIERS)
+        translation_handler.translate_message("Thanks", "req-1")
+        assert mock_openai_client.chat.completions.create.call_count == 1
+
+        # 改為只有預設模型後，同一則訊息需要重新翻譯
+        translation_handler.model_router = ModelRouter([TIERS[1]])
+        translation_handler.translate_message("Thanks", "req-2")
+        assert mock_openai_client.chat.completions.create.call_count == 2
+        assert mock_openai_client.chat.completions.create.call_args.kwargs["model"] == "gpt-4o"
+
+        # 兩個模型的譯文各自命中快取
+        translation_handler.translate_message("Thanks", "req-3")
+        translation_handler.model_router = ModelRouter(TIERS)
+        translation_handler.translate_message("Thanks", "req-4")
+        assert mock_openai_client.chat.completions.create.call_count == 2
@@ -0,0 +1,90 @@
+"""
+Prompt 範本測試
+測試預先產生的 prompt 表、共用前綴的穩定性，以及 prompt 快取 token 的統計
+"""
+
+from dataclasses import FrozenInstanceError
+from unittest.mock import Mock
+
+import pytest
+
+from prompt_templates import (
+    BATCH_PROMPTS,
+    PROMPT_TEMPLATES,
+    get_prompt_template,
+    split_direction,
+)
+from token_estimator import TokenEstimator
+
+
+class TestPromptTemplates:
+    """prompt 範本表測試"""
+
+    def test_all_prompts_share_byte_stable_prefix(self):
+        """測試所有語言組合與風格的 system prompt 共用相同的開頭，只在結尾不同"""
+        prompts = [template.system_prompt for template in PROMPT_TEMPLATES.values()]
+        prompts.extend(BATCH_PROMPTS.values())
+        prefix = prompts[0]
+        for prompt in prompts[1:]:
+            while not prompt.startswith(prefix):
+                prefix = prefix[:-1]
+
+        assert prefix.startswith("You are a translator.\nRules:\n")
+        assert "Preserve line breaks" in prefix
+        assert all("Translate the text from" not in p[:len(prefix)] for p in prompts)
+
+    def test_strict_wording_only_in_strict_style(self):
+        """測試 STRICTLY 的用語只出現在 strict 風格，casual 風格不會要求逐字翻譯"""
+        assert "STRICTLY" in get_prompt_template("en", "zh-Hant", "strict").system_prompt
+        assert "STRICTLY" not in get_prompt_template("en", "zh-Hant", "casual").system_prompt
+        assert "STRICTLY" in BATCH_PROMPTS["strict"]
+        assert "STRICTLY" not in BATCH_PROMPTS["casual"]
+
+    def test_table_is_read_only(self):
+        """測試範本表與範本本身皆不可修改"""
+        template = get_prompt_template("ja", "zh-Hant")
+        with pytest.raises(TypeError):
+            PROMPT_TEMPLATES[("ja", "zh-Hant", "strict")] = template
+        with pytest.raises(FrozenInstanceError):
+            template.system_prompt = "changed"
+
+    def test_language_pair_instruction(self):
+        """測試語言組合的翻譯指示"""
+        prompt = get_prompt_template("ko", "zh-Hant", "casual").system_prompt
+        assert prompt.endswith("Translate the text from Korean to fluent Traditional Chinese.")
+
+    def test_unknown_style_uses_default(self):
+        """測試未知的風格改用預設風格"""
+        assert get_prompt_template("en", "zh-Hant", "poetic") is get_prompt_template("en", "zh-Hant")
+
+    def test_handler_reuses_precomputed_prompt(self, translation_handler):
+        """測試每次產生的 system prompt 都是同一個預先產生的字串"""
+        first, user_prompt = translation_handler._build_prompts("今天下午開會")
+        second, _ = translation_handler._build_prompts("明天早上開會")
+
+        assert first is second
+        assert split_direction(translation_handler._translation_direction("今天下午開會")) == ("zh-Hant", "en")
+        assert user_prompt == "<source>\n今天下午開會\n</source>"
+
+
+class TestPromptCacheUsage:
+    """prompt 快取 token 統計測試"""
+
+    def make_response(self, prompt_tokens, cached_tokens):
+        response = Mock()
+        response.usage.prompt_tokens = prompt_tokens
+        response.usage.completion_tokens = 10
+        response.usage.prompt_tokens_details.cached_tokens = cached_tokens
+        response.choices = [Mock(finish_reason="stop")]
+        return response
+
+    def test_cached_tokens_recorded(self):
+        """測試記錄 usage.prompt_tokens_details.cached_tokens 並計算命中比例"""
+        estimator = TokenEstimator("gpt-4o")
+        estimator.record_usage(100, 20, self.make_response(1200, 1024))
+        estimator.record_usage(100, 20, self.make_response(800, 0))
+
+        stats = estimator.get_stats()
+        assert stats["cached_prompt_tokens"] == 1024
+        assert stats["prompt_cache_hit_rate"] == 0.512
+        assert stats["prompt_cache_min_tokens"] == 1024
@@ -375,6 +375,124 @@ class ReplyTokenFixTester:
         
         return summary
 
+class TestReplyTokenExpiry:
+    """ReplyTokenManager 過期清理與容量上限測試"""
+
+    @staticmethod
+    def _clock(monkeypatch):
+        now = [1_000_000_000_000]
+        monkeypatch.setattr("token_backends.time.monotonic_ns", lambda: now[0])
+        return now
+
+    def test_expired_tokens_are_removed_from_the_oldest_end(self, monkeypatch):
+        """測試過期的 token 從最舊的一端移除，未過期的保留"""
+        from reply_token_manager import ReplyTokenManager
+
+        now = self._clock(monkeypatch)
+        manager = ReplyTokenManager(token_lifetime_minutes=1)
+        manager.mark_token_used("token-a")
+        now[0] += 30 * 10**9
+        manager.mark_token_used("token-b")
+        now[0] += 31 * 10**9
+
+        assert not manager.is_token_used("token-a")
+        assert manager.is_token_used("token-b")
+        assert manager.get_stats()["active_tokens_count"] == 1
+
+    def test_expired_token_can_be_marked_again(self, monkeypatch):
+        """測試過期後同一個 token 可以再次標記"""
+        from reply_token_manager import ReplyTokenManager
+
+        now = self._clock(monkeypatch)
+        manager = ReplyTokenManager(token_lifetime_minutes=1)
+        manager.mark_token_used("token-a")
+        assert not manager.mark_token_used("token-a")
+
+        now[0] += 61 * 10**9
+        assert manager.mark_token_used("token-a")
+        assert manager.is_token_used("token-a")
+
+    def test_capacity_evicts_oldest_tokens(self):
+        """測試超過容量時淘汰最舊的 token"""
+        from reply_token_manager import ReplyTokenManager
+        from token_backends import MemoryTokenBackend
+
+        manager = ReplyTokenManager(backend=MemoryTokenBackend(capacity=3, shards=1))
+        for i in range(5):
+            manager.mark_token_used(f"token-{i}")
+
+        assert [manager.is_token_used(f"token-{i}") for i in range(5)] == [False, False, True, True, True]
+        stats = manager.get_stats()
+        assert (stats["active_tokens_count"], stats["capacity"], stats["evicted"]) == (3, 3, 2)
+
+    def test_stores_digests_not_tokens(self):
+        """測試只保存固定長度的摘要；每個 token 的成本是固定值，與預先配置的總量分開回報"""
+        from reply_token_manager import ReplyTokenManager
+        from token_backends import TokenDigestStore
+
+        manager = ReplyTokenManager(max_tokens=1000)
+        token = "x" * 200
+        manager.mark_token_used(token)
+
+        assert all(isinstance(key, int) for _, store in manager.backend._shards for key in store._slots)
+        stats = manager.get_stats()
+        # 兩個 8 bytes 的欄位、dict 項目與兩個整數物件
+        assert 16 < stats["bytes_per_token"] == TokenDigestStore.ENTRY_BYTES < 200
+        # 總量包含依容量預先配置的 array
+        assert stats["memory_bytes"] >= 1000 * 16
+
+        manager.mark_token_used("another-token")
+        assert manager.get_stats()["bytes_per_token"] == stats["bytes_per_token"]
+
+    def test_stats_report_oldest_token_age(self, monkeypatch):
+        """測試統計資訊回報最舊 token 的年齡"""
+        from reply_token_manager import ReplyTokenManager
+
+        now = self._clock(monkeypatch)
+        manager = ReplyTokenManager(token_lifetime_minutes=60)
+        assert manager.get_stats()["oldest_token_age_minutes"] == 0
+
+        manager.mark_token_used("token-a")
+        now[0] += 120 * 10**9
+        manager.mark_token_used("token-b")
+        stats = manager.get_stats()
+
+        assert stats["active_tokens_count"] == 2
+        assert stats["oldest_token_age_minutes"] == 2
+
+
+class TestTryClaim:
+    """ReplyTokenManager.try_claim 測試"""
+
+    def test_only_first_claim_succeeds(self):
+        """測試同一個 token 只有第一次 try_claim 成功"""
+        from reply_token_manager import ReplyTokenManager
+
+        manager = ReplyTokenManager()
+
+        assert manager.try_claim("token-a")
+        assert not manager.try_claim("token-a")
+        assert not manager.try_claim("")
+        assert manager.is_token_used("token-a")
+
+    def test_concurrent_claims_have_single_winner(self):
+        """測試 32 個執行緒同時搶同一批 token 時，每個 token 只被取得一次"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        from reply_token_manager import ReplyTokenManager
+
+        manager = ReplyTokenManager()
+        tokens = [f"token-{i}" for i in range(200)]
+
+        def claim_all(_):
+            return [token for token in tokens if manager.try_claim(token)]
+
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            claimed = [token for batch in executor.map(claim_all, range(32)) for token in batch]
+
+        assert sorted(claimed) == sorted(tokens)
+
+
 def main():
     """主函數"""
     logger.info("🧪 Reply Token 修復測試套件")
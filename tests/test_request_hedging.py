@@ -0,0 +1,96 @@
+"""
+對沖請求測試
+測試第一個請求過慢時送出備援請求、採用先完成的結果，以及統計與期限計算
+"""
+
+import threading
+import time
+
+import pytest
+
+from request_hedging import RequestHedger
+
+
+class TestRequestHedger:
+    """RequestHedger 單元測試"""
+
+    def test_fast_primary_does_not_fire(self):
+        """測試第一個請求在期限內完成時不送出備援請求"""
+        hedger = RequestHedger(default_delay_ms=200)
+        backup_called = threading.Event()
+
+        result = hedger.call(lambda: "primary", lambda: backup_called.set() or "backup")
+
+        assert result == "primary"
+        assert not backup_called.is_set()
+        assert hedger.get_stats()["fired"] == 0
+
+    def test_slow_primary_loses_to_backup(self):
+        """測試第一個請求過慢時採用備援請求的結果"""
+        hedger = RequestHedger(default_delay_ms=50, min_delay_ms=0)
+
+        def slow():
+            time.sleep(0.5)
+            return "primary"
+
+        started = time.monotonic()
+        result = hedger.call(slow, lambda: "backup")
+
+        assert result == "backup"
+        assert time.monotonic() - started < 0.3
+        stats = hedger.get_stats()
+        assert (stats["fired"], stats["won"]) == (1, 1)
+
+    def test_backup_failure_waits_for_primary(self):
+        """測試備援請求失敗時仍等待第一個請求的結果"""
+        hedger = RequestHedger(default_delay_ms=20, min_delay_ms=0)
+
+        def slow():
+            time.sleep(0.1)
+            return "primary"
+
+        def failing():
+            raise RuntimeError("backup failed")
+
+        assert hedger.call(slow, failing) == "primary"
+        assert hedger.get_stats()["won"] == 0
+
+    def test_primary_error_before_deadline_propagates(self):
+        """測試第一個請求在期限前失敗時直接拋出例外，不送出備援請求"""
+        hedger = RequestHedger(default_delay_ms=500)
+
+        def failing():
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            hedger.call(failing, lambda: "backup")
+        assert hedger.get_stats()["fired"] == 0
+
+    def test_delay_follows_latency_percentile(self):
+        """測試樣本足夠後以延遲百分位數作為期限"""
+        hedger = RequestHedger(percentile=90, default_delay_ms=3000, min_delay_ms=0, min_samples=10)
+        hedger._latencies.extend(range(1, 101))
+
+        assert hedger.hedge_delay_ms() == 90
+
+
+class TestHedgedTranslation:
+    """translate_message 對沖請求測試"""
+
+    def test_hedged_request_uses_fallback_model(self, translation_handler, mock_openai_client, make_openai_response):
+        """測試備援請求使用 HEDGE_MODEL 指定的模型，並採用其結果"""
+        translation_handler.hedger = RequestHedger(default_delay_ms=50, min_delay_ms=0)
+        translation_handler.config.hedge_model = "backup-model"
+
+        def create(**kwargs):
+            if kwargs["model"] != "backup-model":
+                time.sleep(0.5)
+                return make_openai_response("slow")
+            return make_openai_response("fast")
+
+        mock_openai_client.chat.completions.create.side_effect = create
+
+        result = translation_handler.translate_message("Please review the budget", "req-1")
+
+        assert result == "fast"
+        assert translation_handler.hedger.get_stats()["won"] == 1
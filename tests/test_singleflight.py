@@ -0,0 +1,83 @@
+"""
+並行呼叫合併測試
+測試 SingleFlight 以及 translate_message 對相同內容並行翻譯的合併
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """SingleFlight 單元測試"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """測試相同鍵的並行呼叫只執行一次"""
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def work():
+            calls.append(1)
+            release.wait(5)
+            return "result"
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(flight.do, "key", work) for _ in range(4)]
+            while flight.get_stats()["coalesced"] < 3:
+                time.sleep(0.01)
+            release.set()
+            results = [f.result(timeout=5) for f in futures]
+
+        assert results == ["result"] * 4
+        assert len(calls) == 1
+        stats = flight.get_stats()
+        assert stats["executions"] == 1
+        assert stats["coalesced"] == 3
+        assert stats["in_flight"] == 0
+
+    def test_sequential_calls_execute_again(self):
+        """測試前一次呼叫完成後，相同鍵會重新執行"""
+        flight = SingleFlight()
+        assert flight.do("key", lambda: 1) == 1
+        assert flight.do("key", lambda: 2) == 2
+        assert flight.get_stats()["executions"] == 2
+
+    def test_exception_propagates_and_clears(self):
+        """測試例外會傳給呼叫端，且不會殘留執行中的項目"""
+        flight = SingleFlight()
+
+        def fail():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            flight.do("key", fail)
+        assert flight.get_stats()["in_flight"] == 0
+
+
+class TestTranslateMessageCoalescing:
+    """translate_message 並行合併測試"""
+
+    def test_identical_messages_share_openai_call(self, translation_handler, mock_openai_client):
+        """測試同一則訊息同時轉發到多個群組時只呼叫一次 OpenAI"""
+        original = mock_openai_client.chat.completions.create.return_value
+
+        def slow_create(**kwargs):
+            time.sleep(0.2)
+            return original
+
+        mock_openai_client.chat.completions.create.side_effect = slow_create
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            results = list(executor.map(
+                lambda i: translation_handler.translate_message("Forwarded announcement", f"req-{i}"),
+                range(3),
+            ))
+
+        assert results == ["Mocked translation result"] * 3
+        assert mock_openai_client.chat.completions.create.call_count == 1
+        assert translation_handler.singleflight.get_stats()["coalesced"] == 2
@@ -0,0 +1,87 @@
+"""
+長訊息分段測試
+測試 split_into_chunks / pack_text_messages，以及超長訊息的並行分段翻譯
+"""
+
+import time
+
+from text_chunker import pack_text_messages, split_into_chunks
+
+
+def reassemble(chunks):
+    return "".join(body + separator for body, separator in chunks)
+
+
+class TestSplitIntoChunks:
+    """split_into_chunks 單元測試"""
+
+    def test_short_text_single_chunk(self):
+        """測試未超過上限的文字不會被切開"""
+        assert split_into_chunks("line 1\nline 2", 100) == [("line 1\nline 2", "")]
+
+    def test_round_trip_preserves_structure(self):
+        """測試片段與分隔字串串接後與原文相同"""
+        text = "Agenda\nItem 1\n\nNotes\nItem 2\n\n\nClosing remarks"
+        for max_chars in (10, 20, 40):
+            chunks = split_into_chunks(text, max_chars)
+            assert reassemble(chunks) == text
+            assert all(len(body) <= max_chars for body, _ in chunks)
+
+    def test_prefers_paragraph_boundaries(self):
+        """測試優先在段落之間切開"""
+        text = "aaaa\nbbbb\n\ncccc\ndddd"
+        chunks = split_into_chunks(text, 15)
+        assert chunks == [("aaaa\nbbbb", "\n\n"), ("cccc\ndddd", "")]
+
+    def test_long_line_split_on_sentences(self):
+        """測試超長單行依句子切開"""
+        text = "First sentence here. Second sentence here. Third sentence here."
+        chunks = split_into_chunks(text, 25)
+        assert [body for body, _ in chunks] == [
+            "First sentence here.",
+            "Second sentence here.",
+            "Third sentence here.",
+        ]
+        assert [sep for _, sep in chunks] == [" ", " ", ""]
+
+
+class TestPackTextMessages:
+    """pack_text_messages 單元測試"""
+
+    def test_short_text_single_message(self):
+        """測試短文字只產生一則訊息"""
+        assert pack_text_messages("hello") == ["hello"]
+
+    def test_respects_length_and_count_limits(self):
+        """測試每則訊息不超過字數上限，且最多 5 則"""
+        text = "\n".join(f"line {i:05d}" for i in range(5000))
+        messages = pack_text_messages(text, max_chars=5000, max_messages=5)
+
+        assert len(messages) == 5
+        assert all(len(message) <= 5000 for message in messages)
+        assert messages[-1].endswith("…")
+
+
+class TestChunkedTranslation:
+    """translate_message 分段翻譯測試"""
+
+    def test_chunks_translated_concurrently_in_order(self, translation_handler, mock_openai_client, make_openai_response):
+        """測試超長訊息分段並行翻譯，並依原順序組回"""
+        translation_handler.config.translation_chunk_size = 20
+        translation_handler.config.line_cache_min_lines = 0
+
+        def slow_create(**kwargs):
+            source = kwargs["messages"][1]["content"].replace("<source>\n", "").replace("\n</source>", "")
+            time.sleep(0.2)
+            return make_openai_response(source.upper())
+
+        mock_openai_client.chat.completions.create.side_effect = slow_create
+        text = "paragraph one\n\nparagraph two\n\nparagraph three"
+
+        started = time.monotonic()
+        result = translation_handler.translate_message(text, "req-1")
+        elapsed = time.monotonic() - started
+
+        assert result == "PARAGRAPH ONE\n\nPARAGRAPH TWO\n\nPARAGRAPH THREE"
+        assert mock_openai_client.chat.completions.create.call_count == 3
+        assert elapsed < 0.5
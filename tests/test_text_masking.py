@@ -0,0 +1,76 @@
+"""
+網址與提及遮罩測試
+測試 mask_text / unmask_text，以及翻譯請求只送出佔位符
+"""
+
+from text_masking import mask_text, unmask_text
+
+LONG_URL = "https://contoso.sharepoint.com/sites/team/Shared%20Documents/Forms/AllItems.aspx?id=%2Fsites%2Fteam"
+
+
+class TestMaskText:
+    """mask_text / unmask_text 單元測試"""
+
+    def test_masks_urls_mentions_and_emoji_markers(self):
+        """測試網址、@提及與 LINE 表情符號標記被換成佔位符"""
+        masked = mask_text(f"@Alice please check {LONG_URL}. Thanks $")
+
+        assert masked.text == "[#0] please check [#1]. Thanks [#2]"
+        assert masked.originals == ("@Alice", LONG_URL, "$")
+
+    def test_same_url_shares_placeholder(self):
+        """測試相同網址共用同一個佔位符，金額不會被當成表情符號"""
+        masked = mask_text(f"{LONG_URL} costs $100, see {LONG_URL}")
+
+        assert masked.text == "[#0] costs $100, see [#0]"
+        assert masked.originals == (LONG_URL,)
+
+    def test_url_and_mention_end_before_cjk_text(self):
+        """測試網址與 @提及在中文字或全形標點前結束，後面的句子仍會被翻譯"""
+        masked = mask_text("請看 https://example.com/a，謝謝大家。@王小明，明天記得帶筆電")
+
+        assert masked.text == "請看 [#0]，謝謝大家。[#1]，明天記得帶筆電"
+        assert masked.originals == ("https://example.com/a", "@王小明")
+
+    def test_round_trip(self):
+        """測試還原後與原文片段相同"""
+        masked = mask_text(f"請看 {LONG_URL} @Bob")
+        restored = unmask_text("Please see [#0] [#1]", masked.originals, masked.text)
+
+        assert restored.text == f"Please see {LONG_URL} @Bob"
+        assert (restored.dropped, restored.duplicated) == (0, 0)
+
+    def test_dropped_placeholder_appended(self):
+        """測試模型漏掉的佔位符會附加在譯文最後"""
+        masked = mask_text(f"請看 {LONG_URL}")
+        restored = unmask_text("Please take a look", masked.originals, masked.text)
+
+        assert restored.text == f"Please take a look {LONG_URL}"
+        assert restored.dropped == 1
+
+    def test_duplicated_placeholder_removed(self):
+        """測試重複出現的佔位符只保留原本的次數"""
+        masked = mask_text(f"請看 {LONG_URL}")
+        restored = unmask_text("Please see [#0] ([#0])", masked.originals, masked.text)
+
+        assert restored.text == f"Please see {LONG_URL} ()"
+        assert restored.duplicated == 1
+
+    def test_existing_placeholder_syntax_not_masked(self):
+        """測試原文已含有佔位符格式時不遮罩"""
+        assert mask_text(f"item [#1] {LONG_URL}").originals == ()
+
+
+class TestMaskedTranslation:
+    """translate_message 遮罩測試"""
+
+    def test_only_placeholder_sent_to_model(self, translation_handler, mock_openai_client, make_openai_response):
+        """測試送給模型的是佔位符，回覆中還原為原網址"""
+        mock_openai_client.chat.completions.create.return_value = make_openai_response("請看 [#0]")
+
+        result = translation_handler.translate_message(f"Please see {LONG_URL}", "req-1")
+
+        user_prompt = mock_openai_client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        assert LONG_URL not in user_prompt
+        assert result == f"請看 {LONG_URL}"
+        assert translation_handler.masking_stats["chars_saved"] == len(LONG_URL) - len("[#0]")
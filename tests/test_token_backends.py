@@ -0,0 +1,206 @@
+"""
+Token 儲存後端測試
+測試記憶體、SQLite 與 Redis 後端的原子性檢查並寫入、TTL，以及同時請求的批次合併
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from reply_token_manager import ReplyTokenManager
+from token_backends import (
+    BatchingTokenBackend,
+    MemoryTokenBackend,
+    RedisTokenBackend,
+    SqliteTokenBackend,
+    create_token_backend,
+)
+
+
+class FakeRedis:
+    """只實作 SET NX PX 與 EXISTS 的 Redis 替身"""
+
+    def __init__(self, delay=0.0):
+        self.data = {}
+        self.delay = delay
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, server):
+        self.server = server
+        self.commands = []
+
+    def set(self, name, value, nx=False, px=None):
+        self.commands.append(("set", name, value, nx, px))
+
+    def exists(self, name):
+        self.commands.append(("exists", name))
+
+    def execute(self):
+        time.sleep(self.server.delay)
+        now = time.time() * 1000
+        results = []
+        with self.server._lock:
+            self.server.round_trips += 1
+            data = self.server.data
+            for command in self.commands:
+                name = command[1]
+                if name in data and data[name][1] <= now:
+                    del data[name]
+                if command[0] == "exists":
+                    results.append(int(name in data))
+                elif command[3] and name in data:
+                    results.append(None)
+                else:
+                    data[name] = (command[2], now + command[4])
+                    results.append(True)
+        return results
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    """三種後端各執行一次"""
+    if request.param == "memory":
+        return MemoryTokenBackend(capacity=100)
+    if request.param == "sqlite":
+        return SqliteTokenBackend(str(tmp_path / "tokens.db"))
+    return RedisTokenBackend(FakeRedis())
+
+
+class TestTokenBackends:
+    """各後端共同行為測試"""
+
+    def test_claim_is_check_and_set(self, backend):
+        """測試第一次寫入成功，之後同一個摘要都回傳 False"""
+        first = backend.claim_many([b"a" * 8, b"b" * 8], ttl_ms=60_000)
+        second = backend.claim_many([b"a" * 8, b"c" * 8, b"c" * 8], ttl_ms=60_000)
+
+        assert first == [True, True]
+        assert second == [False, True, False]
+        assert backend.contains_many([b"a" * 8, b"d" * 8], ttl_ms=60_000) == [True, False]
+
+    def test_claims_expire_after_ttl(self, backend):
+        """測試超過 TTL 後可以再次寫入"""
+        assert backend.claim_many([b"a" * 8], ttl_ms=20) == [True]
+        time.sleep(0.05)
+
+        assert backend.contains_many([b"a" * 8], ttl_ms=20) == [False]
+        assert backend.claim_many([b"a" * 8], ttl_ms=20) == [True]
+
+    def test_concurrent_claims_have_single_winner(self, backend):
+        """測試多個執行緒同時寫入同一個摘要時只有一個成功"""
+        batching = BatchingTokenBackend(backend)
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(lambda _: batching.claim_many([b"x" * 8], 60_000)[0], range(64)))
+
+        assert results.count(True) == 1
+
+
+class TestSharedBackends:
+    """多個實例共用後端測試"""
+
+    def test_instances_sharing_sqlite_deduplicate(self, tmp_path):
+        """測試兩個管理器共用同一個 SQLite 檔案時，同一個 token 只能標記一次"""
+        path = str(tmp_path / "shared" / "tokens.db")
+        first = ReplyTokenManager(backend=SqliteTokenBackend(path))
+        second = ReplyTokenManager(backend=SqliteTokenBackend(path))
+
+        assert first.mark_token_used("reply-token-1")
+        assert not second.mark_token_used("reply-token-1")
+        assert second.is_token_used("reply-token-1")
+
+    def test_sqlite_uses_rollback_journal(self, tmp_path):
+        """測試 SQLite 後端不使用 WAL（共用路徑通常是不支援 WAL 的網路檔案系統）"""
+        backend = SqliteTokenBackend(str(tmp_path / "tokens.db"))
+
+        assert backend._conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+
+    def test_unreachable_backend_fails_open(self):
+        """測試後端無法使用時視為取得 token 並記錄錯誤，而不是丟掉訊息"""
+
+        class BrokenBackend(MemoryTokenBackend):
+            shared = True
+
+            def claim_many(self, digests, ttl_ms):
+                raise ConnectionError("down")
+
+            def contains_many(self, digests, ttl_ms):
+                raise ConnectionError("down")
+
+        manager = ReplyTokenManager(backend=BrokenBackend())
+
+        assert manager.try_claim("reply-token-1", "req-1")
+        assert not manager.is_token_used("reply-token-1")
+        assert manager.get_stats()["backend_errors"] == 2
+
+    def test_instances_sharing_redis_deduplicate(self):
+        """測試兩個管理器共用同一個 Redis 時，同一個 token 只能標記一次"""
+        server = FakeRedis()
+        first = ReplyTokenManager(backend=RedisTokenBackend(server))
+        second = ReplyTokenManager(backend=RedisTokenBackend(server))
+
+        assert first.mark_token_used("reply-token-1")
+        assert not second.mark_token_used("reply-token-1")
+
+
+class TestBatching:
+    """BatchingTokenBackend 測試"""
+
+    def test_concurrent_requests_share_round_trips(self):
+        """測試後端呼叫進行中抵達的請求會合併成同一次往返"""
+        server = FakeRedis(delay=0.01)
+        batching = BatchingTokenBackend(RedisTokenBackend(server))
+        digests = [i.to_bytes(8, "big") for i in range(64)]
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            results = list(executor.map(lambda d: batching.claim_many([d], 60_000)[0], digests))
+
+        assert all(results)
+        assert server.round_trips < 64
+        assert batching.get_stats()["batching"]["requests"] == 64
+
+    def test_backend_errors_propagate_to_callers(self):
+        """測試後端例外會傳給每個等待中的呼叫者"""
+
+        class BrokenBackend(MemoryTokenBackend):
+            def claim_many(self, digests, ttl_ms):
+                raise ConnectionError("down")
+
+        with pytest.raises(ConnectionError):
+            BatchingTokenBackend(BrokenBackend()).claim_many([b"a" * 8], 60_000)
+
+
+class TestCreateTokenBackend:
+    """create_token_backend 測試"""
+
+    def test_sqlite_url(self, tmp_path):
+        """測試 sqlite:/// 網址建立共用的 SQLite 後端"""
+        backend = create_token_backend(f"sqlite:///{tmp_path / 'tokens.db'}")
+
+        assert backend.shared
+        assert backend.get_stats()["backend"] == "sqlite"
+
+    def test_unknown_url_falls_back_to_memory(self):
+        """測試未知的設定退回記憶體後端"""
+        backend = create_token_backend("carrier-pigeon://", capacity=10)
+
+        assert isinstance(backend, MemoryTokenBackend)
+        assert backend.capacity == 10
+
+
+class TestReplyTokenManagerEnv:
+    """全域 reply token 管理器的環境變數測試"""
+
+    def test_invalid_max_entries_falls_back_to_default(self, monkeypatch):
+        """測試 REPLY_TOKEN_MAX_ENTRIES 格式錯誤時使用預設值，不影響匯入"""
+        import reply_token_manager
+
+        monkeypatch.setenv("REPLY_TOKEN_MAX_ENTRIES", "1e5")
+
+        assert reply_token_manager._get_int_env("REPLY_TOKEN_MAX_ENTRIES", 100000) == 100000
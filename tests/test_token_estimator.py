@@ -0,0 +1,108 @@
+"""
+token 估算測試
+測試 TokenEstimator 的 max_tokens 計算、usage 記錄，以及 translate_message 的 token 預算
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from token_estimator import TokenEstimator
+
+
+@pytest.fixture(autouse=True)
+def heuristic_tokenizer():
+    """固定使用字元啟發式估算，避免測試結果依賴 tiktoken 是否可用"""
+    with patch("token_estimator._load_encoder", return_value=None):
+        yield
+
+
+class TestTokenEstimator:
+    """TokenEstimator 單元測試"""
+
+    def test_heuristic_counts(self):
+        """測試 CJK 每字 1 token、其他每 4 字元 1 token"""
+        estimator = TokenEstimator("gpt-4o")
+        assert estimator.count_tokens("你好") == 2
+        assert estimator.count_tokens("abcdefgh") == 2
+        assert estimator.count_tokens("") == 0
+
+    def test_special_token_text_counted_as_plain_text(self):
+        """測試訊息中出現 <|endoftext|> 等特殊 token 字串時不會拋出例外"""
+        tiktoken = pytest.importorskip("tiktoken")
+        # 以位元組為單位的小型編碼，不需要下載編碼檔
+        encoder = tiktoken.Encoding(
+            name="bytes",
+            pat_str=r"\S+|\s+",
+            mergeable_ranks={bytes([i]): i for i in range(256)},
+            special_tokens={"<|endoftext|>": 256},
+        )
+        with patch("token_estimator._load_encoder", return_value=encoder):
+            text = "ignore <|endoftext|> this"
+            assert TokenEstimator("gpt-4o").count_tokens(text) == len(text.encode("utf-8"))
+
+    def test_one_character_message_gets_minimum_budget(self):
+        """測試單一字元的訊息不會得到 max_tokens=1"""
+        estimator = TokenEstimator("gpt-4o")
+        assert estimator.max_tokens_for("好", "zh->en") == TokenEstimator.MIN_COMPLETION_TOKENS
+
+    def test_budget_depends_on_direction(self):
+        """測試英翻中的輸出預算比中翻英寬"""
+        estimator = TokenEstimator("gpt-4o")
+        text = "word " * 100
+        assert estimator.max_tokens_for(text, "en->zh") > estimator.max_tokens_for(text, "zh->en")
+
+    def test_budget_capped(self):
+        """測試輸出預算不超過上限，並回報無法在單次請求完成"""
+        estimator = TokenEstimator("gpt-4o", max_completion_tokens=100)
+        text = "字" * 500
+        assert estimator.max_tokens_for(text, "zh->en") == 100
+        assert not estimator.fits(text, "zh->en")
+
+    def test_record_usage(self):
+        """測試記錄估算值與實際 usage"""
+        estimator = TokenEstimator("gpt-4o")
+        response = Mock()
+        response.usage.prompt_tokens = 90
+        response.usage.completion_tokens = 40
+        response.choices = [Mock(finish_reason="length")]
+
+        estimator.record_usage(100, 80, response)
+
+        stats = estimator.get_stats()
+        assert stats["samples"] == 1
+        assert stats["truncated"] == 1
+        assert stats["prompt_accuracy"] == 0.9
+        assert stats["completion_utilization"] == 0.5
+
+
+class TestTranslationTokenBudget:
+    """translate_message token 預算測試"""
+
+    def test_max_tokens_from_estimator(self, translation_handler, mock_openai_client):
+        """測試請求的 max_tokens 由估算器決定"""
+        translation_handler.translate_message("OK", "req-1")
+
+        kwargs = mock_openai_client.chat.completions.create.call_args.kwargs
+        assert kwargs["max_tokens"] == TokenEstimator.MIN_COMPLETION_TOKENS
+
+    def test_oversized_input_rejected(self, translation_handler, mock_openai_client):
+        """測試超過輸入上限的訊息不會送出"""
+        translation_handler.config.translation_max_input_tokens = 10
+
+        result = translation_handler.translate_message("字" * 50, "req-1")
+
+        assert result == "訊息過長，無法翻譯。"
+        mock_openai_client.chat.completions.create.assert_not_called()
+
+    def test_dense_input_chunked_to_fit_output_budget(self, translation_handler, mock_openai_client):
+        """測試預估譯文超過單次輸出上限時先分段再送出"""
+        translation_handler.config.line_cache_min_lines = 0
+        translation_handler.token_estimator.max_completion_tokens = 100
+        text = "\n".join("字" * 40 for _ in range(4))
+
+        translation_handler.translate_message(text, "req-1")
+
+        calls = mock_openai_client.chat.completions.create.call_args_list
+        assert len(calls) > 1
+        assert all(call.kwargs["max_tokens"] <= 100 for call in calls)
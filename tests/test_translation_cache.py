@@ -0,0 +1,85 @@
+"""
+翻譯快取測試
+測試 TranslationCache 的 LRU / TTL 行為以及 translate_message 的快取整合
+"""
+
+from unittest.mock import patch
+
+from translation_cache import TranslationCache
+
+
+class TestTranslationCache:
+    """TranslationCache 單元測試"""
+
+    def test_key_normalizes_whitespace(self):
+        """測試只差在空白的訊息共用同一個快取鍵"""
+        cache = TranslationCache()
+        assert cache.make_key("gpt-4o", "en->zh", "OK  thanks ") == cache.make_key(
+            "gpt-4o", "en->zh", "OK thanks"
+        )
+
+    def test_key_depends_on_model_and_direction(self):
+        """測試模型與翻譯方向會影響快取鍵"""
+        cache = TranslationCache()
+        base = cache.make_key("gpt-4o", "en->zh", "OK")
+        assert base != cache.make_key("gpt-4o-mini", "en->zh", "OK")
+        assert base != cache.make_key("gpt-4o", "zh->en", "OK")
+
+    def test_lru_eviction(self):
+        """測試超過容量時淘汰最久未使用的項目"""
+        cache = TranslationCache(max_entries=2)
+        cache.set("a", "A")
+        cache.set("b", "B")
+        assert cache.get("a") == "A"
+        cache.set("c", "C")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "A"
+        assert cache.get("c") == "C"
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        """測試過期項目不會被回傳"""
+        cache = TranslationCache(ttl_seconds=10)
+        with patch("translation_cache.time.monotonic", return_value=100.0):
+            cache.set("a", "A")
+        with patch("translation_cache.time.monotonic", return_value=111.0):
+            assert cache.get("a") is None
+
+        stats = cache.get_stats()
+        assert stats["expirations"] == 1
+        assert stats["entries"] == 0
+
+    def test_stats_counters(self):
+        """測試命中與未命中計數"""
+        cache = TranslationCache()
+        cache.set("a", "A")
+        cache.get("a")
+        cache.get("missing")
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+
+class TestTranslateMessageCache:
+    """translate_message 快取整合測試"""
+
+    def test_repeated_message_hits_cache(self, translation_handler, mock_openai_client):
+        """測試重複訊息只呼叫一次 OpenAI"""
+        first = translation_handler.translate_message("OK thanks", "req-1")
+        second = translation_handler.translate_message("OK  thanks", "req-2")
+
+        assert first == second == "Mocked translation result"
+        assert mock_openai_client.chat.completions.create.call_count == 1
+        assert translation_handler.translation_cache.get_stats()["hits"] == 1
+
+    def test_errors_are_not_cached(self, translation_handler, mock_openai_client):
+        """測試翻譯失敗的結果不會寫入快取"""
+        mock_openai_client.chat.completions.create.side_effect = RuntimeError("boom")
+        translation_handler.translate_message("收到", "req-1")
+
+        mock_openai_client.chat.completions.create.side_effect = None
+        assert translation_handler.translate_message("收到", "req-2") == "Mocked translation result"
+        assert mock_openai_client.chat.completions.create.call_count == 2
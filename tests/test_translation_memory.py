@@ -0,0 +1,103 @@
+"""
+翻譯記憶測試
+測試 TranslationMemory 的持久化、容量上限與壓縮，以及與 translate_message 的整合
+"""
+
+import threading
+
+from translation_memory import TranslationMemory
+
+
+class TestTranslationMemory:
+    """TranslationMemory 單元測試"""
+
+    def test_survives_reopen(self, tmp_path):
+        """測試重新開啟後仍能讀到先前寫入的翻譯（模擬冷啟動）"""
+        db_path = str(tmp_path / "memory.db")
+        memory = TranslationMemory(db_path)
+        memory.put("key-1", "收到")
+        memory.close()
+
+        reopened = TranslationMemory(db_path)
+        assert reopened.get("key-1") == "收到"
+        assert reopened.get("missing") is None
+        assert reopened.get_stats()["entries"] == 1
+        reopened.close()
+
+    def test_lazy_open(self, tmp_path):
+        """測試資料庫在第一次存取前不會被開啟"""
+        db_path = tmp_path / "memory.db"
+        memory = TranslationMemory(str(db_path))
+
+        assert not memory.get_stats()["loaded"]
+        assert not db_path.exists()
+
+        memory.get("anything")
+        assert memory.get_stats()["loaded"]
+        memory.close()
+
+    def test_size_cap_evicts_least_recently_used(self, tmp_path):
+        """測試超過容量時淘汰最久未使用的項目"""
+        memory = TranslationMemory(str(tmp_path / "memory.db"), max_entries=2)
+        memory.put("a", "A")
+        memory.flush()
+        memory.put("b", "B")
+        memory.flush()
+        memory.put("c", "C")
+        memory.flush()
+
+        assert memory.get("a") is None
+        assert memory.get("b") == "B"
+        assert memory.get("c") == "C"
+        stats = memory.get_stats()
+        assert stats["entries"] == 2
+        assert stats["evictions"] == 1
+        memory.close()
+
+    def test_compact(self, tmp_path):
+        """測試壓縮後資料仍完整"""
+        memory = TranslationMemory(str(tmp_path / "memory.db"))
+        for i in range(20):
+            memory.put(f"key-{i}", f"value-{i}")
+        memory.flush()
+        memory.compact()
+
+        assert memory.get("key-7") == "value-7"
+        assert memory.get_stats()["compactions"] == 1
+        memory.close()
+
+    def test_reads_do_not_wait_for_writer_lock(self, tmp_path):
+        """測試壓縮或寫回持有寫入連線時，查詢仍可透過唯讀連線完成"""
+        memory = TranslationMemory(str(tmp_path / "memory.db"))
+        memory.put("key-1", "收到")
+        memory.flush()
+        memory.get("key-1")
+
+        results = []
+        with memory._conn_lock:
+            reader = threading.Thread(target=lambda: results.append(memory.get("key-1")))
+            reader.start()
+            reader.join(timeout=2)
+            assert not reader.is_alive()
+
+        assert results == ["收到"]
+        memory.close()
+
+
+class TestTranslateMessageMemory:
+    """translate_message 翻譯記憶整合測試"""
+
+    def test_memory_hit_after_cache_cleared(self, translation_handler, mock_openai_client, tmp_path):
+        """測試記憶體快取清空後（模擬冷啟動）由翻譯記憶提供結果"""
+        translation_handler.translation_memory = TranslationMemory(str(tmp_path / "memory.db"))
+
+        translation_handler.translate_message("Standing meeting at 10am", "req-1")
+        translation_handler.translation_memory.flush()
+        translation_handler.translation_cache.clear()
+
+        result = translation_handler.translate_message("Standing meeting at 10am", "req-2")
+
+        assert result == "Mocked translation result"
+        assert mock_openai_client.chat.completions.create.call_count == 1
+        assert translation_handler.translation_memory.get_stats()["hits"] == 1
+        translation_handler.translation_memory.close()
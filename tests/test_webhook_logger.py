@@ -0,0 +1,137 @@
+"""
+Webhook 日誌測試
+測試 JSON Lines 附加寫入、依大小與時間輪替、gzip 壓縮，以及從檔案尾端讀取最近的記錄
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+
+from webhook_logger import WebhookLogger
+
+
+def make_logger(tmp_path, **kwargs):
+    return WebhookLogger(log_file=str(tmp_path / "logs" / "webhook_logs.jsonl"), **kwargs)
+
+
+def write_records(logger, count, prefix="req"):
+    for i in range(count):
+        logger.save_to_file({"timestamp": "2026-01-01T00:00:00", "request_id": f"{prefix}-{i}"})
+
+
+class TestWebhookLogger:
+    """WebhookLogger 檔案寫入測試"""
+
+    def test_appends_one_json_line_per_record(self, tmp_path):
+        """測試每筆記錄附加為一行 JSON"""
+        logger = make_logger(tmp_path)
+        logger.log_webhook("req-1", {"content-type": "application/json"}, '{"events": []}')
+        logger.log_webhook("req-2", {}, "not json")
+
+        with open(logger.log_file, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        assert [json.loads(line)["request_id"] for line in lines] == ["req-1", "req-2"]
+        assert json.loads(lines[1])["parse_success"] is False
+
+    def test_concurrent_writes_are_not_lost(self, tmp_path):
+        """測試多個執行緒同時寫入時沒有記錄遺失或交錯"""
+        logger = make_logger(tmp_path)
+        threads = [threading.Thread(target=write_records, args=(logger, 50, f"t{i}")) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with open(logger.log_file, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        assert len(records) == 400
+
+    def test_get_recent_logs_reads_tail(self, tmp_path):
+        """測試取得最近的記錄，順序由舊到新"""
+        logger = make_logger(tmp_path)
+        write_records(logger, 500)
+
+        recent = logger.get_recent_logs(3)
+
+        assert [record["request_id"] for record in recent] == ["req-497", "req-498", "req-499"]
+        assert logger._read_tail_lines(logger.log_file, 2, block_size=16) == [
+            json.dumps({"timestamp": "2026-01-01T00:00:00", "request_id": f"req-{i}"}, separators=(",", ":"))
+            for i in (498, 499)
+        ]
+
+    def test_rotates_by_size_and_keeps_backups(self, tmp_path):
+        """測試檔案超過大小時輪替，只保留 backup_count 個輪替檔案"""
+        logger = make_logger(tmp_path, max_bytes=500, backup_count=2)
+        write_records(logger, 100)
+
+        assert len(logger._rotated_segments()) == 2
+        assert os.path.getsize(logger.log_file) < 500
+        recent = logger.get_recent_logs(15)
+        assert [record["request_id"] for record in recent] == [f"req-{i}" for i in range(85, 100)]
+
+    def test_rotates_by_age(self, tmp_path):
+        """測試第一筆記錄超過時間上限時輪替"""
+        logger = make_logger(tmp_path, max_age_seconds=60)
+        write_records(logger, 1)
+        logger._segment_started = time.time() - 61
+        write_records(logger, 1, prefix="new")
+
+        assert len(logger._rotated_segments()) == 1
+        assert not os.path.exists(logger.log_file) or os.path.getsize(logger.log_file) == 0
+
+    def test_compresses_rotated_segments(self, tmp_path):
+        """測試啟用 gzip 時輪替後的檔案會被壓縮，且仍可讀取"""
+        logger = make_logger(tmp_path, max_bytes=200, compress=True)
+        write_records(logger, 4)
+
+        deadline = time.time() + 2
+        while time.time() < deadline and not any(p.endswith(".gz") for p in logger._rotated_segments()):
+            time.sleep(0.01)
+        compressed = [p for p in logger._rotated_segments() if p.endswith(".gz")]
+        assert compressed
+        with gzip.open(compressed[0], "rt", encoding="utf-8") as f:
+            assert json.loads(f.readline())["request_id"] == "req-0"
+
+    def test_compression_keeps_backup_count(self, tmp_path):
+        """測試壓縮中的檔案不計入 backup_count，壓縮完成後剛好保留 backup_count 個 .gz 檔"""
+        logger = make_logger(tmp_path, max_bytes=200, backup_count=2, compress=True)
+        write_records(logger, 40)
+
+        deadline = time.time() + 2
+        while time.time() < deadline and any(not p.endswith(".gz") for p in logger._rotated_segments()):
+            time.sleep(0.01)
+        segments = logger._rotated_segments()
+        assert len(segments) == 2
+        assert all(p.endswith(".gz") for p in segments)
+
+    def test_prune_skips_segments_being_compressed(self, tmp_path):
+        """測試清理舊檔時不刪除尚未壓縮完成的原檔"""
+        logger = make_logger(tmp_path, backup_count=0, compress=True)
+        os.makedirs(os.path.dirname(logger.log_file), exist_ok=True)
+        pending = logger.log_file + ".20260101-000000-000000"
+        with open(pending, "w", encoding="utf-8") as f:
+            f.write("{}\n")
+
+        with logger._lock:
+            logger._prune_segments()
+
+        assert os.path.exists(pending)
+
+    def test_invalid_env_values_fall_back_to_defaults(self, monkeypatch):
+        """測試環境變數格式錯誤時使用預設值，不影響匯入"""
+        import webhook_logger
+
+        monkeypatch.setenv("WEBHOOK_LOG_MAX_BYTES", "5MB")
+
+        assert webhook_logger._get_int_env("WEBHOOK_LOG_MAX_BYTES", 123) == 123
+
+    def test_clear_logs_removes_segments(self, tmp_path):
+        """測試清除日誌時一併刪除輪替檔案"""
+        logger = make_logger(tmp_path, max_bytes=200)
+        write_records(logger, 10)
+
+        assert logger.clear_logs()
+        assert logger.get_recent_logs() == []
+        assert logger._rotated_segments() == []
@@ -0,0 +1,138 @@
+# text_chunker.py - 將長訊息依段落與行切成片段，以及將翻譯結果打包成 LINE 文字訊息
+import re
+from typing import List, Tuple
+
+# LINE 單則文字訊息的字元上限與單次回覆的訊息數上限
+LINE_TEXT_MESSAGE_MAX_CHARS = 5000
+LINE_REPLY_MAX_MESSAGES = 5
+
+_SENTENCE_END = re.compile(r"(?<=[.!?。！？；;])")
+
+
+def _split_long_line(line: str, max_chars: int) -> List[str]:
+    """將超過上限的單行依句子、空白，最後依字元數切開"""
+    pieces: List[str] = []
+    for sentence in _SENTENCE_END.split(line):
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+        else:
+            words = sentence.split(" ")
+            pieces.extend(word if i == 0 else " " + word for i, word in enumerate(words))
+
+    parts: List[str] = []
+    current = ""
+    for piece in pieces:
+        while len(piece) > max_chars:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(piece[:max_chars])
+            piece = piece[max_chars:]
+        if len(current) + len(piece) > max_chars:
+            parts.append(current)
+            current = piece
+        else:
+            current += piece
+    if current:
+        parts.append(current)
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _append_chunk(chunks: List[Tuple[str, str]], segments: List[Tuple[str, str]]) -> None:
+    """將片段加入結果；結尾的空白行併入分隔字串，避免被模型吃掉"""
+    end = len(segments)
+    while end > 1 and not segments[end - 1][0].strip():
+        end -= 1
+    body_segments = segments[:end]
+    body = "".join(text + sep for text, sep in body_segments[:-1]) + body_segments[-1][0]
+    separator = body_segments[-1][1] + "".join(text + sep for text, sep in segments[end:])
+    chunks.append((body, separator))
+
+
+def split_into_chunks(text: str, max_chars: int) -> List[Tuple[str, str]]:
+    """
+    依段落與行的邊界將文字切成不超過 max_chars 的片段
+
+    Args:
+        text: 原始文字
+        max_chars: 每個片段的字元上限
+
+    Returns:
+        List[Tuple[str, str]]: (片段, 片段之後的分隔字串)；依序串接「片段 + 分隔字串」即可還原原文結構。
+        超長單行被切開時，分隔字串為單一空白。
+    """
+    max_chars = max(1, max_chars)
+    text = text.strip()
+    if not text:
+        return []
+
+    lines = text.split("\n")
+    segments: List[Tuple[str, str]] = []
+    for index, line in enumerate(lines):
+        line_sep = "\n" if index < len(lines) - 1 else ""
+        if len(line) <= max_chars:
+            segments.append((line, line_sep))
+            continue
+        parts = _split_long_line(line, max_chars)
+        segments.extend((part, " ") for part in parts[:-1])
+        segments.append((parts[-1], line_sep))
+
+    chunks: List[Tuple[str, str]] = []
+    current: List[Tuple[str, str]] = []
+    size = 0
+    pending = list(reversed(segments))
+    while pending:
+        segment = pending.pop()
+        if not current and not segment[0].strip():
+            # 片段開頭的空白行併入前一個片段的分隔字串
+            if chunks:
+                body, separator = chunks[-1]
+                chunks[-1] = (body, separator + segment[0] + segment[1])
+            continue
+
+        if current and size + len(segment[0]) > max_chars:
+            # 優先在段落（空白行）處切開，剩下的行放回待處理
+            cut = max((i for i in range(1, len(current)) if not current[i][0].strip()), default=0)
+            if cut:
+                _append_chunk(chunks, current[:cut])
+                pending.append(segment)
+                pending.extend(reversed(current[cut:]))
+            else:
+                _append_chunk(chunks, current)
+                pending.append(segment)
+            current = []
+            size = 0
+            continue
+
+        current.append(segment)
+        size += len(segment[0]) + len(segment[1])
+
+    if current:
+        _append_chunk(chunks, current)
+    return chunks
+
+
+def pack_text_messages(
+    text: str,
+    max_chars: int = LINE_TEXT_MESSAGE_MAX_CHARS,
+    max_messages: int = LINE_REPLY_MAX_MESSAGES,
+) -> List[str]:
+    """
+    將翻譯結果打包成最多 max_messages 則、每則不超過 max_chars 的文字訊息
+
+    Args:
+        text: 翻譯結果
+        max_chars: 單則訊息的字元上限
+        max_messages: 訊息數上限，超過時最後一則會被截斷並以「…」結尾
+
+    Returns:
+        List[str]: 要送出的文字訊息內容
+    """
+    if len(text) <= max_chars:
+        return [text]
+
+    messages = [body for body, _ in split_into_chunks(text, max_chars)]
+    if len(messages) > max_messages:
+        messages = messages[:max_messages]
+        messages[-1] = messages[-1][: max_chars - 1] + "…"
+    return messages
@@ -0,0 +1,137 @@
+# text_masking.py - 翻譯前以短佔位符取代網址、@提及與 LINE 表情符號標記，翻譯後還原
+import re
+from typing import Iterable, NamedTuple, Tuple
+
+from message_classifier import MENTION_PATTERN, URL_PATTERN
+
+# LINE 表情符號（emojis）在文字中以 $ 標記位置；金額（$100）不屬於標記
+_LINE_EMOJI = re.compile(r"\$(?!\d)")
+# 與快速判斷共用網址與 @提及的規則，網址在中文字或全形標點前結束
+_MASKABLE = re.compile(
+    f"{URL_PATTERN.pattern}|{MENTION_PATTERN.pattern}|{_LINE_EMOJI.pattern}", re.IGNORECASE
+)
+# 網址允許的 ASCII 標點出現在結尾時，通常屬於句子而非網址
+_URL_TRAILING = ".,;:!?)]'\""
+
+PLACEHOLDER = "[#{}]"
+_PLACEHOLDER = re.compile(r"\[#(\d+)\]")
+
+
+class MaskedText(NamedTuple):
+    """遮罩後的文字與被取代的原始片段（索引即佔位符編號）"""
+    text: str
+    originals: Tuple[str, ...]
+
+
+class RestoreResult(NamedTuple):
+    """還原結果；dropped / duplicated 為譯文中遺漏與重複出現的佔位符數量"""
+    text: str
+    dropped: int
+    duplicated: int
+
+
+def mask_text(text: str) -> MaskedText:
+    """
+    以 [#n] 佔位符取代網址、@提及與 LINE 表情符號標記
+
+    Args:
+        text: 原始文字
+
+    Returns:
+        MaskedText: 遮罩後的文字與原始片段；原文已含有佔位符格式時不遮罩，避免還原時混淆
+    """
+    if _PLACEHOLDER.search(text):
+        return MaskedText(text, ())
+
+    originals = []
+    index_of = {}
+
+    def replace(match: re.Match) -> str:
+        token = match.group(0)
+        suffix = ""
+        if token[0] not in "@$":
+            stripped = token.rstrip(_URL_TRAILING)
+            suffix = token[len(stripped):]
+            token = stripped
+        if token not in index_of:
+            index_of[token] = len(originals)
+            originals.append(token)
+        return PLACEHOLDER.format(index_of[token]) + suffix
+
+    masked = _MASKABLE.sub(replace, text)
+    return MaskedText(masked, tuple(originals))
+
+
+def pin_spans(masked: MaskedText, spans: Iterable[Tuple[int, int, str]]) -> MaskedText:
+    """
+    再以佔位符取代遮罩文字中的指定片段，還原時換成指定的文字（例如詞彙表的譯名）
+
+    Args:
+        masked: mask_text 回傳的結果
+        spans: (start, end, 還原文字)，依位置排序且互不重疊
+
+    Returns:
+        MaskedText: 加上新佔位符的結果；文字中已有不屬於遮罩的佔位符格式時原樣回傳
+    """
+    spans = list(spans)
+    if not spans or (not masked.originals and _PLACEHOLDER.search(masked.text)):
+        return masked
+
+    originals = list(masked.originals)
+    index_of = {}
+    parts = []
+    position = 0
+    for start, end, value in spans:
+        if value not in index_of:
+            index_of[value] = len(originals)
+            originals.append(value)
+        parts.append(masked.text[position:start])
+        parts.append(PLACEHOLDER.format(index_of[value]))
+        position = end
+    parts.append(masked.text[position:])
+    return MaskedText("".join(parts), tuple(originals))
+
+
+def unmask_text(translation: str, originals: Tuple[str, ...], masked_text: str = "") -> RestoreResult:
+    """
+    將譯文中的佔位符還原成原始片段
+
+    模型偶爾會漏掉或重複佔位符：重複出現時保留與遮罩文字相同的次數，多出的移除；
+    遺漏的片段附加在譯文最後，確保網址不會遺失。
+
+    Args:
+        translation: 模型輸出的譯文
+        originals: mask_text 回傳的原始片段
+        masked_text: 遮罩後的原文，用來計算每個佔位符應出現的次數（省略時視為各一次）
+
+    Returns:
+        RestoreResult: 還原後的譯文與遺漏、重複的佔位符數量
+    """
+    if not originals:
+        return RestoreResult(translation, 0, 0)
+
+    expected = [1] * len(originals)
+    if masked_text:
+        expected = [0] * len(originals)
+        for match in _PLACEHOLDER.finditer(masked_text):
+            expected[int(match.group(1))] += 1
+
+    seen = [0] * len(originals)
+    duplicated = 0
+
+    def restore(match: re.Match) -> str:
+        nonlocal duplicated
+        index = int(match.group(1))
+        if index >= len(originals):
+            return ""
+        seen[index] += 1
+        if seen[index] > expected[index]:
+            duplicated += 1
+            return ""
+        return originals[index]
+
+    restored = _PLACEHOLDER.sub(restore, translation)
+    missing = [originals[i] for i in range(len(originals)) if seen[i] == 0 and expected[i] > 0]
+    if missing:
+        restored = restored.rstrip() + " " + " ".join(missing)
+    return RestoreResult(restored, len(missing), duplicated)
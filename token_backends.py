@@ -0,0 +1,425 @@
+# token_backends.py - 已使用 token 的儲存後端：單一程序的記憶體、共用路徑上的 SQLite，或多個實例共用的 Redis
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+from concurrent.futures import Future
+from typing import List, Optional, Sequence
+
+# 每個 token 只保存 8 bytes 的 keyed BLAKE2b 摘要，可以直接放進 array('Q')
+DIGEST_SIZE = 8
+# compact dict 每個項目的 hash、key、value 三個欄位（不含雜湊索引與預留的空位）
+_DICT_ENTRY_BYTES = 3 * 8
+
+
+def make_digest(token: str, key: bytes) -> bytes:
+    """計算 token 的固定長度摘要"""
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=DIGEST_SIZE, key=key).digest()
+
+
+def _now_ms() -> int:
+    """單調時鐘的整數毫秒"""
+    return time.monotonic_ns() // 1_000_000
+
+
+class TokenDigestStore:
+    """固定容量的環狀緩衝區，依標記時間保存 token 摘要；滿了時淘汰最舊的項目
+
+    摘要與時間戳記各放在一個 array 中，另以 dict 由摘要找到所在位置。
+    項目依時間順序寫入，過期與淘汰都只從最舊的一端移除。
+    """
+
+    # 每個項目的固定成本：兩個 array 中各 8 bytes、索引 dict 的一個項目，以及摘要與位置的整數物件
+    ENTRY_BYTES = 2 * 8 + _DICT_ENTRY_BYTES + sys.getsizeof(2 ** 63) + sys.getsizeof(2 ** 30)
+
+    def __init__(self, capacity: int):
+        """
+        初始化儲存區
+
+        Args:
+            capacity: 最多保存幾個 token
+        """
+        self.capacity = max(1, capacity)
+        self._digests = array("Q", bytes(8 * self.capacity))
+        self._times = array("q", bytes(8 * self.capacity))
+        self._slots = {}
+        self._head = 0
+        self._size = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, digest: int) -> bool:
+        return digest in self._slots
+
+    def add(self, digest: int, timestamp_ms: int) -> None:
+        """寫入摘要；已滿時先淘汰最舊的項目"""
+        if self._size == self.capacity:
+            self._pop_oldest()
+            self.evicted += 1
+        slot = (self._head + self._size) % self.capacity
+        self._digests[slot] = digest
+        self._times[slot] = timestamp_ms
+        self._slots[digest] = slot
+        self._size += 1
+
+    def expire(self, cutoff_ms: int) -> int:
+        """移除時間早於 cutoff_ms 的項目，回傳移除的數量"""
+        expired = 0
+        while self._size and self._times[self._head] < cutoff_ms:
+            self._pop_oldest()
+            expired += 1
+        return expired
+
+    def oldest_timestamp(self) -> Optional[int]:
+        """最舊項目的時間戳記（毫秒），沒有項目時回傳 None"""
+        return self._times[self._head] if self._size else None
+
+    def _pop_oldest(self) -> None:
+        del self._slots[self._digests[self._head]]
+        self._head = (self._head + 1) % self.capacity
+        self._size -= 1
+
+    def memory_bytes(self) -> int:
+        """估計目前佔用的記憶體（bytes）：依容量預先配置的兩個 array、索引 dict 及其中的整數物件"""
+        arrays = self._digests.itemsize * len(self._digests) + self._times.itemsize * len(self._times)
+        # 摘要是大整數物件；slot 位置大多也超出小整數快取範圍
+        keys = self._size * (sys.getsizeof(2 ** 63) + sys.getsizeof(2 ** 30))
+        return arrays + sys.getsizeof(self._slots) + keys
+
+
+class TokenBackend:
+    """已使用 token 的儲存後端介面；所有方法都以批次處理多個摘要"""
+
+    # 是否在多個實例之間共用（共用時摘要金鑰必須一致）
+    shared = False
+    name = "base"
+
+    def claim_many(self, digests: Sequence[bytes], ttl_ms: int) -> List[bool]:
+        """
+        原子性地檢查並寫入（check-and-set）
+
+        Args:
+            digests: token 摘要
+            ttl_ms: 寫入的摘要保留多久（毫秒）
+
+        Returns:
+            List[bool]: 每個摘要是否由這次呼叫寫入（False 表示已被使用）
+        """
+        raise NotImplementedError
+
+    def contains_many(self, digests: Sequence[bytes], ttl_ms: int) -> List[bool]:
+        """檢查摘要是否已被使用（未過期）"""
+        raise NotImplementedError
+
+    def get_stats(self) -> dict:
+        """取得後端的統計資訊"""
+        return {"backend": self.name}
+
+
+class MemoryTokenBackend(TokenBackend):
+    """單一程序內的記憶體後端，以單調時鐘計算過期
+
+    摘要依數值分散到多個分片，每個分片有自己的 TokenDigestStore 與鎖，
+    不同分片的檢查並寫入不會互相等待。容量與淘汰以分片為單位，淘汰的是該分片中最舊的項目。
+    """
+
+    name = "memory"
+
+    def __init__(self, capacity: int = 100_000, shards: int = 16):
+        """
+        初始化記憶體後端
+
+        Args:
+            capacity: 最多保存幾個 token，超過時淘汰最舊的
+            shards: 分片數（鎖的數量），不超過 capacity
+        """
+        shards = max(1, min(shards, capacity))
+        per_shard = -(-max(1, capacity) // shards)
+        self._shards = [(threading.Lock(), TokenDigestStore(per_shard)) for _ in range(shards)]
+        self.capacity = per_shard * shards
+        self._ttl_ms = None
+
+    def _shard(self, value: int):
+        return self._shards[value % len(self._shards)]
+
+    def _expire(self, store: TokenDigestStore, ttl_ms: int) -> None:
+        """移除分片中過期的摘要（呼叫端需持有該分片的鎖）"""
+        self._ttl_ms = ttl_ms
+        expired = store.expire(_now_ms() - ttl_ms)
+        if expired:
+            logging.debug(f"清理了 {expired} 個過期的 reply token")
+
+    def claim(self, digest: bytes, ttl_ms: int) -> bool:
+        """原子性地檢查並寫入單一摘要，只鎖住摘要所在的分片"""
+        value = int.from_bytes(digest, "big")
+        lock, store = self._shard(value)
+        with lock:
+            self._expire(store, ttl_ms)
+            if value in store:
+                return False
+            store.add(value, _now_ms())
+            return True
+
+    def claim_many(self, digests: Sequence[bytes], ttl_ms: int) -> List[bool]:
+        return [self.claim(digest, ttl_ms) for digest in digests]
+
+    def contains_many(self, digests: Sequence[bytes], ttl_ms: int) -> List[bool]:
+        results = []
+        for digest in digests:
+            value = int.from_bytes(digest, "big")
+            lock, store = self._shard(value)
+            with lock:
+                self._expire(store, ttl_ms)
+                results.append(value in store)
+        return results
+
+    def get_stats(self) -> dict:
+        count = evicted = memory_bytes = 0
+        oldest = None
+        for lock, store in self._shards:
+            with lock:
+                if self._ttl_ms is not None:
+                    self._expire(store, self._ttl_ms)
+                # 每個分片最舊的 token 一定在最前面，不需要掃描全部
+                shard_oldest = store.oldest_timestamp()
+                if shard_oldest is not None and (oldest is None or shard_oldest < oldest):
+                    oldest = shard_oldest
+                count += len(store)
+                evicted += store.evicted
+                memory_bytes += store.memory_bytes()
+        return {
+            "backend": self.name,
+            "active_tokens_count": count,
+            "oldest_token_age_minutes": (_now_ms() - oldest) / 60000 if oldest is not None else 0,
+            "capacity": self.capacity,
+            "shards": len(self._shards),
+            "evicted": evicted,
+            "memory_bytes": memory_bytes,
+            # 總量包含依容量預先配置的 array，不能除以目前的 token 數；每個 token 的成本另外以固定值回報
+            "bytes_per_token": TokenDigestStore.ENTRY_BYTES,
+        }
+
+
+class SqliteTokenBackend(TokenBackend):
+    """SQLite 後端；資料庫放在多個實例都能存取的路徑上即可共用
+
+    共用路徑通常是網路檔案系統（例如 Azure 上 /home 背後的 Azure Files），SQLite 在網路檔案系統上不支援 WAL，
+    因此使用 rollback journal（DELETE）。跨程序無法共用單調時鐘，過期時間使用 epoch 毫秒。
+    """
+
+    shared = True
+    name = "sqlite"
+
+    def __init__(self, path: str, purge_interval_seconds: float = 60):
+        """
+        初始化 SQLite 後端
+
+        Args:
+            path: 資料庫檔案路徑
+            purge_interval_seconds: 每隔多久刪除一次過期的資料列
+        """
+        self.path = path
+        self.purge_interval_seconds = purge_interval_seconds
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS used_tokens (digest BLOB PRIMARY KEY, expires_at INTEGER NOT NULL)"
+        )
+
+    def claim_many(self, digests: Sequence[bytes], ttl_ms: int) -> List[bool]:
+        now = int(time.time() * 1000)
+        results = []
+        with self._lock:
+            # BEGIN IMMEDIATE 先取得寫入鎖，其他實例的檢查與寫入會等到這個交易結束
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for digest in digests:
+                    self._conn.execute(
+                        "DELETE FROM used_tokens WHERE digest = ? AND expires_at <= ?", (digest, now)
+                    )
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO used_tokens (digest, expires_at) VALUES (?, ?)",
+                        (digest, now + ttl_ms),
+                    )
+                    results.append(cursor.rowcount == 1)
+                if time.monotonic() - self._last_purge >= self.purge_interval_seconds:
+                    self._conn.execute("DELETE FROM used_tokens WHERE expires_at <= ?", (now,))
+                    self._last_purge = time.monotonic()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return results
+
+    def contains_many(self, digests: Sequence[bytes], ttl_ms: int) -> List[bool]:
+        now = int(time.time() * 1000)
+        with self._lock:
+            return [
+                self._conn.execute(
+                    "SELECT 1 FROM used_tokens WHERE digest = ? AND expires_at > ?", (digest, now)
+                ).fetchone() is not None
+                for digest in digests
+            ]
+
+    def get_stats(self) -> dict:
+        now = int(time.time() * 1000)
+        with self._lock:
+            count = self._conn.execute(
+                "SELECT COUNT(*) FROM used_tokens WHERE expires_at > ?", (now,)
+            ).fetchone()[0]
+        return {"backend": self.name, "path": self.path, "active_tokens_count": count}
+
+
+class RedisTokenBackend(TokenBackend):
+    """Redis 後端：以 SET NX PX 原子性地寫入，整批請求放在同一個 pipeline 中送出
+
+    client 只需提供 pipeline()，其回傳物件支援 set(name, value, nx=, px=)、exists(name) 與 execute()；
+    redis-py 的 Redis 物件即符合此介面。
+    """
+
+    shared = True
+    name = "redis"
+
+    def __init__(self, client, prefix: str = "line:reply-token:"):
+        """
+        初始化 Redis 後端
+
+        Args:
+            client: Redis 客戶端
+            prefix: 鍵的前綴
+        """
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, digest: bytes) -> str:
+        return self.prefix + digest.hex()
+
+    def claim_many(self, digests: Sequence[bytes], ttl_ms: int) -> List[bool]:
+        pipeline = self.client.pipeline(transaction=False)
+        for digest in digests:
+            pipeline.set(self._key(digest), 1, nx=True, px=ttl_ms)
+        return [bool(result) for result in pipeline.execute()]
+
+    def contains_many(self, digests: Sequence[bytes], ttl_ms: int) -> List[bool]:
+        pipeline = self.client.pipeline(transaction=False)
+        for digest in digests:
+            pipeline.exists(self._key(digest))
+        return [bool(result) for result in pipeline.execute()]
+
+
+class BatchingTokenBackend(TokenBackend):
+    """將同時送達的請求合併成一次後端呼叫（group commit）
+
+    沒有請求在執行時立即送出，不額外等待；後端呼叫進行中抵達的請求會排隊，
+    由下一個呼叫者一次送出，因此負載越高每次往返處理的 token 越多。
+    """
+
+    def __init__(self, backend: TokenBackend, max_batch: int = 128):
+        """
+        初始化批次處理
+
+        Args:
+            backend: 實際的儲存後端
+            max_batch: 每次後端呼叫最多處理幾個摘要
+        """
+        self.backend = backend
+        self.shared = backend.shared
+        self.name = backend.name
+        self.max_batch = max(1, max_batch)
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._flushing = False
+        self.requests = 0
+        self.round_trips = 0
+
+    def claim_many(self, digests: Sequence[bytes], ttl_ms: int) -> List[bool]:
+        future = Future()
+        with self._lock:
+            self.requests += 1
+            self._pending.append((list(digests), ttl_ms, future))
+            leader = not self._flushing
+            if leader:
+                self._flushing = True
+        if leader:
+            self._flush()
+        return future.result()
+
+    def _flush(self) -> None:
+        """持續送出排隊中的請求，直到佇列清空"""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._flushing = False
+                    return
+                batch = []
+                size = 0
+                while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch):
+                    item = self._pending.popleft()
+                    batch.append(item)
+                    size += len(item[0])
+                self.round_trips += 1
+
+            # 同一批中的 TTL 通常相同；不同時分組送出
+            by_ttl = {}
+            for item in batch:
+                by_ttl.setdefault(item[1], []).append(item)
+            for ttl_ms, items in by_ttl.items():
+                try:
+                    results = self.backend.claim_many([d for digests, _, _ in items for d in digests], ttl_ms)
+                except Exception as error:
+                    for _, _, future in items:
+                        future.set_exception(error)
+                    continue
+                offset = 0
+                for digests, _, future in items:
+                    future.set_result(results[offset:offset + len(digests)])
+                    offset += len(digests)
+
+    def contains_many(self, digests: Sequence[bytes], ttl_ms: int) -> List[bool]:
+        return self.backend.contains_many(digests, ttl_ms)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            batching = {
+                "requests": self.requests,
+                "round_trips": self.round_trips,
+                "requests_per_round_trip": round(self.requests / self.round_trips, 2) if self.round_trips else 0.0,
+            }
+        return {**self.backend.get_stats(), "batching": batching}
+
+
+def create_token_backend(url: str, capacity: int = 100_000) -> TokenBackend:
+    """
+    依設定建立後端
+
+    Args:
+        url: "memory"、"sqlite:///路徑" 或 "redis://..."（需安裝 redis 套件）
+        capacity: 記憶體後端的容量
+
+    Returns:
+        TokenBackend: 共用後端會包上 BatchingTokenBackend；無法建立時退回記憶體後端
+    """
+    url = (url or "memory").strip()
+    try:
+        if url.startswith("sqlite:///"):
+            return BatchingTokenBackend(SqliteTokenBackend(url[len("sqlite:///"):]))
+        if url.startswith(("redis://", "rediss://")):
+            import redis
+
+            return BatchingTokenBackend(RedisTokenBackend(redis.Redis.from_url(url)))
+        if url != "memory":
+            logging.error(f"未知的 reply token 後端: {url}，改用記憶體後端")
+    except Exception as error:
+        logging.error(f"無法建立 reply token 後端 {url.split('@')[-1]}: {error}，改用記憶體後端")
+    return MemoryTokenBackend(capacity)
@@ -0,0 +1,171 @@
+# token_estimator.py - 以 tokenizer 估算翻譯請求的 prompt / completion token 數
+import logging
+import math
+import re
+import threading
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken 為選用套件，未安裝時改用字元啟發式估算
+    tiktoken = None
+
+_CJK_CHARS = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+
+# chat completion 每則訊息的格式額外 token 與回覆開頭 token
+_TOKENS_PER_MESSAGE = 4
+_REPLY_PRIMING_TOKENS = 3
+# OpenAI 自動 prompt 快取的最小 prompt 長度；較短的請求 cached_tokens 一律為 0
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+
+@lru_cache(maxsize=8)
+def _load_encoder(model: str):
+    """延遲載入並快取 tokenizer；載入失敗（未安裝或無法下載編碼檔）時回傳 None"""
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"無法載入 tokenizer，改用字元估算: {e}")
+        return None
+
+
+class TokenEstimator:
+    """估算翻譯請求的 token 數，決定 max_tokens 並記錄估算值與實際 usage 的差異"""
+
+    # 譯文 token 數相對於原文 token 數的上限比例（依目標語言）
+    COMPLETION_RATIOS = {"en": 1.5, "zh": 2.0}
+    DEFAULT_COMPLETION_RATIO = 2.0
+    # 極短訊息仍需保留的最少輸出 token
+    MIN_COMPLETION_TOKENS = 16
+
+    def __init__(self, model: str, max_completion_tokens: int = 4096):
+        """
+        初始化估算器
+
+        Args:
+            model: OpenAI 模型名稱（用於選擇 tokenizer）
+            max_completion_tokens: 單次請求允許的最大輸出 token 數
+        """
+        self.model = model
+        self.max_completion_tokens = max_completion_tokens
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.truncated = 0
+        self._estimated_prompt_total = 0
+        self._actual_prompt_total = 0
+        self._estimated_completion_total = 0
+        self._actual_completion_total = 0
+        self._cached_prompt_total = 0
+
+    @property
+    def uses_tokenizer(self) -> bool:
+        """是否使用真正的 tokenizer（否則為字元啟發式估算）"""
+        return _load_encoder(self.model) is not None
+
+    def count_tokens(self, text: str) -> int:
+        """
+        計算文字的 token 數
+
+        Args:
+            text: 要計算的文字
+
+        Returns:
+            int: token 數（無 tokenizer 時為保守估計：CJK 每字 1 token，其他每 4 字元 1 token）
+        """
+        if not text:
+            return 0
+        encoder = _load_encoder(self.model)
+        if encoder is not None:
+            # 使用者訊息可能含有 <|endoftext|> 之類的特殊 token 字串，當成一般文字計算而不是拋出 ValueError
+            return len(encoder.encode(text, disallowed_special=()))
+        cjk = len(_CJK_CHARS.findall(text))
+        return cjk + math.ceil((len(text) - cjk) / 4)
+
+    def estimate_prompt_tokens(self, system_prompt: str, user_prompt: str) -> int:
+        """估算 chat completion 請求的 prompt token 數"""
+        return (
+            self.count_tokens(system_prompt)
+            + self.count_tokens(user_prompt)
+            + 2 * _TOKENS_PER_MESSAGE
+            + _REPLY_PRIMING_TOKENS
+        )
+
+    def estimate_completion_tokens(self, text: str, direction: str) -> int:
+        """估算譯文的 token 數（未套用上限）"""
+        target = direction.partition("->")[2].split("-")[0]
+        ratio = self.COMPLETION_RATIOS.get(target, self.DEFAULT_COMPLETION_RATIO)
+        return max(self.MIN_COMPLETION_TOKENS, math.ceil(self.count_tokens(text) * ratio))
+
+    def max_tokens_for(self, text: str, direction: str) -> int:
+        """
+        計算請求的 max_tokens
+
+        Returns:
+            int: 依翻譯方向估算、且不超過 max_completion_tokens 的輸出上限
+        """
+        return min(self.estimate_completion_tokens(text, direction), self.max_completion_tokens)
+
+    def fits(self, text: str, direction: str) -> bool:
+        """判斷文字的預估譯文是否能在單次請求的輸出上限內完成"""
+        return self.estimate_completion_tokens(text, direction) <= self.max_completion_tokens
+
+    def record_usage(self, estimated_prompt: int, estimated_completion: int, response) -> None:
+        """記錄估算值與 OpenAI 回應中的實際 usage"""
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if not isinstance(prompt_tokens, int) or not isinstance(completion_tokens, int):
+            return
+
+        # 命中 OpenAI prompt 快取的前綴 token 數（舊版 API 或模型不支援時沒有此欄位）
+        cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+        finish_reason = getattr(response.choices[0], "finish_reason", None)
+        with self._lock:
+            self.samples += 1
+            if finish_reason == "length":
+                self.truncated += 1
+            self._estimated_prompt_total += estimated_prompt
+            self._actual_prompt_total += prompt_tokens
+            self._estimated_completion_total += estimated_completion
+            self._actual_completion_total += completion_tokens
+            if isinstance(cached_tokens, int):
+                self._cached_prompt_total += cached_tokens
+
+    def get_stats(self) -> dict:
+        """
+        取得統計資訊
+
+        Returns:
+            dict: 包含估算值與實際 usage 的累計與比例（實際 / 估算），以及 prompt 快取命中的 token 比例
+            （OpenAI 只快取至少 PROMPT_CACHE_MIN_TOKENS 個 token 的 prompt）
+        """
+        with self._lock:
+            return {
+                "tokenizer": "tiktoken" if self.uses_tokenizer else "heuristic",
+                "samples": self.samples,
+                "truncated": self.truncated,
+                "estimated_prompt_tokens": self._estimated_prompt_total,
+                "actual_prompt_tokens": self._actual_prompt_total,
+                "estimated_completion_tokens": self._estimated_completion_total,
+                "actual_completion_tokens": self._actual_completion_total,
+                "cached_prompt_tokens": self._cached_prompt_total,
+                # prompt 少於 PROMPT_CACHE_MIN_TOKENS 時 OpenAI 不快取，命中比例會維持 0
+                "prompt_cache_min_tokens": PROMPT_CACHE_MIN_TOKENS,
+                "prompt_cache_hit_rate": (
+                    round(self._cached_prompt_total / self._actual_prompt_total, 3)
+                    if self._actual_prompt_total else None
+                ),
+                "prompt_accuracy": (
+                    round(self._actual_prompt_total / self._estimated_prompt_total, 3)
+                    if self._estimated_prompt_total else None
+                ),
+                "completion_utilization": (
+                    round(self._actual_completion_total / self._estimated_completion_total, 3)
+                    if self._estimated_completion_total else None
+                ),
+            }
@@ -0,0 +1,123 @@
+# translation_cache.py - 翻譯結果快取（內容雜湊 + LRU + TTL）
+import hashlib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+_INLINE_WHITESPACE = re.compile(r"[ \t　]+")
+
+
+class TranslationCache:
+    """以 (model, direction, 正規化文字) 雜湊為鍵的翻譯快取，結合 LRU 淘汰與 TTL 過期"""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: int = 86400):
+        """
+        初始化翻譯快取
+
+        Args:
+            max_entries: 快取最多保留的筆數，超過時淘汰最久未使用的項目
+            ttl_seconds: 每筆快取的存活時間（秒）
+        """
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """
+        正規化訊息文字，讓只差在空白或 Unicode 組合方式的訊息共用同一筆快取
+
+        行結構會被保留，因為翻譯輸出需要逐行對應。
+        """
+        text = unicodedata.normalize("NFC", text or "")
+        lines = [_INLINE_WHITESPACE.sub(" ", line).strip() for line in text.strip().splitlines()]
+        return "\n".join(lines)
+
+    def make_key(self, model: str, direction: str, text: str) -> str:
+        """
+        產生快取鍵
+
+        Args:
+            model: OpenAI 模型名稱
+            direction: 翻譯方向（例如 zh->en）
+            text: 原始訊息文字
+
+        Returns:
+            str: 內容雜湊值（hex）
+        """
+        payload = f"{model}\x00{direction}\x00{self.normalize_text(text)}"
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        取得快取的翻譯結果
+
+        Returns:
+            Optional[str]: 命中時回傳翻譯結果，否則回傳 None
+        """
+        if self.max_entries == 0:
+            self.misses += 1
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """寫入翻譯結果，必要時淘汰最久未使用的項目"""
+        if self.max_entries == 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """清除所有快取項目"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """
+        取得統計資訊
+
+        Returns:
+            dict: 包含命中、未命中與淘汰次數的字典
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,248 @@
+# translation_memory.py - 可跨冷啟動保留的翻譯記憶（SQLite WAL + 非同步寫回）
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+
+class TranslationMemory:
+    """以 SQLite（WAL 模式）儲存翻譯結果，延遲開啟資料庫並由背景執行緒批次寫回
+
+    讀取使用獨立的唯讀連線，寫回、淘汰與壓縮（VACUUM）只鎖住寫入連線，不會阻塞請求路徑上的查詢。
+    WAL 需要共用記憶體，不支援網路檔案系統（例如 Azure 上 /home 背後的 Azure Files），資料庫應放在本機磁碟。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_entries: int = 50000,
+        write_queue_size: int = 1000,
+        compact_threshold: Optional[int] = None,
+    ):
+        """
+        初始化翻譯記憶
+
+        Args:
+            db_path: SQLite 資料庫路徑，必須在本機磁碟上（WAL 不支援網路檔案系統）
+            max_entries: 最多保留的筆數，超過時依最後使用時間淘汰
+            write_queue_size: 背景寫回佇列的容量，佇列滿時捨棄寫入而不阻塞請求
+            compact_threshold: 累積刪除多少筆後自動執行壓縮，預設為 max_entries 的 10%
+        """
+        self.db_path = db_path
+        self.max_entries = max(1, max_entries)
+        self.compact_threshold = compact_threshold or max(100, self.max_entries // 10)
+        self.logger = logging.getLogger(__name__)
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_lock = threading.Lock()
+        self._read_conn: Optional[sqlite3.Connection] = None
+        self._read_lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[str, Optional[str], float]]" = queue.Queue(maxsize=write_queue_size)
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._entry_count = 0
+        self._deleted_since_compact = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.dropped_writes = 0
+        self.evictions = 0
+        self.compactions = 0
+        self.errors = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """延遲開啟資料庫連線（呼叫端需持有 _conn_lock）"""
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations(last_used)")
+            conn.commit()
+
+            self._entry_count = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            self._conn = conn
+            self.logger.info(f"翻譯記憶已載入: {self.db_path}（{self._entry_count} 筆）")
+        return self._conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """延遲開啟唯讀連線（呼叫端需持有 _read_lock）；WAL 模式下讀取不會等待寫入連線的交易或 VACUUM"""
+        if self._read_conn is None:
+            # 第一次開啟時由寫入連線建立資料表
+            with self._conn_lock:
+                self._connection()
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA query_only=ON")
+            self._read_conn = conn
+        return self._read_conn
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        查詢翻譯記憶
+
+        Returns:
+            Optional[str]: 命中時回傳翻譯結果，否則回傳 None
+        """
+        try:
+            with self._read_lock:
+                # fetchall 讓語句立即結束，不會留著讀取交易妨礙 checkpoint
+                rows = self._reader().execute(
+                    "SELECT value FROM translations WHERE key = ?", (key,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            self.errors += 1
+            self.logger.error(f"讀取翻譯記憶失敗: {e}")
+            return None
+
+        if not rows:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        # 更新最後使用時間交給背景執行緒，讀取路徑不做寫入
+        self._enqueue(key, None)
+        return rows[0][0]
+
+    def put(self, key: str, value: str) -> None:
+        """非同步寫入翻譯結果"""
+        self._enqueue(key, value)
+
+    def _enqueue(self, key: str, value: Optional[str]) -> None:
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((key, value, time.time()))
+        except queue.Full:
+            self.dropped_writes += 1
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._writer_loop, name="translation-memory-writer", daemon=True
+                )
+                self._writer.start()
+
+    def _writer_loop(self) -> None:
+        """背景寫回：每次取出佇列中所有待寫項目，以單一交易寫入"""
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                self.errors += 1
+                self.logger.error(f"寫入翻譯記憶失敗: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: List[Tuple[str, Optional[str], float]]) -> None:
+        upserts = [(key, value, ts) for key, value, ts in batch if value is not None]
+        touches = [(ts, key) for key, value, ts in batch if value is None]
+
+        with self._conn_lock:
+            conn = self._connection()
+            with conn:
+                if upserts:
+                    before = conn.total_changes
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO translations(key, value, last_used) VALUES (?, ?, ?)",
+                        upserts,
+                    )
+                    self._entry_count += conn.total_changes - before
+                    conn.executemany(
+                        "UPDATE translations SET value = ?, last_used = ? WHERE key = ?",
+                        [(value, ts, key) for key, value, ts in upserts],
+                    )
+                    self.writes += len(upserts)
+                if touches:
+                    conn.executemany("UPDATE translations SET last_used = ? WHERE key = ?", touches)
+            self._evict_if_needed(conn)
+
+        if self._deleted_since_compact >= self.compact_threshold:
+            self.compact()
+
+    def _evict_if_needed(self, conn: sqlite3.Connection) -> None:
+        """超過容量時刪除最久未使用的項目（呼叫端需持有 _conn_lock）"""
+        overflow = self._entry_count - self.max_entries
+        if overflow <= 0:
+            return
+        with conn:
+            conn.execute(
+                "DELETE FROM translations WHERE key IN "
+                "(SELECT key FROM translations ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            )
+        self._entry_count -= overflow
+        self.evictions += overflow
+        self._deleted_since_compact += overflow
+
+    def compact(self) -> None:
+        """壓縮資料庫：套用容量上限、截斷 WAL 並回收空間；只鎖住寫入連線，查詢仍可透過唯讀連線進行"""
+        try:
+            with self._conn_lock:
+                conn = self._connection()
+                self._evict_if_needed(conn)
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.execute("VACUUM")
+                self._deleted_since_compact = 0
+                self.compactions += 1
+            self.logger.info(f"翻譯記憶壓縮完成（{self._entry_count} 筆）")
+        except sqlite3.Error as e:
+            self.errors += 1
+            self.logger.error(f"翻譯記憶壓縮失敗: {e}")
+
+    def flush(self) -> None:
+        """等待背景寫回佇列清空"""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """寫回剩餘項目並關閉資料庫連線"""
+        self.flush()
+        with self._read_lock:
+            if self._read_conn is not None:
+                self._read_conn.close()
+                self._read_conn = None
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> dict:
+        """
+        取得統計資訊
+
+        Returns:
+            dict: 包含命中、寫入、淘汰與壓縮次數的字典
+        """
+        return {
+            "path": self.db_path,
+            "loaded": self._conn is not None,
+            "entries": self._entry_count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "pending_writes": self._queue.qsize(),
+            "dropped_writes": self.dropped_writes,
+            "evictions": self.evictions,
+            "compactions": self.compactions,
+            "errors": self.errors,
+        }
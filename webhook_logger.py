@@ -1,14 +1,48 @@
 # webhook_logger.py - 詳細記錄 LINE webhook 的工具
+import glob
+import gzip
 import json
 import os
-from datetime import datetime
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
 import logging
 
 class WebhookLogger:
-    """詳細記錄 LINE webhook 的類別"""
+    """詳細記錄 LINE webhook 的類別
     
-    def __init__(self, log_file="webhook_logs.json"):
+    記錄以 JSON Lines 附加到檔案尾端，每筆一行；檔案超過大小或時間上限時輪替，
+    輪替後的檔案可選擇以 gzip 壓縮，只保留最近幾個。
+    """
+    
+    def __init__(
+        self,
+        log_file="webhook_logs.jsonl",
+        max_bytes=5 * 1024 * 1024,
+        max_age_seconds=24 * 3600,
+        backup_count=5,
+        compress=False,
+    ):
+        """
+        初始化 webhook 日誌
+        
+        Args:
+            log_file: 日誌檔案路徑
+            max_bytes: 檔案超過此大小時輪替（bytes）
+            max_age_seconds: 檔案第一筆記錄超過此時間時輪替（秒）
+            backup_count: 保留幾個輪替後的檔案
+            compress: 是否以 gzip 壓縮輪替後的檔案
+        """
         self.log_file = log_file
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.backup_count = max(0, backup_count)
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._fd = None
+        self._inode = None
+        self._segment_started = None
         self.setup_logging()
     
     def setup_logging(self):
@@ -50,29 +84,118 @@ class WebhookLogger:
         return webhook_data
     
     def save_to_file(self, webhook_data):
-        """儲存到 JSON 檔案"""
+        """以單次 append 寫入一行 JSON，必要時輪替檔案"""
+        line = (json.dumps(webhook_data, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
         try:
-            # 讀取現有的日誌
-            if os.path.exists(self.log_file):
-                with open(self.log_file, 'r', encoding='utf-8') as f:
-                    logs = json.load(f)
-            else:
-                logs = []
-            
-            # 新增新的記錄
-            logs.append(webhook_data)
-            
-            # 只保留最近 100 筆記錄
-            if len(logs) > 100:
-                logs = logs[-100:]
-            
-            # 寫回檔案
-            with open(self.log_file, 'w', encoding='utf-8') as f:
-                json.dump(logs, f, ensure_ascii=False, indent=2)
-                
+            with self._lock:
+                fd = self._open_segment()
+                # O_APPEND 的單次 write 會寫到檔案尾端，多個程序同時寫入也不會覆蓋彼此的記錄
+                os.write(fd, line)
+                if self._should_rotate(os.fstat(fd).st_size):
+                    self._rotate()
         except Exception as e:
             self.logger.error(f"儲存 webhook 日誌失敗: {e}")
     
+    def _open_segment(self):
+        """取得目前檔案的 file descriptor；檔案已被其他程序輪替或刪除時重新開啟（呼叫端需持有 self._lock）"""
+        try:
+            current_inode = os.stat(self.log_file).st_ino
+        except FileNotFoundError:
+            current_inode = None
+        if self._fd is not None and current_inode == self._inode:
+            return self._fd
+        
+        self._close_segment()
+        directory = os.path.dirname(os.path.abspath(self.log_file))
+        os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._inode = os.fstat(self._fd).st_ino
+        self._segment_started = self._first_record_time() or time.time()
+        return self._fd
+    
+    def _close_segment(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._inode = None
+    
+    def _first_record_time(self):
+        """讀取檔案第一筆記錄的時間（epoch 秒），檔案為空或無法解析時回傳 None"""
+        try:
+            with open(self.log_file, "r", encoding="utf-8") as f:
+                first_line = f.readline()
+            timestamp = json.loads(first_line)["timestamp"] if first_line else None
+            return datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp() if timestamp else None
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    
+    def _should_rotate(self, size):
+        if size >= self.max_bytes:
+            return True
+        return self._segment_started is not None and time.time() - self._segment_started >= self.max_age_seconds
+    
+    def _rotate(self):
+        """將目前的檔案改名為帶時間的輪替檔案（呼叫端需持有 self._lock）"""
+        inode = self._inode
+        self._close_segment()
+        rotated = f"{self.log_file}.{datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')}"
+        try:
+            # 其他程序已經輪替並建立新檔案時，不要把新檔案也改名
+            if os.stat(self.log_file).st_ino != inode:
+                return
+            os.rename(self.log_file, rotated)
+        except FileNotFoundError:
+            return
+        if self.compress:
+            # 壓縮在背景執行，不阻塞 webhook 請求
+            threading.Thread(target=self._compress_and_prune, args=(rotated,), daemon=True).start()
+        else:
+            self._prune_segments()
+    
+    def _compress_and_prune(self, path):
+        """在背景壓縮輪替後的檔案；壓縮完成後才換上 .gz 檔名並刪除原檔，再清理舊檔"""
+        pending = path + ".gz.tmp"
+        try:
+            with open(path, "rb") as source, gzip.open(pending, "wb") as target:
+                shutil.copyfileobj(source, target)
+        except Exception as e:
+            self.logger.error(f"壓縮 webhook 日誌失敗: {e}")
+            if os.path.exists(pending):
+                os.remove(pending)
+            return
+        with self._lock:
+            try:
+                os.replace(pending, path + ".gz")
+                os.remove(path)
+            except OSError as e:
+                self.logger.error(f"替換壓縮後的 webhook 日誌失敗: {e}")
+            self._prune_segments()
+    
+    def _rotated_segments(self, finished_only=False):
+        """
+        輪替後的檔案，由舊到新排序（檔名中的時間可以直接依字串排序）
+        
+        Args:
+            finished_only: 啟用壓縮時只列出已壓縮完成的 .gz 檔案，壓縮中的原檔不計入
+        """
+        segments = [
+            path for path in glob.glob(glob.escape(self.log_file) + ".*")
+            if not path.endswith(".tmp") and not (finished_only and self.compress and not path.endswith(".gz"))
+        ]
+        return sorted(segments, key=lambda path: path[len(self.log_file) + 1:].replace(".gz", ""))
+    
+    def _prune_segments(self):
+        """刪除超過 backup_count 的舊輪替檔案（呼叫端需持有 self._lock）
+        
+        啟用壓縮時只計算與刪除已壓縮完成的檔案，不會刪掉背景執行緒正在壓縮的原檔。
+        """
+        segments = self._rotated_segments(finished_only=True)
+        for path in segments[:max(0, len(segments) - self.backup_count)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
     def log_to_console(self, webhook_data):
         """記錄到控制台"""
         request_id = webhook_data["request_id"]
@@ -135,27 +258,75 @@ class WebhookLogger:
         self.logger.info(f"[{request_id}] ===== WEBHOOK 記錄結束 =====")
     
     def get_recent_logs(self, count=10):
-        """取得最近的日誌記錄"""
+        """取得最近的日誌記錄（由舊到新），只從檔案尾端讀取需要的部分"""
         try:
-            if os.path.exists(self.log_file):
-                with open(self.log_file, 'r', encoding='utf-8') as f:
-                    logs = json.load(f)
-                return logs[-count:] if logs else []
-            return []
+            logs = []
+            for path in [self.log_file] + self._rotated_segments()[::-1]:
+                if len(logs) >= count:
+                    break
+                if not os.path.exists(path):
+                    continue
+                lines = self._read_tail_lines(path, count - len(logs))
+                logs = [json.loads(line) for line in lines] + logs
+            return logs[-count:] if count > 0 else []
         except Exception as e:
             self.logger.error(f"讀取日誌失敗: {e}")
             return []
     
+    @staticmethod
+    def _read_tail_lines(path, count, block_size=64 * 1024):
+        """讀取檔案最後 count 行（不含空行）；gzip 檔案需要整個解壓縮"""
+        if count <= 0:
+            return []
+        if path.endswith(".gz"):
+            with gzip.open(path, "rb") as f:
+                return [line for line in f.read().decode("utf-8").splitlines() if line][-count:]
+        
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b""
+            # 從尾端往前一塊一塊讀，直到換行數足夠（多一行以確保最前面的一行是完整的）
+            while position > 0 and data.count(b"\n") <= count:
+                step = min(block_size, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+        lines = [line for line in data.decode("utf-8", errors="replace").split("\n") if line]
+        if position > 0:
+            lines = lines[1:]
+        return lines[-count:]
+    
     def clear_logs(self):
-        """清除日誌檔案"""
+        """清除日誌檔案（包含輪替後的檔案）"""
         try:
-            if os.path.exists(self.log_file):
-                os.remove(self.log_file)
-                self.logger.info("日誌檔案已清除")
+            with self._lock:
+                self._close_segment()
+                for path in [self.log_file] + self._rotated_segments():
+                    if os.path.exists(path):
+                        os.remove(path)
+            self.logger.info("日誌檔案已清除")
             return True
         except Exception as e:
             self.logger.error(f"清除日誌失敗: {e}")
             return False
 
+def _get_int_env(key, default):
+    """取得整數型態的選用環境變數，格式錯誤時使用預設值（在匯入時執行，不可拋出例外）"""
+    value = os.getenv(key)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logging.warning(f"環境變數 {key} 不是有效的整數: {value}，改用預設值 {default}")
+        return default
+
 # 全域 webhook logger 實例
-webhook_logger = WebhookLogger()
+webhook_logger = WebhookLogger(
+    log_file=os.getenv("WEBHOOK_LOG_FILE", "webhook_logs.jsonl"),
+    max_bytes=_get_int_env("WEBHOOK_LOG_MAX_BYTES", 5 * 1024 * 1024),
+    max_age_seconds=_get_int_env("WEBHOOK_LOG_MAX_AGE_SECONDS", 24 * 3600),
+    backup_count=_get_int_env("WEBHOOK_LOG_BACKUPS", 5),
+    compress=os.getenv("WEBHOOK_LOG_GZIP", "false").lower() == "true",
+)